@@ -0,0 +1,99 @@
+# audio.py
+import subprocess
+import numpy as np
+
+from cancellation import check_cancelled
+
+# Whisper consumes 16 kHz mono float32 PCM
+SAMPLE_RATE = 16000
+
+
+def load_audio(path, start=None, end=None, sr=SAMPLE_RATE, cancel=None):
+    """Decode media straight into a mono float32 array at sr Hz, without temp files.
+
+    With start/end (seconds) only that range is decoded. The seek is done by
+    ffmpeg on the input with decoding (not a stream copy), so it is not snapped to
+    keyframes or packets, and the array is trimmed to exactly
+    round((end - start) * sr) samples.
+
+    cancel (a cancellation.CancelToken) kills ffmpeg at once and raises Cancelled.
+    """
+    start = float(start or 0)
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0"]
+    if start > 0:
+        cmd += ["-ss", f"{start:.6f}"]
+    cmd += ["-i", path]
+    if end is not None:
+        end = float(end)
+        if end <= start:
+            raise ValueError("end_time must be greater than start_time")
+        cmd += ["-t", f"{end - start:.6f}"]
+    cmd += ["-vn", "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr), "-"]
+    check_cancelled(cancel)
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    remove = cancel.on_cancel(proc.kill) if cancel is not None else None
+    try:
+        out, err = proc.communicate()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        if remove:
+            remove()
+    check_cancelled(cancel)
+    if proc.returncode:
+        raise RuntimeError(f"Failed to decode audio: {err.decode(errors='replace').strip()}")
+
+    samples = np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+    if end is not None:
+        wanted = int(round((end - start) * sr))
+        samples = samples[:wanted]
+    return samples
+
+
+def find_silence_splits(samples, sr=SAMPLE_RATE, chunk_seconds=600.0, search_seconds=30.0,
+                        frame_seconds=0.02, smooth_seconds=0.3):
+    """Sample positions that cut samples into ~chunk_seconds pieces at the quietest points.
+
+    Around every multiple of chunk_seconds, a +/- search_seconds window is scanned for
+    the lowest short-term energy (smoothed over smooth_seconds so a single quiet frame
+    inside a word doesn't win), and the cut is placed in the middle of that pause.
+    Only the search windows are analysed, so this stays cheap for multi-hour audio.
+    """
+    total = len(samples)
+    chunk = int(chunk_seconds * sr)
+    if chunk <= 0 or total <= chunk * 1.5:
+        return []
+    search = int(search_seconds * sr)
+    frame = max(1, int(frame_seconds * sr))
+    smooth = max(1, int(round(smooth_seconds / frame_seconds)))
+
+    splits = []
+    target = chunk
+    # Keep the last piece at least half a chunk long
+    while target < total - chunk // 2:
+        lo = max(splits[-1] + frame if splits else 0, target - search)
+        hi = min(total, target + search)
+        n_frames = (hi - lo) // frame
+        if n_frames < 1:
+            break
+        window = samples[lo:lo + n_frames * frame].reshape(n_frames, frame)
+        energy = np.square(window, dtype=np.float64).mean(axis=1)
+        shift = 0
+        if n_frames >= smooth:
+            # 'valid' so the window edges are not pulled down by zero padding
+            energy = np.convolve(energy, np.ones(smooth) / smooth, mode="valid")
+            shift = smooth // 2
+        best = int(np.argmin(energy))
+        # Centre the cut in the quietest stretch rather than at its first frame
+        floor = energy[best] * 1.001 + 1e-12
+        run_lo = run_hi = best
+        while run_lo > 0 and energy[run_lo - 1] <= floor:
+            run_lo -= 1
+        while run_hi < len(energy) - 1 and energy[run_hi + 1] <= floor:
+            run_hi += 1
+        best = (run_lo + run_hi) // 2 + shift
+        splits.append(lo + best * frame + frame // 2)
+        target = splits[-1] + chunk
+    return splits
@@ -0,0 +1,385 @@
+# benchmark.py
+"""Offline benchmarks for the decode, inference, export and cached-download paths.
+
+Everything runs without network access: test media is synthesised locally with
+ffmpeg (speech-like tones with pauses, and pure silence) and reused between runs.
+
+    python benchmark.py --quick                       # 1 and 10 minute media
+    python benchmark.py --save-baseline bench.json    # record a baseline
+    python benchmark.py --baseline bench.json         # exit 1 on regressions
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+from audio import SAMPLE_RATE, load_audio
+from cache import default_cache_dir
+from exporters import JSON_MODES, export_result, format_timestamp, write_srt, write_tsv, write_vtt
+from transcript import Transcript
+
+DEFAULT_DURATIONS = (60, 600, 3600, 10800)
+QUICK_DURATIONS = (60, 600)
+DEFAULT_REPEAT = 3
+# A result regresses when it is this much slower than the baseline...
+DEFAULT_THRESHOLD = 0.25
+# ...and slower by at least this many seconds (sub-millisecond timings are mostly noise)
+MIN_REGRESSION_SECONDS = 0.005
+# Longest media the tiny-model transcribe() benchmark runs on
+DEFAULT_TRANSCRIBE_MAX_SECONDS = 600
+SEGMENT_SECONDS = 4.0  # typical Whisper segment length
+GROUPS = ("startup", "timestamp", "writers", "decode", "download", "model", "transcribe")
+# Must not be imported just by loading these modules (see main.HEAVY_MODULES)
+STARTUP_MODULES = ("main", "gui", "daemon")
+HEAVY_MODULES = ("torch", "whisper", "yt_dlp")
+
+# A voiced tone whose pitch drifts like speech, with ~4 Hz syllables and a pause every few seconds
+_SPEECH_EXPR = (
+    "(0.5*sin(2*PI*(150+30*sin(2*PI*0.3*t))*t)+0.25*sin(4*PI*(150+30*sin(2*PI*0.3*t))*t)"
+    "+0.12*sin(6*PI*(150+30*sin(2*PI*0.3*t))*t))"
+    "*(0.5+0.5*sin(2*PI*4*t))*gt(sin(2*PI*t/7)\\,-0.2)"
+)
+
+
+class BenchmarkSkipped(Exception):
+    """Raised by a benchmark that can't run here (missing ffmpeg, model, ...)."""
+
+
+def _label(seconds):
+    if seconds >= 3600 and seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds >= 60 and seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+def synth_media(directory, seconds, kind="speech"):
+    """Path of a synthetic AAC file of the given length, generated once and reused."""
+    if not shutil.which("ffmpeg"):
+        raise BenchmarkSkipped("ffmpeg not found")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{kind}_{_label(seconds)}.m4a")
+    if os.path.exists(path):
+        return path
+    if kind == "speech":
+        source = f"aevalsrc={_SPEECH_EXPR}:s={SAMPLE_RATE}:d={seconds}"
+    else:
+        source = f"anullsrc=r={SAMPLE_RATE}:cl=mono:d={seconds}"
+    tmp_path = path + ".tmp.m4a"
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-y", "-f", "lavfi", "-i", source,
+           "-ac", "1", "-c:a", "aac", "-b:a", "48k", tmp_path]
+    try:
+        subprocess.run(cmd, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to synthesise media: {e.stderr.decode(errors='replace').strip()}") from e
+    os.replace(tmp_path, path)
+    return path
+
+
+def synthetic_segments(seconds):
+    """Whisper-shaped segments covering seconds of audio."""
+    words = "the quick brown fox jumps over a lazy dog while rumble streams play on".split()
+    segments = []
+    start = 0.0
+    while start < seconds:
+        end = min(seconds, start + SEGMENT_SECONDS)
+        i = len(segments)
+        text = " " + " ".join(words[(i + k) % len(words)] for k in range(9)) + "."
+        segments.append({
+            "id": i, "seek": int(start * 100), "start": round(start, 2), "end": round(end, 2),
+            "text": text, "tokens": list(range(50364, 50364 + 12)), "temperature": 0.0,
+            "avg_logprob": -0.25, "compression_ratio": 1.4, "no_speech_prob": 0.01,
+        })
+        start = end
+    return segments
+
+
+def measure(fn, repeat):
+    """Median and best wall time of fn() over repeat runs."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return {"seconds": round(statistics.median(times), 6), "min": round(min(times), 6), "runs": repeat}
+
+
+def _import_main():
+    try:
+        import main
+    except ImportError as e:
+        raise BenchmarkSkipped(f"main.py dependencies missing: {e}")
+    return main
+
+
+def _whisper_model_cached(name):
+    """True if Whisper can load name without downloading it."""
+    import whisper
+    url = getattr(whisper, "_MODELS", {}).get(name)
+    if not url:
+        return os.path.exists(name)
+    root = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "whisper")
+    return os.path.exists(os.path.join(root, os.path.basename(url)))
+
+
+# Each benchmark group yields (name, fn, extra) triples; extra is merged into the result
+
+def bench_startup(ctx):
+    """Import time of the entry modules in a fresh interpreter, and what they drag in."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    for module in STARTUP_MODULES:
+        probe = (f"import sys, time; t = time.perf_counter(); import {module}; "
+                 f"print(time.perf_counter() - t); "
+                 f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+        check = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, cwd=here)
+        if check.returncode != 0:
+            reason = (check.stderr.strip().splitlines() or ["import failed"])[-1]
+            print(f"{'import_' + module:<40} skipped: {reason}", file=sys.stderr)
+            continue
+        heavy = [m for m in check.stdout.splitlines()[1].split(",") if m]
+
+        def _run(probe=probe):
+            subprocess.run([sys.executable, "-c", probe], capture_output=True, check=True, cwd=here)
+        yield f"import_{module}", _run, {"heavy_imports": heavy}
+
+
+def bench_timestamp(ctx):
+    values = [i * 0.137 for i in range(100000)]
+
+    def _run():
+        for v in values:
+            format_timestamp(v, always_include_hours=True)
+    yield "format_timestamp[100k]", _run, {}
+
+
+def bench_writers(ctx):
+    for seconds in ctx["durations"]:
+        segments = synthetic_segments(seconds)
+        result = {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "en"}
+        # transcribe() packs Whisper's result once and exports from the columns
+        transcript = Transcript.from_result(result)
+        out = os.path.join(ctx["workdir"], "writers")
+        os.makedirs(out, exist_ok=True)
+        label, extra = _label(seconds), {"segments": len(segments)}
+
+        writers = (
+            ("srt", lambda segments=segments: write_srt(segments, os.path.join(out, "bench.srt"))),
+            ("vtt", lambda segments=segments: write_vtt(segments, os.path.join(out, "bench.vtt"))),
+            ("tsv", lambda segments=segments: write_tsv(segments, os.path.join(out, "bench.tsv"))),
+        )
+        for fmt, writer in writers:
+            yield f"write_{fmt}[{label}]", writer, extra
+        for mode in JSON_MODES:
+            yield f"write_json_{mode}[{label}]", \
+                (lambda mode=mode, transcript=transcript: export_result(transcript, out, "bench", ["json"], json_mode=mode)), extra
+        # Every format in the single pass transcribe() uses
+        yield f"export_all[{label}]", \
+            (lambda transcript=transcript: export_result(transcript, out, "bench",
+                                                          ["txt", "srt", "vtt", "tsv", "json"])), extra
+        yield f"transcript_pack[{label}]", (lambda result=result: Transcript.from_result(result)), extra
+        yield f"transcript_roundtrip[{label}]", \
+            (lambda transcript=transcript: Transcript.from_bytes(transcript.to_bytes())), extra
+
+
+def bench_decode(ctx):
+    for seconds in ctx["durations"]:
+        path = synth_media(ctx["media_dir"], seconds)
+        yield f"decode[{_label(seconds)}]", (lambda path=path: load_audio(path)), {"audio_seconds": seconds}
+        # A one-minute range from the middle, as decoded for Start/End jobs
+        start = max(0.0, seconds / 2.0 - 30.0)
+        end = min(float(seconds), start + 60.0)
+        yield f"extract_segment[{_label(seconds)}]", (lambda path=path, s=start, e=end: load_audio(path, s, e)), \
+            {"audio_seconds": end - start}
+
+
+def bench_download(ctx):
+    """download_video() answered from the media cache: the repeat-request path, no network."""
+    main = _import_main()
+    from cache import MediaCache
+    path = synth_media(ctx["media_dir"], min(ctx["durations"]))
+    cache = MediaCache(root=os.path.join(ctx["workdir"], "media-cache"))
+    url = "https://rumble.com/vbench1-synthetic.html"
+    entry = os.path.join(cache.entry_dir("Rumble", "vbench1"), "native_audio.m4a")
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    shutil.copyfile(path, entry)
+    cache.record(url, "Rumble", "vbench1", "native_audio", entry, {"id": "vbench1"})
+    out = os.path.join(ctx["workdir"], "download-out")
+
+    def _run():
+        saved, main.MEDIA_CACHE = main.MEDIA_CACHE, cache
+        try:
+            main.download_video(url, out, main.DOWNLOAD_FORMATS["native_audio"], transcription_only=True)
+        finally:
+            main.MEDIA_CACHE = saved
+    yield "download_cache_hit", _run, {}
+
+
+def bench_model(ctx):
+    main = _import_main()
+    if not _whisper_model_cached("tiny"):
+        raise BenchmarkSkipped("Whisper 'tiny' model is not downloaded (run it once while online)")
+
+    def _run():
+        main.MODEL_REGISTRY.clear()
+        main.get_model("tiny")
+    yield "model_load[tiny]", _run, {}
+
+
+def bench_transcribe(ctx):
+    main = _import_main()
+    from metrics import JobMetrics
+    if not _whisper_model_cached("tiny"):
+        raise BenchmarkSkipped("Whisper 'tiny' model is not downloaded (run it once while online)")
+    out = os.path.join(ctx["workdir"], "transcribe-out")
+    main.get_model("tiny")  # load once up front; model_load measures that separately
+    for kind in ("speech", "silence"):
+        for seconds in ctx["durations"]:
+            if seconds > ctx["transcribe_max_seconds"]:
+                continue
+            path = synth_media(ctx["media_dir"], seconds, kind)
+            job_metrics = JobMetrics()
+
+            def _run(path=path, job_metrics=job_metrics):
+                main.transcribe(path, model_name="tiny", formats=["txt"], output_dir=out,
+                                use_cache=False, metrics=job_metrics)
+            yield f"transcribe[tiny,{kind},{_label(seconds)}]", _run, {"audio_seconds": seconds}
+
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "timestamp": bench_timestamp,
+    "writers": bench_writers,
+    "decode": bench_decode,
+    "download": bench_download,
+    "model": bench_model,
+    "transcribe": bench_transcribe,
+}
+
+
+def run_benchmarks(groups, durations, repeat, media_dir, transcribe_max_seconds=DEFAULT_TRANSCRIBE_MAX_SECONDS):
+    """Run the selected groups and return {name: result}; skipped groups carry a reason."""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="rumble-bench-") as workdir:
+        ctx = {"durations": sorted(durations), "repeat": repeat, "media_dir": media_dir,
+               "workdir": workdir, "transcribe_max_seconds": transcribe_max_seconds}
+        for group in groups:
+            try:
+                for name, fn, extra in BENCHMARKS[group](ctx):
+                    result = measure(fn, repeat)
+                    result.update(extra)
+                    if result.get("audio_seconds") and group in ("decode", "transcribe"):
+                        result["real_time_factor"] = round(result["seconds"] / result["audio_seconds"], 5)
+                    results[name] = result
+                    print(f"{name:<40} {result['seconds'] * 1000:>12.2f} ms", file=sys.stderr)
+            except BenchmarkSkipped as e:
+                results[group] = {"skipped": str(e)}
+                print(f"{group:<40} skipped: {e}", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Results slower than the baseline by more than threshold, as (name, base, now) tuples.
+
+    The best run is compared rather than the median: it is far less sensitive to
+    whatever else the machine happens to be doing.
+    """
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        now = results.get(name)
+        if not now or "min" not in now or "min" not in base:
+            continue
+        if now["min"] > base["min"] * (1.0 + threshold) and now["min"] - base["min"] >= MIN_REGRESSION_SECONDS:
+            regressions.append((name, base["min"], now["min"]))
+    return regressions
+
+
+def heavy_import_violations(results):
+    """Startup benchmarks whose module pulled in torch/whisper/yt-dlp at import time."""
+    return [(name, r["heavy_imports"]) for name, r in results.items() if r.get("heavy_imports")]
+
+
+def _environment():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="benchmark.py", description="Offline performance benchmarks.")
+    parser.add_argument("--quick", action="store_true",
+                        help=f"Only {', '.join(_label(s) for s in QUICK_DURATIONS)} media")
+    parser.add_argument("--durations", help="Comma-separated media lengths in seconds "
+                                            f"(default: {','.join(str(s) for s in DEFAULT_DURATIONS)})")
+    parser.add_argument("--only", help=f"Comma-separated groups to run: {','.join(GROUPS)} (default: all)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"Runs per benchmark; the median is reported (default: {DEFAULT_REPEAT})")
+    parser.add_argument("--transcribe-max-seconds", type=int, default=DEFAULT_TRANSCRIBE_MAX_SECONDS,
+                        help="Skip transcribe() on media longer than this "
+                             f"(default: {DEFAULT_TRANSCRIBE_MAX_SECONDS})")
+    parser.add_argument("--media-dir", default=os.path.join(default_cache_dir(), "bench-media"),
+                        help="Where synthetic media is generated and kept between runs")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Store the results as a baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against a stored baseline; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed slowdown before a result counts as a regression (default: {DEFAULT_THRESHOLD})")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.durations:
+        try:
+            durations = [int(v) for v in args.durations.split(",") if v.strip()]
+        except ValueError:
+            print("--durations takes whole seconds", file=sys.stderr)
+            return 2
+    else:
+        durations = list(QUICK_DURATIONS if args.quick else DEFAULT_DURATIONS)
+    groups = [g.strip() for g in args.only.split(",")] if args.only else list(GROUPS)
+    unknown = [g for g in groups if g not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark group(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    results = run_benchmarks(groups, durations, max(1, args.repeat), args.media_dir, args.transcribe_max_seconds)
+    report = {"environment": _environment(), "results": results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+
+    violations = heavy_import_violations(results)
+    for name, modules in violations:
+        print(f"STARTUP REGRESSION {name}: imports {', '.join(modules)} at module load")
+    if not args.baseline:
+        return 1 if violations else 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for name, base, now in regressions:
+        print(f"REGRESSION {name}: {base * 1000:.2f} ms -> {now * 1000:.2f} ms ({now / base:.2f}x)")
+    if not regressions:
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}.")
+    return 1 if regressions or violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,638 @@
+# cache.py
+import os
+import re
+import json
+import time
+import hashlib
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+
+from transcript import Transcript
+
+# Size caps for the on-disk caches (override with RUMBLE_TRANSCRIPT_CACHE_MB / RUMBLE_MEDIA_CACHE_MB)
+DEFAULT_TRANSCRIPT_CACHE_MB = 512
+DEFAULT_MEDIA_CACHE_MB = 10240
+
+# Bump when the stored result layout changes so stale entries are never served
+TRANSCRIPT_CACHE_VERSION = 3
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def default_cache_dir():
+    """Root folder for all caches (override with RUMBLE_TRANSCRIBER_CACHE_DIR)."""
+    root = os.environ.get("RUMBLE_TRANSCRIBER_CACHE_DIR")
+    if root:
+        return root
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "rumble_transcriber")
+
+
+def _env_mb(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+_digest_memo = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path):
+    """SHA-256 of a file's content, memoized by path, size and mtime."""
+    st = os.stat(path)
+    memo_key = (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+    with _digest_lock:
+        digest = _digest_memo.get(memo_key)
+    if digest:
+        return digest
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _digest_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def _write_bytes_atomic(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_json_atomic(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class TranscriptCache:
+    """Content-addressed store of transcripts, kept in Transcript's binary form.
+
+    Entries are keyed by the media content hash plus everything that changes the
+    decoded text (model, language, time range, decoding options). The folder is
+    capped at max_mb; the least recently used entries (by mtime, refreshed on every
+    hit) are evicted first.
+    """
+
+    def __init__(self, root=None, max_mb=None):
+        self.root = root or os.path.join(default_cache_dir(), "transcripts")
+        if max_mb is None:
+            max_mb = _env_mb("RUMBLE_TRANSCRIPT_CACHE_MB", DEFAULT_TRANSCRIPT_CACHE_MB)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def make_key(self, media_digest, model_name, lang, start_time=None, end_time=None, options=None):
+        def _t(value):
+            return None if value is None else round(float(value), 3)
+
+        payload = {
+            "v": TRANSCRIPT_CACHE_VERSION,
+            "media": media_digest,
+            "model": model_name,
+            "lang": lang,
+            "start": _t(start_time),
+            "end": _t(end_time),
+            "options": options or {},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ".bin")
+
+    def contains(self, key):
+        """Whether key has an entry; unlike get(), this counts neither a hit nor a miss."""
+        return os.path.exists(self._path(key))
+
+    def get(self, key, media_bytes=0):
+        """Return the cached Transcript for key, or None on a miss.
+
+        media_bytes is the size of the media whose inference a hit skips; it is
+        added to the bytes_saved counter.
+        """
+        path = self._path(key)
+        try:
+            result = Transcript.load(path)
+            os.utime(path, None)  # refresh LRU position
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += int(media_bytes or 0)
+        return result
+
+    def put(self, key, result):
+        """Store a Transcript (or Whisper result dict) under key."""
+        try:
+            _write_bytes_atomic(self._path(key), Transcript.from_result(result).to_bytes())
+        except (OSError, TypeError, ValueError) as e:
+            # A cache that cannot be written must never fail the transcription itself
+            print(f"Warning: could not store transcript in cache: {e}")
+            return
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return entries
+        for name in names:
+            # .json entries are from older cache versions; still counted so they age out
+            if not name.endswith((".bin", ".json")):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            while entries and total > self.max_bytes:
+                _, size, path = entries.pop(0)
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def stats(self):
+        entries = self._entries()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+                "entries": len(entries),
+                "size_bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+# Metadata fields recorded next to every cached download
+_MEDIA_INFO_FIELDS = (
+    "id", "extractor_key", "title", "uploader", "channel", "duration", "upload_date",
+    "webpage_url", "ext", "format", "format_id", "filesize", "filesize_approx",
+)
+# Files yt-dlp leaves behind while a download is in progress
+_PARTIAL_SUFFIXES = (".part", ".ytdl", ".tmp", ".json")
+
+
+def _safe_name(value):
+    return re.sub(r"[^\w.-]", "_", str(value)) or "_"
+
+
+def normalize_url(url):
+    """Canonical form of a media URL for index lookups (fragment and whitespace dropped)."""
+    return url.strip().split("#", 1)[0]
+
+
+class MediaCache:
+    """Downloaded media stored by extractor, video ID and download format.
+
+    Layout: <root>/<extractor>/<video_id>/<format_key>.<ext>, with the recorded
+    metadata in <format_key>.info.json next to it. A URL index maps every URL that
+    resolved to a video onto its (extractor, id), so repeat requests for the same
+    URL are answered from disk without touching the network. Total media size is
+    capped at max_mb; least recently used entries are evicted first.
+    """
+
+    def __init__(self, root=None, max_mb=None):
+        self.root = root or os.path.join(default_cache_dir(), "media")
+        if max_mb is None:
+            max_mb = _env_mb("RUMBLE_MEDIA_CACHE_MB", DEFAULT_MEDIA_CACHE_MB)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._pins = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.root, "urls.json")
+
+    def entry_dir(self, extractor, video_id):
+        return os.path.join(self.root, _safe_name(extractor), _safe_name(video_id))
+
+    @contextmanager
+    def key_lock(self, url, format_key):
+        """Serialize work on one URL/format so concurrent jobs don't download it twice."""
+        with self._lock:
+            lock = self._key_locks.setdefault((normalize_url(url), format_key), threading.Lock())
+        with lock:
+            yield
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def find(self, extractor, video_id, format_key, preferred_ext=None):
+        """Path of the cached media file for this video/format, or None."""
+        directory = self.entry_dir(extractor, video_id)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return None
+        found = None
+        for name in sorted(names):
+            if not name.startswith(format_key + ".") or name.endswith(_PARTIAL_SUFFIXES):
+                continue
+            found = os.path.join(directory, name)
+            if preferred_ext and name.endswith("." + preferred_ext):
+                break
+        return found
+
+    def _touch(self, extractor, video_id, format_key):
+        meta = os.path.join(self.entry_dir(extractor, video_id), format_key + ".info.json")
+        try:
+            os.utime(meta, None)
+        except OSError:
+            pass
+
+    def lookup(self, extractor, video_id, format_key, preferred_ext=None, count=True):
+        """Path of the cached media for this video/format, or None.
+
+        With count=False the lookup is left out of the hit/miss statistics; callers
+        that probe several keys for one request add its outcome with count_request().
+        """
+        path = self.find(extractor, video_id, format_key, preferred_ext)
+        if count:
+            self.count_request(bool(path))
+        if path:
+            self._touch(extractor, video_id, format_key)
+        return path
+
+    def lookup_url(self, url, format_key, preferred_ext=None, count=True):
+        """Resolve a URL through the index only; never performs network I/O.
+
+        Returns (media_path, extractor, video_id) or None. count is as in lookup().
+        """
+        with self._lock:
+            entry = self._load_index().get(normalize_url(url))
+        path = self.find(entry[0], entry[1], format_key, preferred_ext) if entry else None
+        if count:
+            self.count_request(bool(path))
+        if not path:
+            return None
+        self._touch(entry[0], entry[1], format_key)
+        return path, entry[0], entry[1]
+
+    def count_request(self, hit):
+        """Add one request's outcome to the hit/miss statistics."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @contextmanager
+    def incoming_dir(self):
+        """Private folder for one in-flight download, removed afterwards.
+
+        It lives inside the cache root so finished files can be moved into their
+        entry with an atomic rename, even when several processes share the cache.
+        """
+        path = os.path.join(self.root, ".incoming", f"{os.getpid()}-{uuid.uuid4().hex[:12]}")
+        os.makedirs(path)
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def adopt(self, tmp_path, extractor, video_id, format_key):
+        """Atomically move a finished download into its cache entry and return the new path."""
+        directory = self.entry_dir(extractor, video_id)
+        os.makedirs(directory, exist_ok=True)
+        final_path = os.path.join(directory, format_key + os.path.splitext(tmp_path)[1])
+        os.replace(tmp_path, final_path)
+        return final_path
+
+    def identify(self, path):
+        """(extractor, video_id) for a file inside the cache, or None for any other path."""
+        rel = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+        parts = rel.split(os.sep)
+        if len(parts) != 3 or parts[0] in ("..", ".incoming"):
+            return None
+        return parts[0], parts[1]
+
+    def discard(self, extractor, video_id, format_key):
+        """Remove any cached files for this video/format (before a forced re-download)."""
+        directory = self.entry_dir(extractor, video_id)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(format_key + "."):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def pin(self, path):
+        """Keep a cached file from being evicted until unpin(); False if it is already gone.
+
+        Pins are counted, so several jobs can hold the same entry. Checking and
+        pinning under the eviction lock means a True result is safe to use.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            if not os.path.exists(key):
+                return False
+            self._pins[key] = self._pins.get(key, 0) + 1
+        return True
+
+    def unpin(self, path):
+        key = os.path.abspath(path)
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+
+    def record(self, url, extractor, video_id, format_key, media_path, info=None, pin=False):
+        """Store metadata for a finished download, index its URL and enforce the size cap.
+
+        With pin=True the new entry is pinned before anything is evicted.
+        """
+        meta = {k: info.get(k) for k in _MEDIA_INFO_FIELDS if info and info.get(k) is not None}
+        meta.update({
+            "source_url": url,
+            "format_key": format_key,
+            "media_file": os.path.basename(media_path),
+            "size_bytes": os.path.getsize(media_path),
+            "downloaded_at": int(time.time()),
+        })
+        _write_json_atomic(os.path.join(self.entry_dir(extractor, video_id), format_key + ".info.json"), meta)
+        self.record_url(url, extractor, video_id)
+        if pin:
+            self.pin(media_path)
+        self._evict(keep=media_path)
+
+    def resolve_url(self, url):
+        """(extractor, video_id) the URL resolved to on an earlier download, or None."""
+        with self._lock:
+            entry = self._load_index().get(normalize_url(url))
+        return tuple(entry) if entry else None
+
+    def record_url(self, url, extractor, video_id):
+        with self._lock:
+            index = self._load_index()
+            key = normalize_url(url)
+            if index.get(key) == [extractor, video_id]:
+                return
+            index[key] = [extractor, video_id]
+            _write_json_atomic(self._index_path, index)
+
+    def _entries(self):
+        """(last_used, size, media_path, meta_path) for every cached download."""
+        entries = []
+        for dirpath, dirnames, names in os.walk(self.root):
+            if ".incoming" in dirnames:
+                dirnames.remove(".incoming")
+            for name in names:
+                if not name.endswith(".info.json"):
+                    continue
+                meta_path = os.path.join(dirpath, name)
+                format_key = name[:-len(".info.json")]
+                for media_name in names:
+                    if media_name.startswith(format_key + ".") and not media_name.endswith(_PARTIAL_SUFFIXES):
+                        media_path = os.path.join(dirpath, media_name)
+                        try:
+                            size = os.path.getsize(media_path)
+                            last_used = os.path.getmtime(meta_path)
+                        except OSError:
+                            continue
+                        entries.append((last_used, size, media_path, meta_path))
+        return entries
+
+    def _evict(self, keep=None):
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _, _ in entries)
+            for _, size, media_path, meta_path in entries:
+                if total <= self.max_bytes:
+                    break
+                if keep and os.path.abspath(media_path) == os.path.abspath(keep):
+                    continue
+                if os.path.abspath(media_path) in self._pins:
+                    # Handed to a job that has not transcribed it yet
+                    continue
+                for path in (media_path, meta_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+                print(f"Evicted cached media: {media_path}")
+
+    def stats(self):
+        entries = self._entries()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(entries),
+                "size_bytes": sum(size for _, size, _, _ in entries),
+                "max_bytes": self.max_bytes,
+            }
+
+
+# How many listing keys are remembered per channel/playlist to find where the last sync began
+SYNC_HEAD_SIZE = 50
+
+
+class TranscriptionHistory:
+    """Which videos were transcribed with which model, and how far each channel sync got.
+
+    Kept in one JSON file (<cache root>/history.json) that is never evicted:
+    {"transcribed": {"<extractor>:<video_id>": {"<model>": {"at": ..., "outputs": [...]}}},
+     "syncs": {"<channel or playlist URL>": {"synced_at": ..., "head": [...], "pending": [...]}}}
+    A sync's head lists the newest entries seen in it; pending holds URLs that did
+    not finish, so the next incremental run retries them.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(default_cache_dir(), "history.json")
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault("transcribed", {})
+        data.setdefault("syncs", {})
+        return data
+
+    def is_transcribed(self, extractor, video_id, model):
+        with self._lock:
+            entry = self._load()["transcribed"].get(f"{extractor}:{video_id}", {})
+        return model in entry
+
+    def record_transcribed(self, extractor, video_id, model, outputs=None):
+        with self._lock:
+            data = self._load()
+            entry = data["transcribed"].setdefault(f"{extractor}:{video_id}", {})
+            entry[model] = {"at": int(time.time()), "outputs": list(outputs or [])}
+            _write_json_atomic(self.path, data)
+
+    def sync_state(self, source):
+        with self._lock:
+            state = self._load()["syncs"].get(normalize_url(source))
+        return dict(state) if state else {"synced_at": None, "head": [], "pending": []}
+
+    def record_sync(self, source, head, pending=()):
+        with self._lock:
+            data = self._load()
+            data["syncs"][normalize_url(source)] = {
+                "synced_at": int(time.time()),
+                "head": list(head)[:SYNC_HEAD_SIZE],
+                "pending": list(dict.fromkeys(pending)),
+            }
+            _write_json_atomic(self.path, data)
+
+
+# Decoder state is written at most this often while a transcription runs
+CHECKPOINT_INTERVAL = 30.0
+# Checkpoints of transcriptions nobody came back to are dropped after this long
+CHECKPOINT_MAX_AGE = 14 * 24 * 3600
+
+
+class CheckpointStore:
+    """Progress of unfinished transcriptions, so that running them again resumes.
+
+    One JSON file per transcript cache key in <cache root>/checkpoints, holding the
+    finished segments and whatever decoder state the engine needs to carry on
+    exactly where it stopped. Files are removed when their transcription completes
+    and forgotten after CHECKPOINT_MAX_AGE.
+    """
+
+    def __init__(self, root=None, interval=CHECKPOINT_INTERVAL):
+        self.root = root or os.path.join(default_cache_dir(), "checkpoints")
+        self.interval = interval
+        self._pruned = False
+
+    def open(self, key):
+        """A Checkpoint for key, with .state set to the saved state or None."""
+        return Checkpoint(self, key)
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ".json")
+
+    def load(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, key, state):
+        if not self._pruned:
+            self._pruned = True
+            self.prune()
+        _write_json_atomic(self._path(key), state)
+
+    def discard(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def prune(self, max_age=CHECKPOINT_MAX_AGE):
+        cutoff = time.time() - max_age
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+class Checkpoint:
+    """One transcription's checkpoint: update() as work completes, discard() when done."""
+
+    def __init__(self, store, key):
+        self.store = store
+        self.key = key
+        self.state = store.load(key)
+        self.writes = 0
+        self._pending = None
+        self._last_write = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, state):
+        """Remember the latest state; it reaches disk once the store's interval has passed."""
+        with self._lock:
+            self._pending = state
+            due = time.monotonic() - self._last_write >= self.store.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            state, self._pending = self._pending, None
+            self._last_write = time.monotonic()
+        if state is None:
+            return
+        try:
+            self.store.save(self.key, state)
+            self.writes += 1
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Warning: could not write transcription checkpoint: {e}")
+
+    def discard(self):
+        with self._lock:
+            self._pending = None
+        self.store.discard(self.key)
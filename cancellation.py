@@ -0,0 +1,65 @@
+# cancellation.py
+import threading
+
+
+class Cancelled(Exception):
+    """Raised inside a job's work once its CancelToken has been cancelled."""
+
+    def __init__(self, message="cancelled"):
+        super().__init__(message)
+
+
+class CancelToken:
+    """A job's cancellation flag: set from any thread, honoured by the code doing the work.
+
+    Cancellation is cooperative. Loops call check() between steps (a download
+    progress report, a decoded Whisper window), which raises Cancelled once
+    cancel() was called. Blocking calls that cannot check, such as an ffmpeg
+    subprocess, register on_cancel() callbacks that interrupt them instead.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # One failed interrupt must not keep the others from running
+                pass
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+    def on_cancel(self, callback):
+        """Run callback() when cancel() is called, or now if it was; returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+
+                def _remove():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+                return _remove
+        callback()
+        return lambda: None
+
+
+def check_cancelled(cancel):
+    """cancel.check() for an optional token."""
+    if cancel is not None:
+        cancel.check()
@@ -0,0 +1,184 @@
+# compare_models.py
+"""Speed and accuracy of each model size across compute types, on a fixed local audio set.
+
+The audio set is a folder of media files. A '<name>.txt' next to a file is taken
+as its reference transcript and scored by word error rate (WER). Every compute
+type is also compared with the first one given (fp32 by default), which shows how
+far quantization moves the output even where no reference exists.
+
+    python compare_models.py samples/                              # fp32 vs int8, tiny..turbo
+    python compare_models.py samples/ --models tiny,small --output quant.json
+    python compare_models.py samples/ --engine ctranslate2 --compute-types float32,int8
+"""
+import os
+import re
+import gc
+import sys
+import json
+import time
+import argparse
+
+from audio import SAMPLE_RATE, load_audio
+from engines import DEFAULT_ENGINE, ENGINES, check_options, get_engine
+
+DEFAULT_MODELS = ("tiny", "base", "small", "medium", "large-v3", "turbo")
+DEFAULT_COMPUTE_TYPES = ("fp32", "int8")
+MEDIA_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".opus", ".webm", ".mp4", ".mkv")
+
+_WORD_RE = re.compile(r"[\w']+")
+
+
+def normalize_words(text):
+    """Lowercased words without punctuation, the usual basis for WER."""
+    return _WORD_RE.findall(text.lower())
+
+
+def word_error_rate(reference, hypothesis):
+    """(substitutions + deletions + insertions) / reference words, by edit distance."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_audio_set(directory):
+    """[(name, samples, reference text or None)], sorted by name; decoded once up front."""
+    items = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in MEDIA_EXTENSIONS:
+            continue
+        reference = None
+        ref_path = os.path.join(directory, stem + ".txt")
+        if os.path.exists(ref_path):
+            with open(ref_path, "r", encoding="utf-8") as f:
+                reference = f.read()
+        items.append((name, load_audio(os.path.join(directory, name)), reference))
+    return items
+
+
+def compare(audio_set, models, compute_types, engine=DEFAULT_ENGINE, language="English", threads=None,
+            device="cpu"):
+    """One result row per (model, compute type); the first compute type is the baseline."""
+    engine = get_engine(engine)
+    audio_seconds = sum(len(samples) for _, samples, _ in audio_set) / SAMPLE_RATE
+    rows = []
+    for model_name in models:
+        baseline_texts = None
+        baseline_seconds = None
+        for compute_type in compute_types:
+            print(f"{model_name} / {compute_type}: loading...", file=sys.stderr)
+            started = time.perf_counter()
+            try:
+                model = engine.load(model_name, engine.device_for(compute_type, device), compute_type, threads)
+            except Exception as e:
+                print(f"{model_name} / {compute_type}: skipped, {e}", file=sys.stderr)
+                rows.append({"model": model_name, "compute_type": compute_type, "error": str(e)})
+                continue
+            row = {"model": model_name, "compute_type": compute_type,
+                   "load_seconds": round(time.perf_counter() - started, 3),
+                   "model_mb": round(engine.nbytes(model) / 1048576, 1)}
+            texts = []
+            seconds = 0.0
+            for name, samples, _ in audio_set:
+                started = time.perf_counter()
+                result = engine.transcribe(model, samples, language, compute_type, verbose=None, threads=threads)
+                seconds += time.perf_counter() - started
+                texts.append(result.get("text", ""))
+            row["transcribe_seconds"] = round(seconds, 3)
+            row["real_time_factor"] = round(seconds / audio_seconds, 4) if audio_seconds else None
+            scored = [(ref, text) for (_, _, ref), text in zip(audio_set, texts) if ref is not None]
+            if scored:
+                row["wer"] = round(_pooled_wer(scored), 4)
+            if baseline_texts is None:
+                baseline_texts, baseline_seconds = texts, seconds
+            else:
+                row["speedup"] = round(baseline_seconds / seconds, 2) if seconds else None
+                row["wer_vs_baseline"] = round(_pooled_wer(list(zip(baseline_texts, texts))), 4)
+            rows.append(row)
+            print(f"{model_name} / {compute_type}: {seconds:.1f} s for {audio_seconds:.0f} s of audio",
+                  file=sys.stderr)
+            # Only one model in memory at a time; large-v3 in fp32 alone takes ~6 GB
+            del model
+            gc.collect()
+    return rows
+
+
+def _pooled_wer(pairs):
+    """WER over all files together, weighting each by its reference length."""
+    errors = words = 0
+    for reference, hypothesis in pairs:
+        n = len(normalize_words(reference))
+        errors += word_error_rate(reference, hypothesis) * max(n, 1)
+        words += max(n, 1)
+    return errors / words if words else 0.0
+
+
+def format_table(rows):
+    header = f"{'model':<10} {'type':<14} {'load s':>8} {'MB':>8} {'RTF':>8} {'speedup':>8} {'WER':>7} {'vs base':>8}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        if row.get("error"):
+            lines.append(f"{row['model']:<10} {row['compute_type']:<14} skipped: {row['error']}")
+            continue
+
+        def _num(key, fmt, width, suffix=""):
+            value = row.get(key)
+            return (format(value, fmt) + suffix if value is not None else "-").rjust(width)
+        lines.append(f"{row['model']:<10} {row['compute_type']:<14} {_num('load_seconds', '.2f', 8)} "
+                     f"{_num('model_mb', '.0f', 8)} {_num('real_time_factor', '.3f', 8)} "
+                     f"{_num('speedup', '.2f', 8, 'x')} {_num('wer', '.1%', 7)} {_num('wer_vs_baseline', '.1%', 8)}")
+    return "\n".join(lines)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="compare_models.py",
+                                     description="Compare speed and accuracy across models and compute types.")
+    parser.add_argument("audio_dir", help="Folder of media files, each optionally with a '<name>.txt' reference")
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS),
+                        help=f"Comma-separated model names (default: {','.join(DEFAULT_MODELS)})")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE, choices=list(ENGINES),
+                        help=f"Inference engine (default: {DEFAULT_ENGINE})")
+    parser.add_argument("--compute-types", default=",".join(DEFAULT_COMPUTE_TYPES),
+                        help="Comma-separated compute types; the first is the baseline "
+                             f"(default: {','.join(DEFAULT_COMPUTE_TYPES)})")
+    parser.add_argument("-l", "--language", default="English", help="Spoken language (default: English)")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads for inference")
+    parser.add_argument("--output", help="Also write the rows as JSON to this file")
+    return parser
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    compute_types = [c.strip() for c in args.compute_types.split(",") if c.strip()]
+    try:
+        for compute_type in compute_types:
+            check_options(args.engine, compute_type, args.threads)
+    except ValueError as e:
+        parser.error(str(e))
+    audio_set = load_audio_set(args.audio_dir)
+    if not audio_set:
+        parser.error(f"no media files in {args.audio_dir}")
+    print(f"{len(audio_set)} file(s), {sum(1 for *_, ref in audio_set if ref is not None)} with a reference.",
+          file=sys.stderr)
+
+    rows = compare(audio_set, models, compute_types, args.engine, args.language, args.threads)
+    print(format_table(rows))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"audio_dir": os.path.abspath(args.audio_dir), "engine": args.engine,
+                       "files": [name for name, _, _ in audio_set], "rows": rows}, f, indent=2)
+            f.write("\n")
+    return 0 if any(not row.get("error") for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
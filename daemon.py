@@ -0,0 +1,626 @@
+# daemon.py
+import os
+import sys
+import json
+import time
+import hmac
+import argparse
+import secrets
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import error as urlerror
+from urllib import request as urlrequest
+from urllib.parse import urlparse
+
+import main
+from cache import default_cache_dir
+from engines import DEFAULT_ENGINE, ENGINES, check_options
+from exporters import DEFAULT_JSON_MODE, JSON_MODES
+from metrics import JobMetrics
+from pipeline import FINAL_STATUSES, Job, Pipeline
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_URL = os.environ.get("RUMBLE_DAEMON_URL", f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+MAX_FINISHED_JOBS = 500  # finished jobs kept for status queries; oldest are forgotten first
+MAX_REQUEST_BYTES = 1 << 20
+# Clients prove they may use the API with this header; the token is in token_path(port)
+TOKEN_HEADER = "X-Rumble-Token"
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+OUTPUT_CONTENT_TYPES = {
+    "json": "application/json",
+    "srt": "application/x-subrip",
+    "vtt": "text/vtt",
+    "tsv": "text/tab-separated-values",
+}
+
+
+class TranscriptionService:
+    """Long-running job queue around download_video() and transcribe().
+
+    Jobs go through a Pipeline that stays open for the life of the service, and
+    models stay resident in main.MODEL_REGISTRY between jobs. Every job carries
+    its own options (model, formats, range, ...), falling back to the service
+    defaults.
+    """
+
+    def __init__(self, output_dir, model="turbo", language="English", download_jobs=2,
+                 transcribe_jobs=1, use_cache=True, engine=None, compute_type=None, threads=None,
+                 vad=False):
+        self.output_dir = os.path.abspath(output_dir)
+        self.model = model
+        self.engine, self.compute_type, self.threads = check_options(engine, compute_type, threads)
+        self.language = language
+        self.use_cache = use_cache
+        self.vad = vad
+        self.started_at = time.time()
+        self.jobs = OrderedDict()  # index -> Job
+        self._lock = threading.Lock()
+        self._next_index = 1
+        self.pipeline = Pipeline(self._download, self._transcribe, download_workers=download_jobs,
+                                 transcribe_workers=transcribe_jobs, on_update=self._on_update)
+        self.pipeline.start()
+
+    def submit(self, payload):
+        """Queue a job from a request payload; raises ValueError for bad options."""
+        options = self._job_options(payload)
+        source = options.pop("source")
+        with self._lock:
+            index = self._next_index
+            self._next_index += 1
+            job = Job(index, source, is_local=os.path.isfile(source))
+            job.options = options
+            job.metrics = JobMetrics(job_id=str(index), source=source)
+            self.jobs[index] = job
+            self._forget_finished_locked()
+        print(f"Job {index} queued: {source}")
+        return self.pipeline.submit(job)
+
+    def get(self, index):
+        with self._lock:
+            return self.jobs.get(index)
+
+    def list(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def cancel(self, index):
+        """Cancel a queued or running job. Returns None if unknown, else False if it was already over."""
+        job = self.get(index)
+        if job is None:
+            return None
+        return self.pipeline.cancel(job)
+
+    def preload(self, model_name, engine=None, compute_type=None, threads=None):
+        """Load a model into the registry ahead of the jobs that need it.
+
+        The engine settings default to the service's; raises ValueError for bad ones.
+        """
+        engine, compute_type, threads = self._engine_options(
+            {"engine": engine, "compute_type": compute_type, "threads": threads})
+        started = time.perf_counter()
+        main.get_model(model_name, precision=compute_type, engine=engine, threads=threads)
+        return round(time.perf_counter() - started, 3)
+
+    def health(self):
+        with self._lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "output_dir": self.output_dir,
+            "default_model": self.model,
+            "default_engine": {"engine": self.engine, "compute_type": self.compute_type, "threads": self.threads},
+            "jobs": counts,
+            "models": main.MODEL_REGISTRY.info(),
+            "media_cache": main.MEDIA_CACHE.stats(),
+            "transcript_cache": main.TRANSCRIPT_CACHE.stats(),
+        }
+
+    def close(self):
+        # Running jobs stop at their next check; their checkpoints let them resume later
+        for job in self.list():
+            self.pipeline.cancel(job)
+        self.pipeline.close(wait=False)
+
+    def _job_options(self, payload):
+        if not isinstance(payload, dict):
+            raise ValueError("request body must be a JSON object")
+        source = str(payload.get("source") or "").strip()
+        if not source:
+            raise ValueError("'source' (a URL or local file path) is required")
+        if not source.startswith(("http://", "https://")):
+            if not os.path.isabs(source):
+                raise ValueError("local files must be given as absolute paths")
+            if not os.path.isfile(source):
+                raise ValueError(f"not a URL or existing file: {source}")
+
+        formats = payload.get("formats") or ["txt"]
+        if isinstance(formats, str):
+            formats = formats.split(",")
+        formats = [str(f).strip().lower() for f in formats if str(f).strip()]
+        if "all" in formats:
+            formats = list(main.TRANSCRIPT_FORMATS)
+        unknown = [f for f in formats if f not in main.TRANSCRIPT_FORMATS]
+        if unknown:
+            raise ValueError(f"unknown transcript format(s): {', '.join(unknown)}")
+
+        start_time = _parse_time(payload.get("start"))
+        end_time = _parse_time(payload.get("end"))
+        if start_time is not None and end_time is not None and end_time <= start_time:
+            raise ValueError("end time must be greater than start time")
+
+        download_format = payload.get("download_format") or "mp3_best"
+        if download_format not in main.DOWNLOAD_FORMATS:
+            raise ValueError(f"unknown download format: {download_format}")
+        json_mode = payload.get("json_mode") or DEFAULT_JSON_MODE
+        if json_mode not in JSON_MODES:
+            raise ValueError(f"unknown JSON mode: {json_mode}")
+
+        output_dir = self._output_dir(payload.get("output_dir"))
+
+        engine, compute_type, threads = self._engine_options(payload)
+
+        return {
+            "source": source,
+            "model": str(payload.get("model") or self.model),
+            "engine": engine,
+            "compute_type": compute_type,
+            "threads": threads,
+            "language": str(payload.get("language") or self.language),
+            "formats": formats,
+            "start": start_time,
+            "end": end_time,
+            "download_format": download_format,
+            "transcription_only": bool(payload.get("transcription_only", False)),
+            "json_mode": json_mode,
+            "vad": bool(self.vad if payload.get("vad") is None else payload["vad"]),
+            "output_dir": output_dir,
+        }
+
+    def _output_dir(self, requested):
+        """requested resolved against the service's output folder; it may not lead outside it."""
+        if not requested:
+            return self.output_dir
+        root = os.path.realpath(self.output_dir)
+        path = os.path.realpath(os.path.join(root, str(requested)))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"output_dir must be inside the service's output folder ({self.output_dir})")
+        return path
+
+    def _engine_options(self, payload):
+        engine = payload.get("engine") or self.engine
+        # A compute type or thread count only carries over along with the engine it was set for
+        same = engine == self.engine
+        compute_type = payload.get("compute_type") or (self.compute_type if same else None)
+        threads = payload.get("threads") or (self.threads if same else None)
+        return check_options(engine, compute_type, threads)
+
+    def _download(self, job):
+        opts = job.options
+        if not job.source.startswith(("http://", "https://")):
+            raise FileNotFoundError(f"Not a URL or existing file: {job.source}")
+        os.makedirs(opts["output_dir"], exist_ok=True)
+
+        def _on_progress(pct, downloaded, total, speed=None, eta=None, fragment_index=None, fragment_count=None):
+            job.progress = {"stage": "download", "percent": pct, "downloaded_bytes": downloaded,
+                            "total_bytes": total, "speed": speed, "eta": eta,
+                            "fragment_index": fragment_index, "fragment_count": fragment_count}
+
+        section = None
+        if opts["start"] is not None or opts["end"] is not None:
+            section = (opts["start"], opts["end"])
+        return main.download_video(job.source, opts["output_dir"], main.DOWNLOAD_FORMATS[opts["download_format"]],
+                                   use_cache=self.use_cache, transcription_only=opts["transcription_only"],
+                                   section=section, info_out=job.info, metrics=job.metrics,
+                                   progress_callback=_on_progress, cancel=job.cancel_token)
+
+    def _transcribe(self, job):
+        opts = job.options
+        os.makedirs(opts["output_dir"], exist_ok=True)
+        loaded = main.MODEL_REGISTRY.is_loaded(opts["model"], precision=opts["compute_type"],
+                                               engine=opts["engine"], threads=opts["threads"])
+        job.progress = {"stage": "transcribe" if loaded else "model", "percent": 0.0}
+
+        def _on_progress(pct, n, total):
+            job.progress = {"stage": "transcribe", "percent": float(pct or 0)}
+
+        outputs = main.transcribe(
+            job.media_path,
+            model_name=opts["model"],
+            lang=opts["language"],
+            formats=opts["formats"],
+            start_time=opts["start"],
+            end_time=opts["end"],
+            progress_callback=_on_progress,
+            output_dir=opts["output_dir"],
+            use_cache=self.use_cache,
+            time_offset=job.info.get("media_offset", 0.0),
+            metrics=job.metrics,
+            json_mode=opts["json_mode"],
+            engine=opts["engine"],
+            compute_type=opts["compute_type"],
+            threads=opts["threads"],
+            vad=opts["vad"],
+            cancel=job.cancel_token,
+        )
+        main.remember_transcribed(job.info, opts["model"], outputs)
+        return outputs
+
+    def _on_update(self, job):
+        if job.status in FINAL_STATUSES:
+            main.release_media(job.info)
+        if job.status == "done":
+            job.progress = {"stage": "done", "percent": 100.0}
+        print(f"Job {job.index} {job.status}: {job.source}")
+
+    def _forget_finished_locked(self):
+        finished = [index for index, job in self.jobs.items() if job.status in FINAL_STATUSES]
+        for index in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[index]
+
+
+def _parse_time(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    seconds = main.parse_timestamp(str(value))
+    if seconds is None:
+        raise ValueError(f"bad time {value!r}: use HH:MM:SS or seconds")
+    return seconds
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON API:
+
+    GET    /health                      service state, resident models, cache stats
+    GET    /jobs                        all known jobs
+    POST   /jobs                        queue a job (source, model, formats, start, end, ...)
+    GET    /jobs/<id>                   one job: status, progress, outputs, error, metrics
+    GET    /jobs/<id>/outputs/<fmt>     contents of a finished transcript file
+    DELETE /jobs/<id>                   cancel a job; a running one stops within seconds
+    POST   /models                      load {"model": name, "engine": ...} ahead of time
+    """
+
+    server_version = "RumbleTranscriber"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        if not self._allowed():
+            return
+        parts = self._parts()
+        if parts == ["health"]:
+            return self._send_json(200, self.service.health())
+        if parts == ["jobs"]:
+            return self._send_json(200, {"jobs": [job.to_dict() for job in self.service.list()]})
+        job = self._job(parts)
+        if job is None:
+            return
+        if len(parts) == 2:
+            return self._send_json(200, job.to_dict())
+        if len(parts) == 4 and parts[2] == "outputs":
+            return self._send_output(job, parts[3].lower())
+        self._send_error(404, "not found")
+
+    def do_POST(self):
+        if not self._allowed(body=True):
+            return
+        parts = self._parts()
+        try:
+            payload = self._read_json()
+        except ValueError as e:
+            return self._send_error(400, str(e))
+        if parts == ["jobs"]:
+            try:
+                job = self.service.submit(payload)
+            except ValueError as e:
+                return self._send_error(400, str(e))
+            return self._send_json(201, job.to_dict())
+        if parts == ["models"]:
+            model_name = payload.get("model") if isinstance(payload, dict) else None
+            if not model_name:
+                return self._send_error(400, "'model' is required")
+            try:
+                seconds = self.service.preload(str(model_name), payload.get("engine"),
+                                               payload.get("compute_type"), payload.get("threads"))
+            except ValueError as e:
+                return self._send_error(400, str(e))
+            except RuntimeError as e:
+                return self._send_error(500, str(e))
+            return self._send_json(200, {"model": model_name, "seconds": seconds,
+                                         "models": main.MODEL_REGISTRY.info()})
+        self._send_error(404, "not found")
+
+    def do_DELETE(self):
+        if not self._allowed():
+            return
+        parts = self._parts()
+        if len(parts) != 2:
+            return self._send_error(404, "not found")
+        job = self._job(parts)
+        if job is None:
+            return
+        if not self.service.cancel(job.index):
+            return self._send_error(409, f"job {job.index} is already {job.status}")
+        self._send_json(200, job.to_dict())
+
+    def log_message(self, format, *args):
+        # Clients poll job status; only log requests that change something
+        if self.command != "GET":
+            super().log_message(format, *args)
+
+    def _allowed(self, body=False):
+        """Turn away requests a web page could have made on the user's behalf.
+
+        A page can post plain text to localhost without a CORS preflight, and reach
+        the port under its own host name through DNS rebinding. Neither can know the
+        token, name an allowed Host, or send a JSON content type without a preflight.
+        """
+        host = (self.headers.get("Host") or "").lower()
+        if host not in self.server.allowed_hosts:
+            self._send_error(403, f"host '{host}' is not allowed")
+            return False
+        token = self.headers.get(TOKEN_HEADER) or ""
+        if not hmac.compare_digest(token.encode("utf-8"), self.server.token.encode("utf-8")):
+            self._send_error(401, f"missing or wrong {TOKEN_HEADER} header")
+            return False
+        if body:
+            content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+            if content_type != "application/json":
+                self._send_error(415, "request body must be application/json")
+                return False
+        return True
+
+    def _parts(self):
+        return [p for p in urlparse(self.path).path.split("/") if p]
+
+    def _job(self, parts):
+        if len(parts) < 2 or parts[0] != "jobs":
+            self._send_error(404, "not found")
+            return None
+        try:
+            job = self.service.get(int(parts[1]))
+        except ValueError:
+            job = None
+        if job is None:
+            self._send_error(404, f"no job {parts[1]}")
+        return job
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            raise ValueError("request body too large")
+        body = self.rfile.read(length) if length else b"{}"
+        try:
+            return json.loads(body.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f"invalid JSON: {e}")
+
+    def _send_output(self, job, fmt):
+        if job.status != "done":
+            return self._send_error(409, f"job {job.index} is {job.status}")
+        path = next((p for p in job.outputs if p.lower().endswith("." + fmt)), None)
+        if path is None:
+            return self._send_error(404, f"job {job.index} has no {fmt} output")
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            return self._send_error(410, f"cannot read {path}: {e}")
+        self._send(200, data, OUTPUT_CONTENT_TYPES.get(fmt, "text/plain") + "; charset=utf-8")
+
+    def _send_json(self, status, obj):
+        self._send(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def _send_error(self, status, message):
+        self._send_json(status, {"error": message})
+
+    def _send(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def token_path(port=DEFAULT_PORT):
+    return os.path.join(default_cache_dir(), f"daemon-{port}.token")
+
+
+def write_token(port, token=None):
+    """Store a new API token (readable by this user only) for the daemon on port; returns it."""
+    token = token or secrets.token_urlsafe(32)
+    path = token_path(port)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    return token
+
+
+def read_token(port=DEFAULT_PORT):
+    """$RUMBLE_DAEMON_TOKEN, else the token the daemon on port wrote at start-up, else None."""
+    token = os.environ.get("RUMBLE_DAEMON_TOKEN")
+    if token:
+        return token
+    try:
+        with open(token_path(port), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+    """An HTTP server for service; requests must carry token in the TOKEN_HEADER header.
+
+    Without a token one is generated and written to token_path() for clients to read.
+    Only Host headers naming a local address (or host itself) with the bound port pass.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    port = server.server_address[1]
+    server.token = token or write_token(port)
+    names = set(LOCAL_HOSTS) | {host.lower() if ":" not in host else f"[{host.lower()}]"}
+    server.allowed_hosts = {f"{name}:{port}" for name in names}
+    return server
+
+
+class DaemonClient:
+    """Small client for the daemon's HTTP API. Failures raise RuntimeError.
+
+    token defaults to read_token() for the URL's port, so a daemon started by the
+    same user on this machine needs no configuration.
+    """
+
+    def __init__(self, url=DEFAULT_URL, timeout=10.0, token=None):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.token = token
+
+    def _token(self):
+        if self.token is None:
+            self.token = read_token(urlparse(self.url).port or DEFAULT_PORT)
+        return self.token
+
+    def health(self, timeout=None):
+        return self._request("GET", "/health", timeout=timeout)
+
+    def is_available(self):
+        try:
+            self.health(timeout=1.0)
+            return True
+        except RuntimeError:
+            return False
+
+    def submit(self, source, **options):
+        """Queue a job; options are model, engine, compute_type, threads, formats, start, end,
+        language, download_format, transcription_only, json_mode, vad and output_dir. Returns the job record."""
+        payload = {"source": source}
+        payload.update({k: v for k, v in options.items() if v is not None})
+        return self._request("POST", "/jobs", payload)
+
+    def job(self, index):
+        return self._request("GET", f"/jobs/{index}")
+
+    def jobs(self):
+        return self._request("GET", "/jobs")["jobs"]
+
+    def cancel(self, index):
+        return self._request("DELETE", f"/jobs/{index}")
+
+    def output(self, index, fmt):
+        """Text of one finished transcript format."""
+        return self._request("GET", f"/jobs/{index}/outputs/{fmt}", raw=True).decode("utf-8")
+
+    def preload(self, model_name, engine=None, compute_type=None, threads=None):
+        """Ask the daemon to load a model; blocks until it is resident."""
+        payload = {"model": model_name, "engine": engine, "compute_type": compute_type, "threads": threads}
+        return self._request("POST", "/models", {k: v for k, v in payload.items() if v is not None}, timeout=None)
+
+    def wait(self, index, poll_interval=0.5, callback=None):
+        """Poll a job until it finishes; callback(job) sees every poll. Returns the job."""
+        while True:
+            job = self.job(index)
+            if callback:
+                callback(job)
+            if job["status"] in FINAL_STATUSES:
+                return job
+            time.sleep(poll_interval)
+
+    def _request(self, method, path, payload=None, timeout=-1, raw=False):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        req = urlrequest.Request(self.url + path, data=data, method=method)
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        token = self._token()
+        if token:
+            req.add_header(TOKEN_HEADER, token)
+        kwargs = {} if timeout is None else {"timeout": self.timeout if timeout == -1 else timeout}
+        try:
+            with urlrequest.urlopen(req, **kwargs) as resp:
+                body = resp.read()
+        except urlerror.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8")).get("error")
+            except Exception:
+                message = None
+            raise RuntimeError(f"Transcription service error {e.code}: {message or e.reason}")
+        except (urlerror.URLError, OSError) as e:
+            raise RuntimeError(f"Transcription service at {self.url} is not reachable: {e}")
+        return body if raw else json.loads(body.decode("utf-8"))
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Run the transcriber as a local service with an HTTP job API.")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help=f"Address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("-o", "--output-dir", default=".",
+                        help="Folder for media and transcripts; jobs may only name folders inside it (default: .)")
+    parser.add_argument("-m", "--model", default="turbo", help="Default Whisper model (default: turbo)")
+    parser.add_argument("-l", "--language", default="English", help="Default spoken language (default: English)")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE, choices=list(ENGINES),
+                        help=f"Default inference engine (default: {DEFAULT_ENGINE})")
+    parser.add_argument("--compute-type", help="Default compute type for --engine (default: the engine's)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Default CPU threads for inference (default: the library's own choice)")
+    parser.add_argument("--vad", action="store_true",
+                        help="Transcribe only the speech found by voice activity detection, unless a job says otherwise")
+    parser.add_argument("--preload", action="append", default=[], metavar="MODEL",
+                        help="Load this model at start-up (repeatable)")
+    parser.add_argument("--download-jobs", type=int, default=2, help="Concurrent downloads (default: 2)")
+    parser.add_argument("--transcribe-jobs", type=int, default=1, help="Concurrent transcriptions (default: 1)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the media and transcript caches")
+    return parser
+
+
+def run_daemon(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    try:
+        service = TranscriptionService(args.output_dir, model=args.model, language=args.language,
+                                       download_jobs=args.download_jobs, transcribe_jobs=args.transcribe_jobs,
+                                       use_cache=not args.no_cache, engine=args.engine,
+                                       compute_type=args.compute_type, threads=args.threads,
+                                       vad=args.vad)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        server = make_server(service, args.host, args.port)
+    except OSError as e:
+        print(f"Error: cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 1
+    for model_name in args.preload:
+        threading.Thread(target=main._warm_model,
+                         args=(model_name, service.engine, service.compute_type, service.threads),
+                         daemon=True).start()
+    print(f"Transcription service listening on http://{args.host}:{args.port} "
+          f"(output folder {service.output_dir}, API token in {token_path(server.server_address[1])})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        try:
+            os.remove(token_path(server.server_address[1]))
+        except OSError:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_daemon())
@@ -0,0 +1,486 @@
+# engines.py
+import os
+import sys
+import inspect
+import threading
+from contextlib import contextmanager
+
+from audio import SAMPLE_RATE
+from cancellation import check_cancelled
+
+DEFAULT_ENGINE = "whisper"
+# Whisper's mel hop; its 'seek' positions are counted in these frames
+_HOP_LENGTH = 160
+# openai-whisper's default temperature fallback schedule, shared by every engine
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+
+class InferenceEngine:
+    """Loads speech models and turns audio into a Whisper-style result dict.
+
+    transcribe() returns {"text", "segments", "language"} with segments shaped like
+    openai-whisper's: id, seek, start, end, text, tokens, temperature, avg_logprob,
+    compression_ratio, no_speech_prob and, when the engine produced them, words.
+    Transcript packing, the caches and the writers never need to know which
+    engine ran.
+
+    compute_types lists the accepted compute types. Models are cached per compute
+    type, and per thread count for engines that fix it at load time.
+
+    A resumable engine hands its decoder state to checkpoint_callback as it goes and
+    accepts that state back as resume= to carry on with identical output.
+    """
+
+    name = None
+    compute_types = ()
+    threads_at_load = False
+    resumable = False
+
+    def default_compute_type(self, device):
+        return self.compute_types[0]
+
+    def device_for(self, compute_type, device):
+        """Device a model with this compute type actually runs on."""
+        return device
+
+    def load(self, model_name, device, compute_type, threads=None):
+        raise NotImplementedError
+
+    def nbytes(self, model):
+        """Rough resident size of a loaded model, for the registry's memory budget."""
+        return 0
+
+    def transcribe(self, model, audio, language, compute_type, verbose=False, threads=None,
+                   progress_callback=None, segment_callback=None, resume=None, checkpoint_callback=None,
+                   cancel=None):
+        """Transcribe a float32 16 kHz array.
+
+        progress_callback(percent, current, total) and segment_callback(new_segments)
+        behave as in main.transcribe(). Engines that are not resumable ignore resume
+        and checkpoint_callback. cancel (a cancellation.CancelToken) is checked at
+        least once per decoded window or segment, raising Cancelled.
+        """
+        raise NotImplementedError
+
+
+class WhisperEngine(InferenceEngine):
+    """openai-whisper on PyTorch: fp32 on CPU, fp16 on CUDA.
+
+    int8 applies PyTorch's dynamic quantization to the linear layers (see
+    quantize.py). It runs on CPU only and is cached on disk after the first load.
+    """
+
+    name = "whisper"
+    compute_types = ("fp32", "fp16", "int8")
+    resumable = True
+
+    def default_compute_type(self, device):
+        return "fp16" if device.startswith("cuda") else "fp32"
+
+    def device_for(self, compute_type, device):
+        # PyTorch's dynamically quantized kernels exist for CPU only
+        return "cpu" if compute_type == "int8" else device
+
+    def load(self, model_name, device, compute_type, threads=None):
+        if compute_type == "int8":
+            from quantize import load_quantized
+            return load_quantized(model_name)[0]
+        import whisper
+        return whisper.load_model(model_name, device=device)
+
+    def nbytes(self, model):
+        try:
+            from quantize import quantized_nbytes
+            # state_dict() also sees the packed weights of quantized layers
+            return quantized_nbytes(model)
+        except Exception:
+            return 0
+
+    def transcribe(self, model, audio, language, compute_type, verbose=False, threads=None,
+                   progress_callback=None, segment_callback=None, resume=None, checkpoint_callback=None,
+                   cancel=None):
+        """See InferenceEngine.transcribe().
+
+        The checkpoint state is Whisper's own loop state: the seek position in mel
+        frames, the segments so far and the prompt carried into the next window.
+        Resuming restores all of it, so decoding continues exactly as it would have.
+        Needs a whisper release with clip_timestamps; older ones start over.
+        """
+        if threads:
+            import torch
+            # Process-wide in torch; jobs running side by side share the setting
+            torch.set_num_threads(int(threads))
+        kwargs = {"language": language, "verbose": verbose, "fp16": compute_type == "fp16"}
+        if resume and not _accepts(model.transcribe, "clip_timestamps"):
+            print("Warning: this whisper version cannot resume; transcribing from the start.")
+            resume = None
+        if resume:
+            kwargs["clip_timestamps"] = [resume["seek"] * _HOP_LENGTH / SAMPLE_RATE]
+        if not (progress_callback or segment_callback or resume or checkpoint_callback or cancel):
+            return model.transcribe(audio, **kwargs)
+        try:
+            with _whisper_tqdm_bridge(progress_callback, segment_callback, resume, checkpoint_callback, cancel):
+                result = model.transcribe(audio, **kwargs)
+        except _ResumeFailed as e:
+            print(f"Warning: could not restore the checkpoint ({e}); transcribing from the start.")
+            resume = None
+            del kwargs["clip_timestamps"]
+            with _whisper_tqdm_bridge(progress_callback, segment_callback, None, checkpoint_callback, cancel):
+                result = model.transcribe(audio, **kwargs)
+        if resume:
+            # Whisper joins its text from the tokens it decoded itself; include the restored ones
+            result["text"] = _whisper_text(model, result["segments"])
+        return result
+
+
+class CTranslate2Engine(InferenceEngine):
+    """Whisper converted to CTranslate2, run through faster-whisper.
+
+    int8 weights with an int8 CPU kernel path: several times faster than PyTorch
+    fp32 on machines without a GPU, at a small accuracy cost. Decoding follows
+    openai-whisper's defaults (greedy with the temperature fallback) so both engines
+    give comparable transcripts.
+    """
+
+    name = "ctranslate2"
+    compute_types = ("int8", "int8_float32", "float32", "int8_float16", "float16")
+    threads_at_load = True
+    # Size in memory relative to the float16 weights faster-whisper downloads
+    _SIZE_FACTORS = {"int8": 0.5, "int8_float32": 0.5, "int8_float16": 0.5, "float16": 1.0, "float32": 2.0}
+
+    def default_compute_type(self, device):
+        return "float16" if device.startswith("cuda") else "int8"
+
+    def load(self, model_name, device, compute_type, threads=None):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("the ctranslate2 engine needs faster-whisper (pip install faster-whisper)")
+        model = WhisperModel(model_name, device=device, compute_type=compute_type, cpu_threads=int(threads or 0))
+        model.rumble_nbytes = self._estimate_nbytes(model_name, compute_type)
+        return model
+
+    def _estimate_nbytes(self, model_name, compute_type):
+        try:
+            from faster_whisper.utils import download_model
+            path = model_name if os.path.isdir(model_name) else download_model(model_name, local_files_only=True)
+            size = os.path.getsize(os.path.join(path, "model.bin"))
+        except Exception:
+            return 0
+        return int(size * self._SIZE_FACTORS.get(compute_type, 1.0))
+
+    def nbytes(self, model):
+        return getattr(model, "rumble_nbytes", 0)
+
+    def transcribe(self, model, audio, language, compute_type, verbose=False, threads=None,
+                   progress_callback=None, segment_callback=None, resume=None, checkpoint_callback=None,
+                   cancel=None):
+        segments_iter, info = model.transcribe(
+            audio,
+            language=_language_code(language),
+            task="transcribe",
+            beam_size=1,
+            best_of=5,
+            temperature=list(TEMPERATURES),
+            condition_on_previous_text=True,
+            vad_filter=False,
+        )
+        duration = float(getattr(info, "duration", 0.0) or len(audio) / SAMPLE_RATE)
+        segments = []
+        texts = []
+        _report(progress_callback, 0.0, duration)
+        # Segments are decoded lazily as the iterator is consumed
+        for seg in segments_iter:
+            check_cancelled(cancel)
+            segment = {
+                "id": len(segments),
+                "seek": int(seg.seek),
+                "start": float(seg.start),
+                "end": float(seg.end),
+                "text": seg.text,
+                "tokens": list(seg.tokens),
+                "temperature": float(seg.temperature) if seg.temperature is not None else 0.0,
+                "avg_logprob": float(seg.avg_logprob),
+                "compression_ratio": float(seg.compression_ratio),
+                "no_speech_prob": float(seg.no_speech_prob),
+            }
+            if seg.words:
+                segment["words"] = [{"word": w.word, "start": float(w.start), "end": float(w.end),
+                                     "probability": float(w.probability)} for w in seg.words]
+            segments.append(segment)
+            texts.append(seg.text)
+            if verbose:
+                print(f"[{segment['start']:.2f} --> {segment['end']:.2f}]{seg.text}")
+            if segment_callback:
+                segment_callback([segment])
+            _report(progress_callback, segment["end"], duration)
+        _report(progress_callback, duration, duration)
+        return {"text": "".join(texts), "segments": segments, "language": info.language}
+
+
+def _accepts(func, parameter):
+    try:
+        return parameter in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _whisper_text(model, segments):
+    from whisper.tokenizer import get_tokenizer
+    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages)
+    return tokenizer.decode([t for seg in segments for t in seg["tokens"]])
+
+
+def _report(progress_callback, position, duration):
+    if progress_callback is None:
+        return
+    try:
+        total = int(duration * 100)
+        n = min(int(position * 100), total)
+        progress_callback(int(n * 100 / total) if total else 0, n, total)
+    except Exception:
+        # Never let UI progress reporting break transcription
+        pass
+
+
+def _language_code(language):
+    """'English' -> 'en'; codes pass through. faster-whisper only takes codes."""
+    if not language:
+        return None
+    lang = language.strip().lower()
+    if len(lang) <= 3:
+        return lang
+    try:
+        from whisper.tokenizer import TO_LANGUAGE_CODE
+    except ImportError:
+        TO_LANGUAGE_CODE = {"english": "en"}
+    code = TO_LANGUAGE_CODE.get(lang)
+    if code is None:
+        raise ValueError(f"unknown language '{language}'; give its code (e.g. 'en') instead")
+    return code
+
+
+# Locals of whisper's transcribe() loop that a checkpoint captures and restores
+_WHISPER_LOOP_STATE = ("seek", "all_segments", "all_tokens", "prompt_reset_since")
+
+# Callbacks of the Whisper decode running on each thread, set by _whisper_tqdm_bridge
+_bridge_hooks = threading.local()
+_bridge_lock = threading.Lock()
+# Decodes inside a bridge right now, and the tqdm attributes the proxy replaced
+_bridge_users = 0
+_bridge_saved = None
+
+
+class _ResumeFailed(Exception):
+    """Whisper's loop did not look as expected, so a checkpoint cannot be restored into it."""
+
+
+class _BridgeHooks:
+    def __init__(self, progress_cb, segment_cb, resume, state_cb, cancel):
+        self.progress_cb = progress_cb
+        self.segment_cb = segment_cb
+        self.resume = resume
+        self.state_cb = state_cb
+        self.cancel = cancel
+
+
+class _TqdmBridge:
+    """Mixed into tqdm while any bridge is active.
+
+    A bar picks up the hooks of the thread that creates it, so decodes running side
+    by side each see only their own loop; bars created anywhere else stay plain tqdm.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hooks = getattr(_bridge_hooks, "current", None)
+        self._segments_seen = 0
+        self._state_warned = False
+        if self._hooks is None:
+            return
+        if self._hooks.resume:
+            resume, self._hooks.resume = self._hooks.resume, None
+            self._restore(sys._getframe(1), resume)
+        self._emit()
+
+    def _restore(self, caller, resume):
+        loop = caller.f_locals
+        missing = [name for name in _WHISPER_LOOP_STATE if name not in loop]
+        if missing:
+            raise _ResumeFailed(f"whisper's transcribe() has no local {', '.join(missing)}")
+        segments, tokens = loop["all_segments"], loop["all_tokens"]
+        if loop["seek"] != resume["seek"] or segments != [] or not isinstance(tokens, list) or tokens:
+            raise _ResumeFailed("whisper did not start at the checkpoint")
+        # The lists are shared with the running frame, so filling them in place
+        # restores them; whisper resets prompt_reset_since only after a window,
+        # so the carried prompt goes in as the whole token list
+        segments.extend(resume["segments"])
+        tokens.extend(resume["prompt_tokens"])
+        self.n = resume["seek"]
+        segment_cb = self._hooks.segment_cb
+        if segment_cb and segments:
+            self._segments_seen = len(segments)
+            segment_cb(list(segments))
+
+    def update(self, n=1):
+        res = super().update(n)
+        hooks = self._hooks
+        if hooks is None:
+            return res
+        if hooks.segment_cb or hooks.state_cb:
+            caller = sys._getframe(1)
+            if hooks.segment_cb:
+                self._emit_segments(caller)
+            if hooks.state_cb:
+                self._emit_state(caller)
+        self._emit()
+        # Between windows, after the finished one reached the checkpoint
+        check_cancelled(hooks.cancel)
+        return res
+
+    def _emit_segments(self, caller):
+        segments = caller.f_locals.get("all_segments")
+        if not isinstance(segments, list) or len(segments) <= self._segments_seen:
+            return
+        new = segments[self._segments_seen:]
+        self._segments_seen = len(segments)
+        # Unlike progress, writer errors must surface: a transcript file is at stake
+        self._hooks.segment_cb(new)
+
+    def _emit_state(self, caller):
+        loop = caller.f_locals
+        missing = [name for name in _WHISPER_LOOP_STATE if name not in loop]
+        if missing:
+            if not self._state_warned:
+                self._state_warned = True
+                print(f"Warning: whisper's transcribe() has no local {', '.join(missing)}; "
+                      "progress is not checkpointed.")
+            return
+        tokens = loop["all_tokens"]
+        self._hooks.state_cb({"seek": int(loop["seek"]), "segments": list(loop["all_segments"]),
+                              "prompt_tokens": list(tokens[loop["prompt_reset_since"]:])})
+
+    def set_postfix(self, *args, **kwargs):
+        res = super().set_postfix(*args, **kwargs)
+        if self._hooks is not None:
+            self._emit()
+        return res
+
+    def _emit(self):
+        progress_cb = self._hooks.progress_cb
+        if progress_cb is None:
+            return
+        try:
+            total = int(self.total) if self.total else 0
+            n = int(self.n)
+            pct = int((n / total) * 100) if total else 0
+            progress_cb(pct, n, total)
+        except Exception:
+            # Never let UI progress reporting break transcription
+            pass
+
+
+def _install_tqdm_proxy(module):
+    global _bridge_users, _bridge_saved
+    with _bridge_lock:
+        if not _bridge_users:
+            orig_tqdm, orig_trange = module.tqdm, module.trange
+            proxy = type("_TqdmProxy", (_TqdmBridge, orig_tqdm), {})
+
+            def _trange_proxy(*args, **kwargs):
+                return proxy(range(*args), **kwargs)
+
+            _bridge_saved = (orig_tqdm, orig_trange)
+            module.tqdm, module.trange = proxy, _trange_proxy
+        _bridge_users += 1
+
+
+def _uninstall_tqdm_proxy(module):
+    global _bridge_users, _bridge_saved
+    with _bridge_lock:
+        _bridge_users -= 1
+        if not _bridge_users:
+            module.tqdm, module.trange = _bridge_saved
+            _bridge_saved = None
+
+
+@contextmanager
+def _whisper_tqdm_bridge(progress_cb=None, segment_cb=None, resume=None, state_cb=None, cancel=None):
+    """Hook the tqdm bar Whisper's transcribe() creates to forward its progress.
+
+    progress_cb signature: (percent:int, current:int, total:int)
+    segment_cb signature: (new_segments:list). Whisper advances its progress bar
+    right after appending a decoded window to its local `all_segments` list, so
+    each update hands the segments added since the previous one to segment_cb.
+
+    The same hook reaches the rest of Whisper's loop state. state_cb(state) gets a
+    checkpoint after every window, and a checkpoint given as resume is put back
+    into the loop when the bar is created, just before the first window (Whisper
+    itself starts that window at the checkpoint's seek, via clip_timestamps).
+    Whisper's last_speech_timestamp is assigned only after the bar exists, so it
+    cannot be restored; it only matters for word timestamps, which the engine
+    does not request.
+
+    cancel is checked after every window, so a cancelled job stops within one
+    30-second window of decoding.
+
+    tqdm.tqdm is replaced while any bridge is active and put back when the last
+    one exits; the callbacks are per thread, so concurrent decodes stay separate.
+    """
+    try:
+        import tqdm as _tqdm
+    except Exception:
+        # No tqdm available; just yield without patching
+        if resume:
+            raise _ResumeFailed("tqdm is not installed")
+        yield
+        return
+    previous = getattr(_bridge_hooks, "current", None)
+    _install_tqdm_proxy(_tqdm)
+    _bridge_hooks.current = _BridgeHooks(progress_cb, segment_cb, resume, state_cb, cancel)
+    try:
+        yield
+    finally:
+        _bridge_hooks.current = previous
+        _uninstall_tqdm_proxy(_tqdm)
+
+
+ENGINES = {}
+
+
+def register_engine(engine):
+    """Make an InferenceEngine instance selectable by its name."""
+    ENGINES[engine.name] = engine
+    return engine
+
+
+def get_engine(name=None):
+    if isinstance(name, InferenceEngine):
+        return name
+    engine = ENGINES.get(name or DEFAULT_ENGINE)
+    if engine is None:
+        raise ValueError(f"unknown inference engine '{name}' (choose from {', '.join(ENGINES)})")
+    return engine
+
+
+def check_options(engine=None, compute_type=None, threads=None):
+    """Validate user-supplied engine settings; returns (engine name, compute_type, threads).
+
+    compute_type and threads may be None for the engine's defaults. Raises ValueError.
+    """
+    engine = get_engine(engine)
+    if compute_type and compute_type not in engine.compute_types:
+        raise ValueError(f"engine '{engine.name}' has no compute type '{compute_type}' "
+                         f"(choose from {', '.join(engine.compute_types)})")
+    if threads is not None:
+        try:
+            threads = int(threads)
+        except (TypeError, ValueError):
+            raise ValueError(f"threads must be a whole number, not {threads!r}")
+        if threads < 1:
+            raise ValueError("threads must be at least 1")
+    return engine.name, compute_type or None, threads
+
+
+register_engine(WhisperEngine())
+register_engine(CTranslate2Engine())
@@ -0,0 +1,405 @@
+# exporters.py
+import os
+import json
+import time
+import itertools
+
+from transcript import Transcript
+
+# Characters a writer collects before handing them to the file in one write()
+BUFFER_CHARS = 1 << 16
+JSON_MODES = ("stream", "compact", "pretty")
+DEFAULT_JSON_MODE = "pretty"
+# Segment fields kept by the compact JSON mode
+_COMPACT_FIELDS = ("id", "start", "end", "text")
+
+
+def _clock(seconds):
+    """('HH:MM:SS', 'mmm', hours) for seconds, rounded to the millisecond."""
+    milliseconds = round(seconds * 1000.0)
+    if milliseconds < 0:
+        milliseconds = 0
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return "%02d:%02d:%02d" % (hours, minutes, secs), "%03d" % milliseconds, hours
+
+
+def format_timestamp(seconds_float, always_include_hours=False, decimal_marker=','):
+    if seconds_float is None: return f"00:00:00{decimal_marker}000"
+    try:
+        seconds_float = float(seconds_float)
+    except (ValueError, TypeError):
+        return f"00:00:00{decimal_marker}000"
+
+    hms, milliseconds, hours = _clock(seconds_float)
+    if not (always_include_hours or hours > 0):
+        hms = hms[3:]
+    return f"{hms}{decimal_marker}{milliseconds}"
+
+
+def shift_segment(seg, offset):
+    """Copy of a segment with its (and its words') timestamps moved by offset seconds."""
+    seg = dict(seg)
+    seg['start'] = seg.get('start', 0.0) + offset
+    seg['end'] = seg.get('end', 0.0) + offset
+    if seg.get('words'):
+        seg['words'] = [dict(w, start=w.get('start', 0.0) + offset, end=w.get('end', 0.0) + offset)
+                        for w in seg['words']]
+    return seg
+
+
+class Cue:
+    """A segment prepared once for every format: offset applied and text stripped.
+
+    The clock forms of start/end are computed on first use and then shared, so SRT
+    and VTT format each timestamp once between them and TSV/JSON never pay for it.
+    segment is the Whisper-style dict, present only when a writer needs one.
+    """
+
+    __slots__ = ("index", "offset", "start", "end", "raw_text", "text", "segment",
+                 "_start_clock", "_end_clock")
+
+    def __init__(self, index, start, end, raw_text, offset=0.0, segment=None):
+        self.index = index
+        self.offset = offset
+        self.start = start + offset
+        self.end = end + offset
+        self.raw_text = raw_text
+        self.text = raw_text.strip()
+        self.segment = segment  # on the decoded (unshifted) timeline
+        self._start_clock = self._end_clock = None
+
+    @classmethod
+    def from_segment(cls, index, seg, offset=0.0):
+        return cls(index, seg.get('start', 0.0), seg.get('end', 0.0), seg.get('text', ""), offset, segment=seg)
+
+    def brief_segment(self):
+        """id/start/end/text (and words) without tokens or decoder statistics."""
+        return {key: self.segment[key] for key in _COMPACT_FIELDS + ("words",) if key in self.segment}
+
+    @property
+    def start_clock(self):
+        if self._start_clock is None:
+            self._start_clock = _clock(self.start)
+        return self._start_clock
+
+    @property
+    def end_clock(self):
+        if self._end_clock is None:
+            self._end_clock = _clock(self.end)
+        return self._end_clock
+
+    def shifted_segment(self):
+        """The original segment dict on the output timeline (copied only when shifted)."""
+        return shift_segment(self.segment, self.offset) if self.offset else self.segment
+
+
+def _srt_time(clock):
+    return f"{clock[0]},{clock[1]}"
+
+
+def _vtt_time(clock):
+    return f"{clock[0] if clock[2] else clock[0][3:]}.{clock[1]}"
+
+
+class FormatWriter:
+    """Writes one transcript format cue by cue.
+
+    Output collects in memory and reaches '<path>.part' in large writes; flush()
+    pushes it out so streamed files can be tailed while the job runs. finish()
+    writes any trailer and renames the file to its final path in one step.
+    Subclasses implement segment() (and optionally header()/footer()) with _put().
+    Writers that read cue.segment set segment_dicts to "brief" or "full".
+    """
+
+    segment_dicts = None
+
+    def __init__(self, path, **options):
+        self.path = path
+        self.part_path = path + ".part"
+        self.options = options
+        self.count = 0
+        self.seconds = 0.0  # time spent formatting and writing, for metrics
+        self._buf = []
+        self._buffered = 0
+        started = time.perf_counter()
+        self._f = open(self.part_path, "w", encoding="utf-8")
+        self.header()
+        self.seconds += time.perf_counter() - started
+
+    def _put(self, text):
+        self._buf.append(text)
+        self._buffered += len(text)
+        if self._buffered >= BUFFER_CHARS:
+            self._drain()
+
+    def _drain(self):
+        if self._buf:
+            self._f.write("".join(self._buf))
+            self._buf.clear()
+            self._buffered = 0
+
+    def header(self):
+        pass
+
+    def segment(self, cue):
+        raise NotImplementedError
+
+    def footer(self, transcript):
+        pass
+
+    def write(self, cues):
+        started = time.perf_counter()
+        for cue in cues:
+            self.count += 1
+            self.segment(cue)
+        self.seconds += time.perf_counter() - started
+
+    def flush(self):
+        started = time.perf_counter()
+        self._drain()
+        self._f.flush()
+        self.seconds += time.perf_counter() - started
+
+    def finish(self, transcript):
+        started = time.perf_counter()
+        self.footer(transcript)
+        self._drain()
+        self._f.close()
+        os.replace(self.part_path, self.path)
+        self.seconds += time.perf_counter() - started
+        return self.path
+
+    def abort(self, discard=False):
+        # After a crash the .part file is left behind on purpose: it holds everything
+        # decoded so far. discard=True (a cancelled job) removes it.
+        if not self._f.closed:
+            self._drain()
+            self._f.close()
+        if discard:
+            try:
+                os.remove(self.part_path)
+            except OSError:
+                pass
+
+
+class TxtWriter(FormatWriter):
+    """The segment texts back to back, stripped at both ends.
+
+    Trailing whitespace is held back until more text follows, since a streamed file
+    has already been flushed by the time the last segment is known.
+    """
+
+    def __init__(self, path, **options):
+        self._started = False
+        self._held = ""
+        super().__init__(path, **options)
+
+    def segment(self, cue):
+        text = cue.raw_text if self._started else cue.raw_text.lstrip()
+        body = text.rstrip()
+        if not body:
+            if self._started:
+                self._held += text
+            return
+        self._put(self._held + body)
+        self._held = text[len(body):]
+        self._started = True
+
+    def footer(self, transcript):
+        self._put("\n")
+
+
+class SrtWriter(FormatWriter):
+    def segment(self, cue):
+        self._put(f"{self.count}\n{_srt_time(cue.start_clock)} --> {_srt_time(cue.end_clock)}\n{cue.text}\n\n")
+
+
+class VttWriter(FormatWriter):
+    def header(self):
+        self._put("WEBVTT\n\n")
+
+    def segment(self, cue):
+        self._put(f"{_vtt_time(cue.start_clock)} --> {_vtt_time(cue.end_clock)}\n{cue.text}\n\n")
+
+
+class TsvWriter(FormatWriter):
+    def header(self):
+        self._put("start\tend\ttext\n")
+
+    def segment(self, cue):
+        text = cue.text.replace('\t', ' ')
+        self._put(f"{cue.start:.3f}\t{cue.end:.3f}\t{text}\n")
+
+
+class JsonWriter(FormatWriter):
+    """Writes {"segments": [...], "text": ..., "language": ...} without building it in memory.
+
+    json_mode picks the layout:
+      pretty  - the same text as json.dump(result, indent=2) (default); largest and slowest
+      stream  - every segment in full, one per line
+      compact - only id/start/end/text (and words), no whitespace; much smaller
+
+    pretty puts "text" first, like Whisper's result dict, when the writer is given
+    the finished transcript up front; while streaming the text is not known until
+    the end, so it follows the segments there.
+    """
+
+    def header(self):
+        self.mode = self.options.get("json_mode") or DEFAULT_JSON_MODE
+        if self.mode not in JSON_MODES:
+            raise ValueError(f"unknown JSON mode '{self.mode}' (expected one of {', '.join(JSON_MODES)})")
+        self.segment_dicts = "brief" if self.mode == "compact" else "full"
+        self._text_first = self.mode == "pretty" and self.options.get("result") is not None
+        if self._text_first:
+            text = json.dumps(self.options["result"].text or "", ensure_ascii=False)
+            self._put(f'{{\n  "text": {text},\n  "segments": [')
+        else:
+            self._put({"stream": '{"segments": [\n', "compact": '{"segments":[', "pretty": '{\n  "segments": ['}[self.mode])
+
+    def segment(self, cue):
+        if self.mode == "compact":
+            seg = cue.brief_segment()
+            seg["start"], seg["end"] = round(cue.start, 3), round(cue.end, 3)
+            if seg.get("words"):
+                seg["words"] = [{"word": w.get("word"), "start": round(w.get("start", 0.0) + cue.offset, 3),
+                                 "end": round(w.get("end", 0.0) + cue.offset, 3)}
+                                for w in seg["words"]]
+            self._put(("," if self.count > 1 else "") + json.dumps(seg, ensure_ascii=False, separators=(",", ":")))
+        elif self.mode == "pretty":
+            text = json.dumps(cue.shifted_segment(), indent=2, ensure_ascii=False).replace("\n", "\n    ")
+            self._put((",\n    " if self.count > 1 else "\n    ") + text)
+        else:
+            self._put((",\n" if self.count > 1 else "") + json.dumps(cue.shifted_segment(), ensure_ascii=False))
+
+    def footer(self, transcript):
+        text = json.dumps(transcript.text or "", ensure_ascii=False)
+        language = json.dumps(transcript.language, ensure_ascii=False)
+        if self.mode == "compact":
+            self._put(f'],"text":{text},"language":{language}}}\n')
+        elif self.mode == "pretty":
+            # json.dump's layout exactly: "[]" when empty, and no newline at the end
+            self._put("\n  ]" if self.count else "]")
+            if not self._text_first:
+                self._put(f',\n  "text": {text}')
+            self._put(f',\n  "language": {language}\n}}')
+        else:
+            self._put(f'\n], "text": {text}, "language": {language}}}\n')
+
+
+# Format name -> writer class; the file extension is the format name
+FORMAT_WRITERS = {
+    "txt": TxtWriter,
+    "srt": SrtWriter,
+    "vtt": VttWriter,
+    "tsv": TsvWriter,
+    "json": JsonWriter,
+}
+
+
+def register_format(name, writer_cls):
+    """Add (or replace) a transcript format; it is written in the same pass as the others."""
+    FORMAT_WRITERS[name] = writer_cls
+    return writer_cls
+
+
+class TranscriptExporter:
+    """Writes every selected format in a single pass over the segments.
+
+    Each segment becomes one Cue (offset applied and timestamps formatted once) that
+    all writers share. Segments can be added in batches as they are decoded; each
+    batch is flushed, so with streaming the '.part' files grow window by window.
+    Formats without a registered writer are ignored. result (a Transcript), when
+    the finished transcript is already known, lets writers put its text up front.
+    """
+
+    def __init__(self, output_dir, base_filename, formats, offset=0.0, json_mode=DEFAULT_JSON_MODE, result=None):
+        self.offset = float(offset or 0)
+        self.writers = []
+        self._next_index = 1
+        try:
+            for fmt in formats:
+                writer_cls = FORMAT_WRITERS.get(fmt)
+                if writer_cls:
+                    self.writers.append(writer_cls(os.path.join(output_dir, f"{base_filename}.{fmt}"),
+                                                   json_mode=json_mode, result=result))
+        except BaseException:
+            self.abort()
+            raise
+
+    def add_segments(self, segments, flush=True):
+        """Append Whisper segment dicts (as streamed from the decoder)."""
+        first = self._next_index
+        self._write([Cue.from_segment(first + i, seg, self.offset) for i, seg in enumerate(segments)], flush)
+
+    def add_transcript(self, transcript, flush=True):
+        """Append every segment of a Transcript, read straight from its columns."""
+        first = self._next_index
+        offset = self.offset
+        needs = {w.segment_dicts for w in self.writers}
+        if needs - {None}:
+            segments = transcript.segments(full="full" in needs)
+        else:
+            segments = itertools.repeat(None)  # no writer reads segment dicts; don't build them
+        cues = [Cue(first + i, start, end, text, offset, segment=seg)
+                for i, (start, end, text, seg) in enumerate(zip(transcript.start.tolist(), transcript.end.tolist(),
+                                                                transcript.texts(), segments))]
+        self._write(cues, flush)
+
+    def _write(self, cues, flush):
+        self._next_index += len(cues)
+        for writer in self.writers:
+            writer.write(cues)
+            if flush:
+                writer.flush()
+
+    def finalize(self, result):
+        """Close every format and move it into place; returns the final paths.
+
+        result supplies the full text and language (a Transcript or Whisper result dict).
+        """
+        transcript = result if isinstance(result, Transcript) else Transcript.from_result(
+            {"text": result.get("text"), "language": result.get("language")})
+        return [writer.finish(transcript) for writer in self.writers]
+
+    def abort(self, discard=False):
+        for writer in self.writers:
+            writer.abort(discard)
+
+
+def export_result(result, output_dir, base_filename, formats, offset=0.0, json_mode=DEFAULT_JSON_MODE):
+    """Write a finished Transcript (or Whisper result dict) in every format at once.
+
+    Returns the exporter's writers.
+    """
+    transcript = Transcript.from_result(result)
+    exporter = TranscriptExporter(output_dir, base_filename, formats, offset=offset, json_mode=json_mode,
+                                  result=transcript)
+    try:
+        exporter.add_transcript(transcript, flush=False)
+        exporter.finalize(transcript)
+    except BaseException:
+        exporter.abort()
+        raise
+    return exporter.writers
+
+
+def _write_single(writer_cls, segments, out_path):
+    writer = writer_cls(out_path)
+    try:
+        writer.write([Cue.from_segment(i, seg) for i, seg in enumerate(segments, 1)])
+        writer.finish(Transcript.from_result({}))
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def write_srt(segments, out_path):
+    _write_single(SrtWriter, segments, out_path)
+
+def write_vtt(segments, out_path):
+    _write_single(VttWriter, segments, out_path)
+
+def write_tsv(segments, out_path):
+    _write_single(TsvWriter, segments, out_path)
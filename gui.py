@@ -3,12 +3,21 @@ from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit,
     QPushButton, QFileDialog, QCheckBox, QHBoxLayout, QMessageBox, QProgressBar,
     QComboBox, QMenuBar, QAction, QDialog, QSpacerItem, QSizePolicy, QFormLayout,
-    QFrame, QStyle, QGraphicsDropShadowEffect, QLayout
+    QFrame, QStyle, QGraphicsDropShadowEffect, QLayout, QStatusBar, QSpinBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSettings
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal, QSettings, QTimer
 import main # Uses main.py
+import metrics
+import daemon
+import ingest
+import engines
+from cancellation import Cancelled
+from pipeline import FINAL_STATUSES, Job, Pipeline
 import sys
 import os # For os.path.basename in pick_dir
+import time
+import threading
 
 # Application identity used by QSettings
 ORG_NAME = "YourOrgName"
@@ -31,86 +40,451 @@ DEFAULT_MODEL_KEY = "turbo"
 DEFAULT_OUTPUT_FORMATS = ["txt"]
 
 DOWNLOAD_FORMAT_OPTIONS = {
-    "Audio: MP3 (Best Quality)": {"format_id": "mp3_best", "postprocessor_needed": True, "preferredcodec": "mp3", "output_ext": "mp3"},
-    "Audio: M4A (Best Quality, AAC)": {"format_id": "m4a_best", "postprocessor_needed": True, "preferredcodec": "m4a", "output_ext": "m4a"},
-    "Video: MP4 (Best Quality H.264/AAC)": {"format_id": "mp4_best_video", "postprocessor_needed": False, "output_ext": "mp4"},
-    "Video: MKV (Best Quality Original Codecs)": {"format_id": "mkv_best_video", "postprocessor_needed": False, "output_ext": "mkv"},
+    "Audio: MP3 (Best Quality)": main.DOWNLOAD_FORMATS["mp3_best"],
+    "Audio: M4A (Best Quality, AAC)": main.DOWNLOAD_FORMATS["m4a_best"],
+    "Video: MP4 (Best Quality H.264/AAC)": main.DOWNLOAD_FORMATS["mp4_best_video"],
+    "Video: MKV (Best Quality Original Codecs)": main.DOWNLOAD_FORMATS["mkv_best_video"],
+    "Audio: Native Stream (No Re-encode)": main.DOWNLOAD_FORMATS["native_audio"],
 }
 DEFAULT_DOWNLOAD_FORMAT_ID = "mp3_best"
+ENGINE_DESCRIPTIONS = {
+    "whisper":     "Whisper (PyTorch)",
+    "ctranslate2": "CTranslate2 (faster-whisper, fast int8 on CPU)",
+}
+# Queue concurrency: downloads are network-bound, transcriptions CPU/GPU-bound
+DEFAULT_DOWNLOAD_JOBS = 2
+DEFAULT_TRANSCRIBE_JOBS = 1
 
+# Share of the progress bar each stage gets (stages a job skips are left out)
+PROGRESS_WEIGHTS = {"download": 4, "model": 1, "transcribe": 5}
+PROGRESS_STEPS = 1000
+PROGRESS_INTERVAL = 0.25  # seconds between progress signals within a stage
 
-class WorkerThread(QThread):
-    progress = pyqtSignal(str)
-    transcription_progress = pyqtSignal(int, int)
-    finished = pyqtSignal(list)
-    error = pyqtSignal(str)
 
-    def __init__(self, url, outdir, formats, model_name, keep_video_setting,
-                 download_format_details, start_time=None, end_time=None, local_file=None):
-        super().__init__()
-        self.url = url
-        self.outdir = outdir
-        self.formats = formats
-        self.model_name = model_name
-        self.keep_video = keep_video_setting
-        self.download_format_details = download_format_details
-        self.start_time = start_time
-        self.end_time = end_time
-        self.local_file = local_file
-
-    def run(self):
+def _model_kwargs(options):
+    """Registry arguments for the engine settings kept in a job's (or the window's) options."""
+    return {"precision": options.get("compute_type"), "engine": options.get("engine"),
+            "threads": options.get("threads")}
+
+
+def _engine_label(options):
+    engine = options.get("engine") or engines.DEFAULT_ENGINE
+    if engine == engines.DEFAULT_ENGINE and not options.get("compute_type"):
+        return ""
+    return f", {engine} {options.get('compute_type') or 'auto'}"
+
+
+def _format_duration(seconds):
+    seconds = int(round(seconds))
+    hours, rem = divmod(seconds, 3600)
+    return f"{hours}:{rem // 60:02d}:{rem % 60:02d}" if hours else f"{rem // 60}:{rem % 60:02d}"
+
+
+def _format_rate(bytes_per_second):
+    for unit in ("B", "KB", "MB", "GB"):
+        if bytes_per_second < 1024 or unit == "GB":
+            return f"{bytes_per_second:.1f} {unit}/s"
+        bytes_per_second /= 1024.0
+
+
+class JobProgress:
+    """Folds per-stage progress into one weighted fraction with an overall ETA.
+
+    The running stage's remaining time comes from its own ETA when it reports one
+    (yt-dlp does), otherwise from its rate so far. Stages still to come are
+    estimated from the average rate of the job up to now.
+    """
+
+    def __init__(self, stages):
+        total = float(sum(PROGRESS_WEIGHTS[name] for name in stages))
+        self.stages = list(stages)
+        self.weights = {name: PROGRESS_WEIGHTS[name] / total for name in stages}
+        self.fractions = dict.fromkeys(stages, 0.0)
+        self.started = time.monotonic()
+        self.stage_started = {}
+        self.current = None
+        self.stage_eta = None
+
+    def update(self, stage, fraction, eta=None):
+        now = time.monotonic()
+        self.stage_started.setdefault(stage, now)
+        # Reaching a stage means every earlier one is complete
+        for name in self.stages[:self.stages.index(stage)]:
+            self.fractions[name] = 1.0
+        if fraction is not None:
+            self.fractions[stage] = min(1.0, max(0.0, fraction))
+        self.current = stage
+        self.stage_eta = eta
+
+    def fraction(self):
+        return sum(self.weights[name] * self.fractions[name] for name in self.stages)
+
+    def eta(self):
+        """Seconds left for the whole job, or None while there is nothing to go on."""
+        if self.current is None:
+            return None
+        now = time.monotonic()
+        done = self.fraction()
+        if done <= 0:
+            return None
+        stage_fraction = self.fractions[self.current]
+        remaining = self.stage_eta
+        if remaining is None:
+            if stage_fraction <= 0:
+                return None
+            elapsed = now - self.stage_started[self.current]
+            remaining = elapsed * (1.0 - stage_fraction) / stage_fraction
+        later = sum(self.weights[name] for name in self.stages[self.stages.index(self.current) + 1:])
+        seconds_per_unit = (now - self.started) / done
+        return remaining + later * seconds_per_unit
+
+
+class ModelPreloader(QObject):
+    """Loads a Whisper model into main.MODEL_REGISTRY on a background thread.
+
+    The heavy imports are warmed first, so the window stays responsive while torch
+    and the weights load. A job that asks for the same model meanwhile waits on the
+    registry's per-model lock instead of loading it a second time. Plain daemon
+    threads are used so closing the window never waits for a load to finish.
+    """
+    loading = pyqtSignal(str)
+    ready = pyqtSignal(str, float)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def preload(self, model_name, client=None, engine_options=None):
+        """Start loading model_name unless it is resident or already on its way.
+
+        engine_options holds the engine, compute_type and threads to load it with.
+        With a daemon.DaemonClient the model is loaded by the service instead.
+        """
+        engine_options = dict(engine_options or {})
+        key = (model_name, client.url if client else None, tuple(sorted(engine_options.items())))
+        with self._lock:
+            if key in self._pending:
+                return
+            if client is None and main.MODEL_REGISTRY.is_loaded(model_name, **_model_kwargs(engine_options)):
+                self.ready.emit(model_name, 0.0)
+                return
+            self._pending.add(key)
+        self.loading.emit(model_name)
+        threading.Thread(target=self._load, args=(model_name, client, engine_options, key),
+                         name=f"preload-{model_name}", daemon=True).start()
+
+    def _load(self, model_name, client, engine_options, key):
+        started = time.perf_counter()
         try:
-            if self.local_file:
-                video_file_path = self.local_file
-                self.progress.emit("Using provided local file...")
-                self.transcription_progress.emit(1,5)
+            if client is not None:
+                client.preload(model_name, **engine_options)
             else:
-                self.progress.emit("Downloading media...")
-                for i in range(1, 3):
-                    self.transcription_progress.emit(i, 5)
-                    QThread.msleep(100)
-                video_file_path = main.download_video(self.url, self.outdir, self.download_format_details)
-                self.transcription_progress.emit(2,5)
-
-            self.progress.emit(f"Loading/verifying Whisper model: '{self.model_name}'...")
-            QThread.msleep(200)
-            self.transcription_progress.emit(3,5)
-
-            # Bridge Whisper's tqdm into our status label, showing only percent
-            def _on_whisper_progress(pct, n, total):
-                pct = int(pct or 0)
-                self.progress.emit(f"Transcribing with '{self.model_name}' model... {pct}%")
-
-            results = main.transcribe(
-                video_file_path,
-                model_name=self.model_name,
-                formats=self.formats,
-                start_time=self.start_time,
-                end_time=self.end_time,
-                progress_callback=_on_whisper_progress,
-            )
-            self.transcription_progress.emit(4,5)
-            QThread.msleep(200)
-            self.transcription_progress.emit(5,5)
-
-            self.finished.emit(results)
-            
-            if not self.keep_video and not self.local_file:
-                self.progress.emit(f"Keep media setting is OFF. Attempting to delete: {video_file_path}")
-                if os.path.exists(video_file_path):
-                    try:
-                        os.remove(video_file_path)
-                        self.progress.emit(f"Media successfully deleted: {video_file_path}")
-                    except OSError as e:
-                        self.progress.emit(f"Warning: Could not delete media {video_file_path}: {e}")
-                else:
-                    self.progress.emit(f"Warning: Media file not found for deletion: {video_file_path}")
-            else:
-                self.progress.emit(f"Keep media setting is ON. Media preserved: {video_file_path}")
+                main.warm_imports()
+                main.get_model(model_name, **_model_kwargs(engine_options))
+        except Exception as e:
+            self.failed.emit(model_name, str(e))
+        else:
+            self.ready.emit(model_name, time.perf_counter() - started)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+
+class CollectionExpander(QObject):
+    """Lists channel/playlist URLs on a background thread (see ingest.py).
+
+    expanded(urls, summary, options) delivers the videos still to transcribe with
+    the model in options, leaving out those already done with it.
+    """
+    expanded = pyqtSignal(list, str, object)
 
+    def expand(self, sources, options):
+        threading.Thread(target=self._expand, args=(list(sources), options),
+                         name="expand-collections", daemon=True).start()
+
+    def _expand(self, sources, options):
+        try:
+            listings = ingest.expand_sources(sources, history=main.TRANSCRIPTION_HISTORY,
+                                             media_cache=main.MEDIA_CACHE)
+            selected, skipped = ingest.select_new(listings, main.TRANSCRIPTION_HISTORY, options["model"])
         except Exception as e:
-            import traceback
-            self.error.emit(f"Error: {str(e)}\n{traceback.format_exc()}")
+            self.expanded.emit([], f"Could not list {', '.join(sources)}: {e}", options)
+            return
+        errors = [listing.error for listing in listings if listing.error]
+        summary = f"{len(selected)} video(s) queued from {len(listings)} channel(s)/playlist(s)"
+        if skipped:
+            summary += f", {len(skipped)} skipped (already transcribed or listed twice)"
+        if errors:
+            summary += ". Errors: " + "; ".join(errors)
+        self.expanded.emit([entry.url for entry in selected], summary, options)
+
+
+class JobQueue(QObject):
+    """The window's jobs, run several at a time through a pipeline.Pipeline.
+
+    Downloads and transcriptions have separate limits, so the network stays busy
+    while Whisper keeps the CPU or GPU saturated. Each job carries the settings it
+    was added with in job.options. With a daemon.DaemonClient in options['client'],
+    the transcribe stage hands the job to the service and mirrors its progress.
+
+    job_changed(index) fires on every status change and, rate limited, on progress.
+    Handlers run in the GUI thread; the jobs themselves run in the pipeline's threads.
+    """
+    job_changed = pyqtSignal(int)
+
+    REMOTE_POLL_SECONDS = 0.5
+
+    def __init__(self, download_workers=2, transcribe_workers=1, parent=None):
+        super().__init__(parent)
+        self.jobs = []  # display order, which is also the order waiting jobs start in
+        self.download_workers = download_workers
+        self.transcribe_workers = transcribe_workers
+        self.pipeline = None
+        self._next_index = 1
+        self._trackers = {}  # index -> JobProgress
+        self._last_report = {}
+
+    def add(self, source, is_local, options):
+        pipeline = self._pipeline()
+        job = Job(self._next_index, source, is_local=is_local)
+        self._next_index += 1
+        job.options = options
+        self._prepare(job)
+        self.jobs.append(job)
+        pipeline.submit(job)
+        return job
+
+    def retry(self, job):
+        """Queue a failed or cancelled job again; returns False for any other status."""
+        if job.status not in ("failed", "cancelled"):
+            return False
+        self._prepare(job)
+        return self._pipeline().retry(job)
+
+    def cancel(self, job):
+        """Stop a waiting or running job; returns False if it is already over.
+
+        A running job shows 'Cancelling...' until its stage notices, which takes
+        at most a few seconds (one Whisper window while decoding).
+        """
+        if self.pipeline is None or not self.pipeline.cancel(job):
+            return False
+        if not job.finished:
+            job.progress = dict(job.progress, message="Cancelling...")
+            self.job_changed.emit(job.index)
+        return True
+
+    def remove(self, job):
+        """Forget a job that is waiting or over; running jobs stay. Returns whether it went."""
+        if job.status == "queued" and self.pipeline is not None:
+            self.pipeline.cancel(job)
+        if not job.finished:
+            return False
+        self.jobs.remove(job)
+        self._trackers.pop(job.index, None)
+        return True
+
+    def move(self, job, step):
+        """Move a job up (step < 0) or down the list; waiting jobs start in list order."""
+        i = self.jobs.index(job)
+        j = min(max(i + step, 0), len(self.jobs) - 1)
+        if i == j:
+            return False
+        self.jobs.insert(j, self.jobs.pop(i))
+        if self.pipeline is not None:
+            self.pipeline.reorder(self.jobs)
+        return True
+
+    def set_limits(self, download_workers, transcribe_workers):
+        """New limits take effect with the next job added while the queue is idle."""
+        self.download_workers = max(1, int(download_workers))
+        self.transcribe_workers = max(1, int(transcribe_workers))
+
+    def is_idle(self):
+        return all(job.finished for job in self.jobs)
+
+    def fraction(self, job):
+        tracker = self._trackers.get(job.index)
+        if job.status == "done":
+            return 1.0
+        return tracker.fraction() if tracker else 0.0
+
+    def overall_fraction(self):
+        active = [job for job in self.jobs if job.status != "cancelled"]
+        if not active:
+            return 0.0
+        return sum(self.fraction(job) for job in active) / len(active)
+
+    def shutdown(self):
+        """Cancel every job and let the pool threads end once the running ones have stopped."""
+        if self.pipeline is None:
+            return
+        for job in self.jobs:
+            self.pipeline.cancel(job)
+        self.pipeline.close(wait=False)
+
+    def _pipeline(self):
+        limits = (self.download_workers, self.transcribe_workers)
+        if self.pipeline is not None and self.is_idle() and \
+                (self.pipeline.download_workers, self.pipeline.transcribe_workers) != limits:
+            self.pipeline.close(wait=False)
+            self.pipeline = None
+        if self.pipeline is None:
+            self.pipeline = Pipeline(self._download, self._transcribe, download_workers=self.download_workers,
+                                     transcribe_workers=self.transcribe_workers, on_update=self._on_update)
+        return self.pipeline
+
+    def _prepare(self, job):
+        job.metrics = metrics.JobMetrics(job_id=str(job.index), source=job.source)
+        stages = [] if job.is_local else ["download"]
+        if job.options.get("client") is not None or \
+                not main.MODEL_REGISTRY.is_loaded(job.options["model"], **_model_kwargs(job.options)):
+            stages.append("model")
+        self._trackers[job.index] = JobProgress(stages + ["transcribe"])
+        self._last_report[job.index] = 0.0
+
+    def _report(self, job, stage, fraction, message, eta=None, force=False):
+        """Update a job's combined progress; within a stage, signals are rate limited."""
+        tracker = self._trackers.get(job.index)
+        if tracker is None or stage not in tracker.stages:
+            return
+        tracker.update(stage, fraction, eta)
+        remaining = tracker.eta()
+        if remaining is not None:
+            message = f"{message} (about {_format_duration(remaining)} left)"
+        job.progress = {"stage": stage, "fraction": tracker.fraction(), "message": message}
+        now = time.monotonic()
+        if not force and now - self._last_report.get(job.index, 0.0) < PROGRESS_INTERVAL:
+            return
+        self._last_report[job.index] = now
+        self.job_changed.emit(job.index)
+
+    def _on_update(self, job):
+        if job.status in FINAL_STATUSES:
+            main.release_media(job.info)
+        if job.status == "done":
+            # Printed, and appended to $RUMBLE_METRICS_FILE / $RUMBLE_PROMETHEUS_FILE when set
+            metrics.emit(job.metrics)
+            # Channel syncs skip videos already done with this model (the service records its own)
+            main.remember_transcribed(job.info, job.options["model"], job.outputs)
+        self.job_changed.emit(job.index)
+
+    def _download(self, job):
+        opts = job.options
+        if opts.get("client") is not None:
+            # The service downloads as part of its own job
+            return job.source
+
+        def _on_download_progress(pct, downloaded, total, speed=None, eta=None,
+                                  fragment_index=None, fragment_count=None):
+            parts = [f"{int(pct)}%" if pct is not None else f"{downloaded / 1048576:.1f} MB"]
+            if speed:
+                parts.append(_format_rate(speed))
+            if fragment_count:
+                parts.append(f"fragment {fragment_index or 0}/{fragment_count}")
+            self._report(job, "download", pct / 100.0 if pct is not None else None,
+                         "Downloading media... " + ", ".join(parts), eta=eta, force=pct == 100.0)
+
+        self._report(job, "download", 0.0, "Downloading media...", force=True)
+        # Without "keep", only the transcript matters: fetch the native audio stream
+        # and skip both the re-encode and the copy into the output folder
+        # With Start/End set, only that section (plus a little padding) is fetched
+        section = None
+        if opts["start_time"] is not None or opts["end_time"] is not None:
+            section = (opts["start_time"], opts["end_time"])
+        return main.download_video(job.source, opts["output_dir"], opts["download_format"],
+                                   transcription_only=not opts["keep_media"],
+                                   section=section, info_out=job.info, metrics=job.metrics,
+                                   progress_callback=_on_download_progress, cancel=job.cancel_token)
+
+    def _transcribe(self, job):
+        opts = job.options
+        if opts.get("client") is not None:
+            return self._transcribe_remote(job, opts["client"])
+        model_name = opts["model"]
+        decode = dict(model_name=model_name, start_time=opts["start_time"], end_time=opts["end_time"],
+                      time_offset=job.info.get("media_offset", 0.0), engine=opts.get("engine"),
+                      compute_type=opts.get("compute_type"), vad=opts.get("vad", False))
+        # A transcript-cache hit needs no model, and loading one could evict a model other jobs use
+        if not main.transcript_cached(job.media_path, **decode):
+            self._report(job, "model", 0.0, f"Loading Whisper model: '{model_name}'...", force=True)
+            # Resident models come straight from the registry; only the first job pays the load
+            model_kwargs = _model_kwargs(opts)
+            with job.metrics.stage("model_load", model=model_name, engine=opts.get("engine"),
+                                   cached=main.MODEL_REGISTRY.is_loaded(model_name, **model_kwargs)):
+                main.get_model(model_name, **model_kwargs)
+
+        # Bridge Whisper's tqdm into the job's row and the combined progress
+        def _on_whisper_progress(pct, n, total):
+            pct = float(pct or 0)
+            self._report(job, "transcribe", pct / 100.0, f"Transcribing with '{model_name}' model... {int(pct)}%")
+
+        self._report(job, "transcribe", 0.0, f"Transcribing with '{model_name}' model...", force=True)
+        return main.transcribe(
+            job.media_path,
+            formats=opts["formats"],
+            progress_callback=_on_whisper_progress,
+            output_dir=opts["output_dir"],
+            metrics=job.metrics,
+            threads=opts.get("threads"),
+            cancel=job.cancel_token,
+            **decode
+        )
+
+    def _transcribe_remote(self, job, client):
+        opts = job.options
+        remote = client.submit(
+            os.path.abspath(job.source) if job.is_local else job.source,
+            model=opts["model"],
+            engine=opts.get("engine"),
+            compute_type=opts.get("compute_type"),
+            threads=opts.get("threads"),
+            vad=opts.get("vad", False),
+            formats=opts["formats"],
+            start=opts["start_time"],
+            end=opts["end_time"],
+            download_format=opts["download_format"]["format_id"],
+            transcription_only=not opts["keep_media"],
+            output_dir=os.path.abspath(opts["output_dir"]),
+        )
+        job.info["remote_job"] = remote["index"]
+        while remote["status"] not in FINAL_STATUSES:
+            if job.cancel_token.cancelled:
+                # The service stops it on its side; don't wait for that to finish
+                try:
+                    client.cancel(remote["index"])
+                except Exception as e:
+                    print(f"Could not cancel service job {remote['index']}: {e}")
+                raise Cancelled()
+            self._mirror(job, remote)
+            time.sleep(self.REMOTE_POLL_SECONDS)
+            remote = client.job(remote["index"])
+        if remote["status"] != "done":
+            raise RuntimeError(f"Service job {remote['index']} {remote['status']}: {remote.get('error') or ''}")
+        return remote["outputs"]
+
+    def _mirror(self, job, remote):
+        report = remote.get("progress") or {}
+        stage = report.get("stage")
+        pct = report.get("percent")
+        model_name = job.options["model"]
+        if remote["status"] == "queued":
+            job.progress = {"stage": None, "message": f"Waiting in the service queue (job {remote['index']})..."}
+            self.job_changed.emit(job.index)
+        elif stage == "download":
+            label = f"{int(pct)}%" if pct is not None else f"{(report.get('downloaded_bytes') or 0) / 1048576:.1f} MB"
+            if report.get("speed"):
+                label += ", " + _format_rate(report["speed"])
+            self._report(job, "download", pct / 100.0 if pct is not None else None,
+                         f"Downloading media... {label}", eta=report.get("eta"), force=True)
+        elif stage == "model":
+            self._report(job, "model", None, f"Loading Whisper model: '{model_name}'...", force=True)
+        elif stage == "transcribe":
+            self._report(job, "transcribe", (pct or 0) / 100.0,
+                         f"Transcribing with '{model_name}' model... {int(pct or 0)}%", force=True)
+
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
@@ -165,6 +539,26 @@ class SettingsDialog(QDialog):
         model_view.viewport().setAttribute(Qt.WA_Hover, True)
         self.model_combo.setView(model_view)
 
+        # Inference engine, its compute type and CPU threads
+        self.engine_combo = QComboBox()
+        current_engine = self.settings.value("engine", engines.DEFAULT_ENGINE, type=str)
+        for name in engines.ENGINES:
+            self.engine_combo.addItem(ENGINE_DESCRIPTIONS.get(name, name), name)
+        self.engine_combo.setCurrentIndex(max(0, self.engine_combo.findData(current_engine)))
+        form_layout.addRow(QLabel("Inference Engine:"), self.engine_combo)
+        self.compute_type_combo = QComboBox()
+        self._fill_compute_types(self.settings.value("computeType", "", type=str))
+        self.engine_combo.currentIndexChanged.connect(lambda _: self._fill_compute_types(""))
+        form_layout.addRow(QLabel("Compute Type:"), self.compute_type_combo)
+        self.threads_spin = QSpinBox()
+        self.threads_spin.setRange(0, os.cpu_count() or 64)
+        self.threads_spin.setSpecialValueText("Auto")
+        self.threads_spin.setValue(self.settings.value("threads", 0, type=int))
+        form_layout.addRow(QLabel("CPU Threads:"), self.threads_spin)
+        self.vad_checkbox = QCheckBox("Skip silence and non-speech before transcribing")
+        self.vad_checkbox.setChecked(self.settings.value("skipNonSpeech", False, type=bool))
+        form_layout.addRow(self.vad_checkbox)
+
         # Output formats selection
         self.output_formats_label = QLabel("Transcript Formats:")
         self.output_formats_container = QWidget()
@@ -180,6 +574,26 @@ class SettingsDialog(QDialog):
             cb.setChecked(fmt in saved_formats)
         form_layout.addRow(self.output_formats_label, self.output_formats_container)
 
+        # Queue concurrency
+        self.download_jobs_spin = QSpinBox()
+        self.download_jobs_spin.setRange(1, 8)
+        self.download_jobs_spin.setValue(self.settings.value("downloadJobs", DEFAULT_DOWNLOAD_JOBS, type=int))
+        form_layout.addRow(QLabel("Concurrent Downloads:"), self.download_jobs_spin)
+        self.transcribe_jobs_spin = QSpinBox()
+        self.transcribe_jobs_spin.setRange(1, 4)
+        self.transcribe_jobs_spin.setValue(self.settings.value("transcribeJobs", DEFAULT_TRANSCRIBE_JOBS, type=int))
+        form_layout.addRow(QLabel("Concurrent Transcriptions:"), self.transcribe_jobs_spin)
+
+        # Transcription service (daemon.py): run jobs there instead of in this window
+        self.use_daemon_checkbox = QCheckBox("Send jobs to the transcription service")
+        self.use_daemon_checkbox.setChecked(self.settings.value("useDaemon", False, type=bool))
+        form_layout.addRow(self.use_daemon_checkbox)
+        self.daemon_url_label = QLabel("Service URL:")
+        self.daemon_url_input = QLineEdit(self.settings.value("daemonUrl", daemon.DEFAULT_URL, type=str))
+        self.daemon_url_input.setEnabled(self.use_daemon_checkbox.isChecked())
+        self.use_daemon_checkbox.toggled.connect(self.daemon_url_input.setEnabled)
+        form_layout.addRow(self.daemon_url_label, self.daemon_url_input)
+
         # Bottom buttons
         button_layout = QHBoxLayout()
         spacer = QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
@@ -199,12 +613,29 @@ class SettingsDialog(QDialog):
         selected_dl_format_id = self.download_format_combo.currentData()
         self.settings.setValue("downloadFormatID", selected_dl_format_id)
         self.settings.setValue("modelKey", self.model_combo.currentData())
+        self.settings.setValue("engine", self.engine_combo.currentData())
+        self.settings.setValue("computeType", self.compute_type_combo.currentData() or "")
+        self.settings.setValue("threads", self.threads_spin.value())
+        self.settings.setValue("skipNonSpeech", self.vad_checkbox.isChecked())
+        self.settings.setValue("downloadJobs", self.download_jobs_spin.value())
+        self.settings.setValue("transcribeJobs", self.transcribe_jobs_spin.value())
+        self.settings.setValue("useDaemon", self.use_daemon_checkbox.isChecked())
+        self.settings.setValue("daemonUrl", self.daemon_url_input.text().strip() or daemon.DEFAULT_URL)
         selected_formats = [f for f, cb in self.output_format_boxes.items() if cb.isChecked()]
         if not selected_formats:
             selected_formats = DEFAULT_OUTPUT_FORMATS
         self._save_output_formats(selected_formats)
         self.accept()
 
+    def _fill_compute_types(self, current):
+        engine = engines.get_engine(self.engine_combo.currentData())
+        self.compute_type_combo.clear()
+        self.compute_type_combo.addItem("Auto (int8/fp32 on CPU, half precision on GPU)"
+                                        if engine.name != "whisper" else "Auto (fp16 on GPU, else fp32)", "")
+        for compute_type in engine.compute_types:
+            self.compute_type_combo.addItem(compute_type, compute_type)
+        self.compute_type_combo.setCurrentIndex(max(0, self.compute_type_combo.findData(current)))
+
     def _load_output_formats(self):
         value = self.settings.value("outputFormats", ",".join(DEFAULT_OUTPUT_FORMATS), type=str)
         if isinstance(value, str):
@@ -273,16 +704,16 @@ class RumbleTranscriber(QWidget):
         title1.setWordWrap(True)
         input_layout.addWidget(title1)
         self.url_input = QLineEdit(self)
-        self.url_input.setPlaceholderText("Paste Rumble video URL here…")
+        self.url_input.setPlaceholderText("Paste Rumble video URLs here (separate several with spaces)…")
         self.url_input.returnPressed.connect(self.run_job)
         input_layout.addWidget(self.url_input)
 
         file_row = QHBoxLayout()
-        self.file_btn = QPushButton("Choose Local File")
+        self.file_btn = QPushButton("Choose Local Files")
         self.file_btn.setIcon(self.style().standardIcon(QStyle.SP_DialogOpenButton))
         self.file_btn.clicked.connect(self.pick_file)
         file_row.addWidget(self.file_btn)
-        self.selected_file_label = QLabel("Local File: None")
+        self.selected_file_label = QLabel("Local Files: None")
         self.selected_file_label.setObjectName('mutedLabel')
         self.selected_file_label.setWordWrap(True)
         file_row.addWidget(self.selected_file_label, 1)
@@ -334,9 +765,45 @@ class RumbleTranscriber(QWidget):
         self.main_layout.addWidget(self.advanced_toggle)
         self.main_layout.addWidget(adv_card)
 
-        # Spacer and primary action
-        self.main_layout.addSpacerItem(QSpacerItem(20, 10, QSizePolicy.Minimum, QSizePolicy.Expanding))
-        self.go_btn = QPushButton("Extract & Transcribe")
+        # Job queue
+        queue_card, queue_layout = self._make_card()
+        queue_card.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        queue_title = QLabel("Job Queue")
+        queue_layout.addWidget(queue_title)
+        self.queue_table = QTableWidget(0, 4)
+        self.queue_table.setHorizontalHeaderLabels(["#", "Source", "Status", "Progress"])
+        self.queue_table.verticalHeader().setVisible(False)
+        self.queue_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.queue_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.queue_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        header_view = self.queue_table.horizontalHeader()
+        header_view.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header_view.setSectionResizeMode(1, QHeaderView.Stretch)
+        header_view.setSectionResizeMode(2, QHeaderView.Stretch)
+        header_view.setSectionResizeMode(3, QHeaderView.Fixed)
+        self.queue_table.setColumnWidth(3, 140)
+        self.queue_table.setMinimumHeight(160)
+        queue_layout.addWidget(self.queue_table, 1)
+
+        queue_buttons = QHBoxLayout()
+        for text, icon, handler in (
+            ("Up", QStyle.SP_ArrowUp, lambda: self.move_selected_job(-1)),
+            ("Down", QStyle.SP_ArrowDown, lambda: self.move_selected_job(1)),
+            ("Cancel", QStyle.SP_DialogCancelButton, self.cancel_selected_job),
+            ("Retry", QStyle.SP_BrowserReload, self.retry_selected_job),
+            ("Remove", QStyle.SP_DialogDiscardButton, self.remove_selected_job),
+            ("Clear Finished", QStyle.SP_DialogResetButton, self.clear_finished_jobs),
+        ):
+            btn = QPushButton(text)
+            btn.setIcon(self.style().standardIcon(icon))
+            btn.clicked.connect(handler)
+            queue_buttons.addWidget(btn)
+        queue_buttons.addStretch(1)
+        queue_layout.addLayout(queue_buttons)
+        self.main_layout.addWidget(queue_card, 1)
+
+        # Primary action
+        self.go_btn = QPushButton("Add to Queue")
         self.go_btn.setObjectName('primaryButton')
         self.go_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
         self.go_btn.setFixedHeight(48)
@@ -351,14 +818,34 @@ class RumbleTranscriber(QWidget):
 
         self.progress_bar = QProgressBar()
         self.progress_bar.setMinimum(0)
-        self.progress_bar.setMaximum(5)
+        self.progress_bar.setMaximum(PROGRESS_STEPS)
         self.progress_bar.setValue(0)
         self.progress_bar.setTextVisible(False)
         self.progress_bar.setVisible(False)
         self.main_layout.addWidget(self.progress_bar)
 
+        # Status bar: whether the configured model is already resident
+        self.status_bar = QStatusBar(self)
+        self.status_bar.setSizeGripEnabled(False)
+        self.model_status_label = QLabel()
+        self.model_status_label.setObjectName('mutedLabel')
+        self.status_bar.addWidget(self.model_status_label, 1)
+        self.main_layout.addWidget(self.status_bar)
+
+        self.model_preloader = ModelPreloader(self)
+        self.model_preloader.loading.connect(self._on_model_loading)
+        self.model_preloader.ready.connect(self._on_model_ready)
+        self.model_preloader.failed.connect(self._on_model_failed)
+        self._refresh_model_status()
+
+        self.job_queue = JobQueue(*self._queue_limits(), parent=self)
+        self.job_queue.job_changed.connect(self._on_job_changed)
+        self.collection_expander = CollectionExpander(self)
+        self.collection_expander.expanded.connect(self._on_collections_expanded)
+        self._queue_busy = False
+
         self.selected_dir = None
-        self.local_file_path = None
+        self.local_file_paths = []
 
     def _make_card(self):
         container = QWidget()
@@ -401,18 +888,20 @@ class RumbleTranscriber(QWidget):
             self.outdir_btn.setText("Change Output Folder")
 
     def pick_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select media file")
-        if file_path:
-            self.local_file_path = file_path
-            self.selected_file_label.setText(f"Local File: {os.path.basename(file_path)}")
-            try:
-                self.file_btn.setText(f"File: .../{os.path.basename(file_path)}")
-            except Exception:
-                self.file_btn.setText(f"File: {self.local_file_path}")
-        else:
-            self.local_file_path = None
-            self.selected_file_label.setText("Local File: None")
-            self.file_btn.setText("Choose Local File")
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Select media files")
+        self._set_local_files(file_paths)
+
+    def _set_local_files(self, file_paths):
+        self.local_file_paths = list(file_paths)
+        if not file_paths:
+            self.selected_file_label.setText("Local Files: None")
+            self.file_btn.setText("Choose Local Files")
+            return
+        shown = os.path.basename(file_paths[0])
+        if len(file_paths) > 1:
+            shown += f" (+{len(file_paths) - 1} more)"
+        self.selected_file_label.setText(f"Local Files: {shown}")
+        self.file_btn.setText(f"Files: {len(file_paths)} selected")
 
     def _shorten_path(self, path_str, max_len=60):
         if not path_str:
@@ -426,43 +915,107 @@ class RumbleTranscriber(QWidget):
         return f"{prefix}…/{base}"
 
     def parse_time(self, text):
-        if not text:
-            return None
-        try:
-            parts = [float(p) for p in text.split(":")]
-            if len(parts) == 1:
-                return parts[0]
-            elif len(parts) == 2:
-                return parts[0]*60 + parts[1]
-            elif len(parts) == 3:
-                return parts[0]*3600 + parts[1]*60 + parts[2]
-        except ValueError:
-            return None
-        return None
+        return main.parse_timestamp(text)
 
     def open_settings_dialog(self):
+        previous = self._model_target()
         dialog = SettingsDialog(self)
-        dialog.exec_()
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        self.job_queue.set_limits(*self._queue_limits())
+        if self._model_target() != previous:
+            self.preload_model()
+
+    def _queue_limits(self):
+        return (self.settings.value("downloadJobs", DEFAULT_DOWNLOAD_JOBS, type=int),
+                self.settings.value("transcribeJobs", DEFAULT_TRANSCRIBE_JOBS, type=int))
+
+    def _model_target(self):
+        """The configured model, its engine settings and where it runs (service URL, or None)."""
+        client = self._daemon_client()
+        return self._configured_model(), self._engine_options(), client.url if client else None
+
+    def _configured_model(self):
+        return self.settings.value("modelKey", DEFAULT_MODEL_KEY, type=str)
+
+    def _engine_options(self):
+        """Engine, compute type and threads from Settings; None means the engine's default."""
+        engine = self.settings.value("engine", engines.DEFAULT_ENGINE, type=str)
+        if engine not in engines.ENGINES:
+            engine = engines.DEFAULT_ENGINE
+        compute_type = self.settings.value("computeType", "", type=str)
+        if compute_type not in engines.get_engine(engine).compute_types:
+            compute_type = None
+        return {"engine": engine, "compute_type": compute_type,
+                "threads": self.settings.value("threads", 0, type=int) or None}
+
+    def _daemon_client(self):
+        """Client for the transcription service when Settings says to use it, else None."""
+        if not self.settings.value("useDaemon", False, type=bool):
+            return None
+        return daemon.DaemonClient(self.settings.value("daemonUrl", daemon.DEFAULT_URL, type=str))
+
+    def preload_model(self):
+        """Load the configured model in the background so the next job skips the load."""
+        self.model_preloader.preload(self._configured_model(), client=self._daemon_client(),
+                                     engine_options=self._engine_options())
+
+    def _refresh_model_status(self):
+        model_name = self._configured_model()
+        if self._daemon_client() is not None:
+            # The service keeps its models resident; the last preload result still holds
+            return
+        engine_options = self._engine_options()
+        label = _engine_label(engine_options)
+        if main.MODEL_REGISTRY.is_loaded(model_name, **_model_kwargs(engine_options)):
+            self.model_status_label.setText(f"Model: {model_name}{label} (warm)")
+        else:
+            self.model_status_label.setText(f"Model: {model_name}{label} (not loaded)")
+
+    def _on_model_loading(self, model_name):
+        if model_name == self._configured_model():
+            self.model_status_label.setText(f"Model: {model_name} (loading…)")
+            self.model_status_label.setToolTip("")
+
+    def _on_model_ready(self, model_name, seconds):
+        if model_name != self._configured_model():
+            return
+        if self._daemon_client() is not None:
+            self.model_status_label.setText(f"Model: {model_name} (warm on service)")
+        else:
+            self._refresh_model_status()
+        if seconds:
+            self.model_status_label.setToolTip(f"Loaded in {seconds:.1f} s")
+
+    def _on_model_failed(self, model_name, message):
+        if model_name == self._configured_model():
+            self.model_status_label.setText(f"Model: {model_name} (failed to load)")
+            self.model_status_label.setToolTip(message)
 
     def run_job(self):
-        url = self.url_input.text().strip()
-        local_file = getattr(self, 'local_file_path', None)
-        if not url and not local_file:
+        """Queue every URL in the input and every chosen local file with the current settings."""
+        urls = self.url_input.text().split()
+        local_files = list(self.local_file_paths)
+        if not urls and not local_files:
             QMessageBox.warning(self, "Input Error", "Provide a URL or select a local file.")
             return
         if not self.selected_dir:
             QMessageBox.warning(self, "Input Error", "Output folder is required.")
             return
-        
+        bad = [u for u in urls if not u.startswith(("http://", "https://"))]
+        if bad:
+            QMessageBox.warning(self, "Input Error", "Not a URL: " + ", ".join(bad))
+            return
+
         # Read model and formats from Settings
-        selected_model_key = self.settings.value("modelKey", DEFAULT_MODEL_KEY, type=str)
+        selected_model_key = self._configured_model()
         formats_value = self.settings.value("outputFormats", ",".join(DEFAULT_OUTPUT_FORMATS), type=str)
         if isinstance(formats_value, str):
             formats = [v.strip().lower() for v in formats_value.split(',') if v.strip()]
         else:
             formats = [str(v).strip().lower() for v in (formats_value or [])]
         if 'all' in formats:
-            formats = ['txt', 'srt', 'vtt', 'tsv', 'json']
+            formats = list(main.TRANSCRIPT_FORMATS)
         if not formats:
             formats = list(DEFAULT_OUTPUT_FORMATS)
 
@@ -484,46 +1037,167 @@ class RumbleTranscriber(QWidget):
             QMessageBox.warning(self, "Input Error", "End time must be greater than start time.")
             return
 
-        self.go_btn.setEnabled(False)
+        # Each job keeps the settings it was queued with
+        options = {
+            "output_dir": self.selected_dir,
+            "formats": formats,
+            "model": selected_model_key,
+            **self._engine_options(),
+            "vad": self.settings.value("skipNonSpeech", False, type=bool),
+            "keep_media": keep_video_setting,
+            "download_format": download_format_details,
+            "start_time": start_time,
+            "end_time": end_time,
+            # Thin client: the service downloads and transcribes, this window only follows along
+            "client": self._daemon_client(),
+        }
+        self.job_queue.set_limits(*self._queue_limits())
+        # Channel and playlist URLs are listed in the background and queued per video
+        collections = [url for url in urls if ingest.is_collection_url(url)]
+        for url in urls:
+            if url not in collections:
+                self.job_queue.add(url, False, dict(options))
+        for path in local_files:
+            self.job_queue.add(path, True, dict(options))
+
+        self.url_input.clear()
+        self._set_local_files([])
+        self._render_queue()
+        if collections:
+            self.collection_expander.expand(collections, options)
+            self.progress_status_label.setText(f"Status: Listing {len(collections)} channel(s)/playlist(s)...")
+        if len(collections) < len(urls) + len(local_files):
+            self._queue_busy = True
+            self.progress_bar.setVisible(True)
+            self._update_queue_summary()
+
+    def _on_collections_expanded(self, urls, summary, options):
+        for url in urls:
+            self.job_queue.add(url, False, dict(options))
+        self.status_bar.showMessage(summary, 15000)
+        if urls:
+            self._queue_busy = True
+            self.progress_bar.setVisible(True)
+        self._render_queue()
+        self._update_queue_summary()
+
+    def _selected_job(self):
+        row = self.queue_table.currentRow()
+        if 0 <= row < len(self.job_queue.jobs):
+            return self.job_queue.jobs[row]
+        return None
+
+    def move_selected_job(self, step):
+        job = self._selected_job()
+        if job is not None and self.job_queue.move(job, step):
+            self._render_queue()
+            self.queue_table.selectRow(self.job_queue.jobs.index(job))
+
+    def cancel_selected_job(self):
+        job = self._selected_job()
+        if job is None:
+            return
+        if not self.job_queue.cancel(job):
+            QMessageBox.information(self, "Cancel", "This job has already finished.")
+
+    def retry_selected_job(self):
+        job = self._selected_job()
+        if job is None:
+            return
+        if not self.job_queue.retry(job):
+            QMessageBox.information(self, "Retry", "Only failed or cancelled jobs can be retried.")
+            return
+        self._queue_busy = True
         self.progress_bar.setVisible(True)
-        self.progress_bar.setValue(0)
-        self.progress_status_label.setText("Processing...")
-
-        self.worker = WorkerThread(
-            url,
-            self.selected_dir,
-            formats,
-            selected_model_key,
-            keep_video_setting,
-            download_format_details,
-            start_time=start_time,
-            end_time=end_time,
-            local_file=local_file,
-        )
-        self.worker.progress.connect(self.update_status_message)
-        self.worker.transcription_progress.connect(self.update_progress_bar)
-        self.worker.finished.connect(self.done)
-        self.worker.error.connect(self.handle_error)
-        self.worker.start()
+        self._update_queue_summary()
 
-    def update_status_message(self, msg):
-        self.progress_status_label.setText(f"Status: {msg}")
+    def remove_selected_job(self):
+        job = self._selected_job()
+        if job is None:
+            return
+        if not self.job_queue.remove(job):
+            QMessageBox.information(self, "Remove", "A running job can't be removed; cancel it first.")
+            return
+        self._render_queue()
+        self._update_queue_summary()
 
-    def update_progress_bar(self, current_step, total_steps):
-        self.progress_bar.setMaximum(total_steps)
-        self.progress_bar.setValue(current_step)
+    def clear_finished_jobs(self):
+        for job in [j for j in self.job_queue.jobs if j.status in ("done", "failed", "cancelled")]:
+            self.job_queue.remove(job)
+        self._render_queue()
+        self._update_queue_summary()
 
-    def done(self, files):
-        self.progress_bar.setVisible(False)
-        self.progress_status_label.setText("Status: DONE!")
-        self.go_btn.setEnabled(True)
-        QMessageBox.information(self, "Completed", "Processing finished.\nFiles:\n" + "\n".join(files))
+    def _render_queue(self):
+        jobs = self.job_queue.jobs
+        self.queue_table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            self._render_job_row(row, job)
 
-    def handle_error(self, msg):
-        self.progress_bar.setVisible(False)
-        self.progress_status_label.setText("Status: Error Occurred.")
-        self.go_btn.setEnabled(True)
-        QMessageBox.critical(self, "Error", f"An error occurred:\n{msg}")
+    def _render_job_row(self, row, job):
+        source = os.path.basename(job.source) if job.is_local else job.source
+        status = job.status.capitalize()
+        detail = job.error if job.status == "failed" else job.progress.get("message")
+        if job.status == "done":
+            detail = f"{len(job.outputs)} file(s) written"
+        tooltip = "\n".join(job.outputs) if job.status == "done" else (detail or "")
+        cells = (str(job.index), source, f"{status}: {detail}" if detail else status)
+        for column, text in enumerate(cells):
+            item = self.queue_table.item(row, column)
+            if item is None:
+                item = QTableWidgetItem()
+                self.queue_table.setItem(row, column, item)
+            item.setText(text)
+            item.setToolTip(job.source if column == 1 else tooltip)
+        bar = self.queue_table.cellWidget(row, 3)
+        if bar is None:
+            bar = QProgressBar()
+            bar.setRange(0, PROGRESS_STEPS)
+            bar.setTextVisible(False)
+            self.queue_table.setCellWidget(row, 3, bar)
+        bar.setValue(int(self.job_queue.fraction(job) * PROGRESS_STEPS))
+
+    def _on_job_changed(self, index):
+        for row, job in enumerate(self.job_queue.jobs):
+            if job.index == index:
+                self._render_job_row(row, job)
+                break
+        self._update_queue_summary()
+
+    def _update_queue_summary(self):
+        jobs = self.job_queue.jobs
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        summary = ", ".join(f"{n} {status}" for status, n in counts.items()) or "Ready"
+        self.progress_status_label.setText(f"Status: {summary}")
+        self.progress_bar.setValue(int(self.job_queue.overall_fraction() * PROGRESS_STEPS))
+        if self._queue_busy and self.job_queue.is_idle():
+            self._queue_busy = False
+            self.progress_bar.setVisible(False)
+            self._refresh_model_status()
+            failed = counts.get("failed", 0)
+            skipped = ""
+            vad = main.vad_totals(jobs)
+            if vad["jobs"]:
+                skipped = (f" Skipped {_format_duration(vad['skipped_seconds'])} of "
+                           f"{_format_duration(vad['audio_seconds'])} as non-speech.")
+            if failed:
+                QMessageBox.warning(self, "Completed", f"Queue finished: {counts.get('done', 0)} done, "
+                                                       f"{failed} failed. Hover a job for its error.{skipped}")
+            else:
+                QMessageBox.information(self, "Completed", f"Queue finished: {counts.get('done', 0)} done.{skipped}")
+
+    def closeEvent(self, event):
+        if not self.job_queue.is_idle():
+            answer = QMessageBox.question(
+                self, "Jobs Running",
+                "Jobs are still in the queue. Quit anyway?\n"
+                "Running jobs are cancelled; transcribing them again later resumes where they stopped.")
+            if answer != QMessageBox.Yes:
+                event.ignore()
+                return
+        self.job_queue.shutdown()
+        event.accept()
 
 def run_gui_app():
     app = QApplication(sys.argv)
@@ -531,6 +1205,9 @@ def run_gui_app():
     app.setApplicationName(APP_NAME)
     win = RumbleTranscriber()
     win.show()
+    # torch/whisper/yt-dlp and the configured model load in the background once the
+    # event loop has painted the window
+    QTimer.singleShot(0, win.preload_model)
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
@@ -0,0 +1,216 @@
+# ingest.py
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import SYNC_HEAD_SIZE, normalize_url
+
+# Channel, user and playlist pages; with expand=True any URL is tried as one
+COLLECTION_URL_RE = re.compile(
+    r"https?://(?:www\.)?rumble\.com/(?:c|user|playlists?)/"
+    r"|[?&]list="
+    r"|https?://(?:www\.)?youtube\.com/(?:@|c/|channel/|user/|playlist)",
+    re.IGNORECASE,
+)
+DEFAULT_RESOLVE_WORKERS = 8
+# Channels list tabs, which list playlists, which list videos
+MAX_NESTING = 3
+_PAGE_SIZE = 50
+
+
+def is_collection_url(url):
+    return bool(COLLECTION_URL_RE.search(url))
+
+
+class VideoEntry:
+    """One video found in a channel or playlist listing."""
+
+    def __init__(self, url, title=None, extractor=None, video_id=None, collection=None):
+        self.url = url
+        self.title = title
+        self.extractor = extractor
+        self.video_id = video_id
+        self.collection = collection
+        # Identity within the listing: stable across syncs even when the ID is unknown
+        self.listing_key = f"{extractor}:{video_id}" if extractor and video_id else normalize_url(url)
+
+    @property
+    def key(self):
+        """Video identity used for dedupe, or None until the entry is resolved."""
+        return f"{self.extractor}:{self.video_id}" if self.extractor and self.video_id else None
+
+    def to_dict(self):
+        return {"url": self.url, "title": self.title, "extractor": self.extractor,
+                "video_id": self.video_id, "collection": self.collection}
+
+
+class Listing:
+    """Result of expanding one channel or playlist URL."""
+
+    def __init__(self, source):
+        self.source = source
+        self.entries = []
+        self.head = []  # listing keys to remember as this sync's starting point
+        self.stopped_early = False  # reached a video listed by the previous sync
+        self.retried = 0  # unfinished videos carried over from the previous sync
+        self.error = None
+
+    def to_dict(self):
+        return {"source": self.source, "videos": len(self.entries), "stopped_early": self.stopped_early,
+                "retried": self.retried, "error": self.error}
+
+
+def _ydl(extra=None):
+    import yt_dlp
+    opts = {"quiet": True, "no_warnings": True, "skip_download": True, "extract_flat": "in_playlist"}
+    opts.update(extra or {})
+    return yt_dlp.YoutubeDL(opts)
+
+
+def _iter_entries(entries):
+    # Paged lists (as some extractors return) are fetched a page at a time, like generators
+    if hasattr(entries, "getslice"):
+        start = 0
+        while True:
+            page = entries.getslice(start, start + _PAGE_SIZE)
+            if not page:
+                return
+            yield from page
+            start += len(page)
+    else:
+        yield from entries or []
+
+
+def _walk(ydl, info, collection, depth=0):
+    """Yield a VideoEntry for every video in an unprocessed extract_info() result."""
+    if not info:
+        return
+    kind = info.get("_type", "video")
+    if kind in ("playlist", "multi_video"):
+        for entry in _iter_entries(info.get("entries")):
+            yield from _walk(ydl, entry, collection, depth)
+    elif kind in ("url", "url_transparent"):
+        target = info.get("url")
+        if not target:
+            return
+        ie_key = info.get("ie_key") or ""
+        nested = is_collection_url(target) or ie_key.endswith(("Playlist", "Channel", "Tab"))
+        if nested and depth < MAX_NESTING:
+            yield from _walk(ydl, ydl.extract_info(target, download=False, process=False, ie_key=info.get("ie_key")),
+                             collection, depth + 1)
+        else:
+            yield VideoEntry(target, title=info.get("title"), extractor=info.get("ie_key"),
+                             video_id=info.get("id"), collection=collection)
+    else:
+        # The URL was a single video after all
+        yield VideoEntry(info.get("webpage_url") or info.get("original_url") or collection,
+                         title=info.get("title"), extractor=info.get("extractor_key"),
+                         video_id=info.get("id"), collection=collection)
+
+
+def list_collection(source, history=None, only_new=False, limit=None):
+    """List the videos of a channel or playlist with yt-dlp's flat extraction.
+
+    Listings are newest first, so with only_new the walk stops at the first video
+    the previous sync of this source had already listed; pages beyond it are never
+    fetched. Videos the previous sync left unfinished are added back. limit caps the
+    number of videos taken from the listing.
+    """
+    listing = Listing(source)
+    state = history.sync_state(source) if history is not None else {"head": [], "pending": []}
+    stop_keys = set(state.get("head") or []) if only_new else set()
+    seen = set()
+    try:
+        with _ydl() as ydl:
+            info = ydl.extract_info(source, download=False, process=False)
+            for entry in _walk(ydl, info, source):
+                if entry.listing_key in seen:
+                    continue
+                if entry.listing_key in stop_keys:
+                    listing.stopped_early = True
+                    break
+                seen.add(entry.listing_key)
+                listing.entries.append(entry)
+                if limit and len(listing.entries) >= limit:
+                    break
+    except Exception as e:
+        listing.error = str(e)
+        print(f"Warning: could not list {source}: {e}")
+
+    listing.head = [entry.listing_key for entry in listing.entries]
+    if listing.stopped_early:
+        # Keep the old starting point after the new videos so the next run stops as early
+        listing.head += [key for key in state.get("head") or [] if key not in seen]
+    listing.head = listing.head[:SYNC_HEAD_SIZE]
+    if only_new:
+        for url in state.get("pending") or []:
+            if normalize_url(url) not in seen:
+                listing.entries.append(VideoEntry(url, collection=source))
+                listing.retried += 1
+    return listing
+
+
+def resolve_entry(entry, media_cache=None):
+    """Fill in the entry's extractor and video ID, from the media cache's URL index if possible."""
+    if entry.key:
+        return entry
+    known = media_cache.resolve_url(entry.url) if media_cache is not None else None
+    if known:
+        entry.extractor, entry.video_id = known
+        return entry
+    try:
+        with _ydl({"extract_flat": False}) as ydl:
+            info = ydl.extract_info(entry.url, download=False)
+    except Exception as e:
+        print(f"Warning: could not resolve {entry.url}: {e}")
+        return entry
+    if info:
+        entry.extractor = info.get("extractor_key") or info.get("extractor")
+        entry.video_id = info.get("id")
+        entry.title = entry.title or info.get("title")
+        if media_cache is not None and entry.key:
+            media_cache.record_url(entry.url, entry.extractor, entry.video_id)
+    return entry
+
+
+def expand_sources(sources, history=None, only_new=False, limit=None, media_cache=None,
+                   workers=DEFAULT_RESOLVE_WORKERS):
+    """Expand channel/playlist URLs into videos; returns a Listing per source, in order.
+
+    Listings are fetched concurrently, then every video without an ID is resolved
+    concurrently (through the media cache's URL index where it can be) so that
+    callers can dedupe by video ID.
+    """
+    sources = list(sources)
+    if not sources:
+        return []
+    workers = max(1, int(workers))
+    with ThreadPoolExecutor(min(workers, len(sources)), thread_name_prefix="listing") as pool:
+        listings = list(pool.map(lambda src: list_collection(src, history, only_new, limit), sources))
+    unresolved = [entry for listing in listings for entry in listing.entries if not entry.key]
+    if unresolved:
+        print(f"Resolving {len(unresolved)} video(s)...")
+        with ThreadPoolExecutor(min(workers, len(unresolved)), thread_name_prefix="resolve") as pool:
+            list(pool.map(lambda entry: resolve_entry(entry, media_cache), unresolved))
+    return listings
+
+
+def select_new(listings, history, model, include_done=False):
+    """Videos still to transcribe with model, and (entry, reason) for those skipped.
+
+    A video listed twice (in two playlists, say) is queued once; one already
+    transcribed with the same model is skipped unless include_done is set.
+    """
+    selected, skipped, queued = [], [], set()
+    for listing in listings:
+        for entry in listing.entries:
+            key = entry.key or normalize_url(entry.url)
+            if key in queued:
+                skipped.append((entry, "duplicate"))
+                continue
+            if not include_done and entry.key and history is not None and \
+                    history.is_transcribed(entry.extractor, entry.video_id, model):
+                skipped.append((entry, "already transcribed"))
+                continue
+            queued.add(key)
+            selected.append(entry)
+    return selected, skipped
@@ -1,49 +1,75 @@
 # main.py
 import os
-import yt_dlp
-import whisper
-try:
-    import tqdm as _tqdm
-except Exception:  # tqdm may be missing in some environments
-    _tqdm = None
-from contextlib import contextmanager
+import re
+import sys
+import uuid
+import argparse
+from contextlib import contextmanager, redirect_stdout
+from collections import OrderedDict
+import gc
 import json
-import tempfile
-import subprocess
+import shutil
+import threading
+import time
+import traceback
+from audio import SAMPLE_RATE, load_audio
+from cancellation import Cancelled, check_cancelled
+from cache import CheckpointStore, MediaCache, TranscriptCache, TranscriptionHistory, file_digest
+from engines import DEFAULT_ENGINE, ENGINES, check_options, get_engine
+from exporters import DEFAULT_JSON_MODE, FORMAT_WRITERS, JSON_MODES, TranscriptExporter, export_result, format_timestamp
+# The single-format writers used to live here; keep main.write_srt() and friends working
+from exporters import write_srt, write_tsv, write_vtt  # noqa: F401
+from metrics import JobMetrics, write_prometheus
+from parallel import DEFAULT_CHUNK_SECONDS, transcribe_chunked
+from vad import SpeechMap, default_backend, detect_speech
+from ingest import DEFAULT_RESOLVE_WORKERS, expand_sources, is_collection_url, select_new
+from transcript import Transcript
 
-def download_video(url, output_dir, download_format_details):
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Base output filename (without extension)
-    base_output_filename = os.path.join(output_dir, 'downloaded_media')
-    # Expected output extension from the format details
-    expected_ext = download_format_details.get("output_ext", "mp3")
-    final_output_path = f"{base_output_filename}.{expected_ext}"
+# Imported on first use (or by warm_imports()): together they take seconds to load,
+# which used to delay the GUI window and every CLI --help
+HEAVY_MODULES = ("torch", "whisper", "yt_dlp")
 
-    # Clean up any pre-existing file with the same base name and *any* common extension
-    # to prevent yt-dlp from creating numbered files like downloaded_media (1).mp3
-    for old_ext_to_check in ['mp3', 'm4a', 'mp4', 'mkv', 'webm', 'ogg', 'wav']:
-        potential_old_file = f"{base_output_filename}.{old_ext_to_check}"
-        if os.path.exists(potential_old_file):
-            try:
-                os.remove(potential_old_file)
-                print(f"Removed existing file: {potential_old_file}")
-            except OSError as e:
-                print(f"Warning: Could not remove existing file {potential_old_file}: {e}")
+# RAM budget for Whisper models kept resident between jobs (override with RUMBLE_MODEL_CACHE_MB)
+DEFAULT_MODEL_CACHE_MB = 6144
 
+# Download choices keyed by format_id; the GUI maps its display names onto these
+DOWNLOAD_FORMATS = {
+    "mp3_best": {"format_id": "mp3_best", "postprocessor_needed": True, "preferredcodec": "mp3", "output_ext": "mp3"},
+    "m4a_best": {"format_id": "m4a_best", "postprocessor_needed": True, "preferredcodec": "m4a", "output_ext": "m4a"},
+    "mp4_best_video": {"format_id": "mp4_best_video", "postprocessor_needed": False, "output_ext": "mp4"},
+    "mkv_best_video": {"format_id": "mkv_best_video", "postprocessor_needed": False, "output_ext": "mkv"},
+    # Source audio stream as served (usually m4a/webm/opus), never re-encoded
+    "native_audio": {"format_id": "native_audio", "postprocessor_needed": False, "output_ext": None},
+}
+TRANSCRIPT_FORMATS = list(FORMAT_WRITERS)
+# Extra seconds fetched on each side of a requested start/end range
+SECTION_PADDING_SECONDS = 2.0
 
-    ydl_opts = {
-        'outtmpl': f'{base_output_filename}.%(ext)s', # yt-dlp determines extension, then we check/rename if needed
-        'verbose': False,
-        'ignoreerrors': False,
-        'quiet': True,
-    }
+def parse_timestamp(text):
+    """Parse 'HH:MM:SS', 'MM:SS' or plain seconds into float seconds (None if invalid)."""
+    if not text:
+        return None
+    try:
+        parts = [float(p) for p in text.split(":")]
+        if len(parts) == 1:
+            return parts[0]
+        elif len(parts) == 2:
+            return parts[0]*60 + parts[1]
+        elif len(parts) == 3:
+            return parts[0]*3600 + parts[1]*60 + parts[2]
+    except ValueError:
+        return None
+    return None
 
+def _ydl_format_options(download_format_details):
+    """yt-dlp format/postprocessor options and the expected file extension for a download choice."""
     format_id = download_format_details.get("format_id")
+    expected_ext = download_format_details.get("output_ext", "mp3")
+    opts = {}
 
     if format_id == "mp3_best" or format_id == "m4a_best":
-        ydl_opts['format'] = 'bestaudio/best'
-        ydl_opts['postprocessors'] = [{
+        opts['format'] = 'bestaudio/best'
+        opts['postprocessors'] = [{
             'key': 'FFmpegExtractAudio',
             'preferredcodec': download_format_details["preferredcodec"],
             'preferredquality': '192',
@@ -52,241 +78,1212 @@ def download_video(url, output_dir, download_format_details):
         # For MP4, we want yt-dlp to try and get an MP4 container directly if possible.
         # This format string prioritizes mp4 video + m4a audio, then best mp4, then best overall.
         # The audio track will be used by Whisper.
-        ydl_opts['format'] = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo[ext=mp4]/best[ext=mp4]/best'
+        opts['format'] = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo[ext=mp4]/best[ext=mp4]/best'
         # It's generally better to let yt-dlp handle muxing to mp4 if it chooses a separate video/audio.
         # No specific audio extraction postprocessor needed if we want the video file.
     elif format_id == "mkv_best_video":
-        ydl_opts['format'] = 'bestvideo+bestaudio/best' # Best video and audio, often results in MKV
+        opts['format'] = 'bestvideo+bestaudio/best' # Best video and audio, often results in MKV
         # No specific audio extraction needed for MKV.
+    elif format_id == "native_audio":
+        # Keep the audio stream exactly as served; Whisper's own ffmpeg decode is the only pass
+        opts['format'] = 'bestaudio/best'
+        expected_ext = None
     else: # Default or unknown, fallback to best audio MP3
-        ydl_opts['format'] = 'bestaudio/best'
-        ydl_opts['postprocessors'] = [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'mp3', 'preferredquality': '192'}]
-        final_output_path = f"{base_output_filename}.mp3" # Adjust expected path for default
+        opts['format'] = 'bestaudio/best'
+        opts['postprocessors'] = [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'mp3', 'preferredquality': '192'}]
+        expected_ext = "mp3"
+    return opts, expected_ext
+
+
+# Per-job scratch folders live under this name inside the output folder
+WORK_DIR_NAME = ".rumble-work"
+
+
+@contextmanager
+def job_workspace(output_dir, job_id=None):
+    """Private scratch folder for one job inside output_dir, removed when the job ends.
+
+    Keeping it on the same filesystem as the output tree means finished artifacts
+    can be published with an atomic rename; readers never see a half-written file
+    and concurrent jobs never touch each other's work in progress.
+    """
+    token = f"{_safe_stem(job_id or 'job')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(output_dir, WORK_DIR_NAME, token)
+    for attempt in range(3):
+        try:
+            os.makedirs(path)
+            break
+        except FileNotFoundError:
+            # A job ending meanwhile removed the shared parent after makedirs saw it; recreate it
+            if attempt == 2:
+                raise
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(path))  # only succeeds once no other job is using it
+        except OSError:
+            pass
+
+
+def publish_file(tmp_path, final_path):
+    """Move a finished artifact into place atomically (replacing any older version)."""
+    os.replace(tmp_path, final_path)
+    return final_path
+
+
+def _safe_stem(text):
+    return re.sub(r"[^\w.-]+", "_", str(text)).strip("._") or "media"
 
-    print(f"yt-dlp options: {ydl_opts}")
-    print(f"Expecting final output at: {final_output_path}")
 
-    downloaded_file_actual_path = None
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+def media_stem(extractor, video_id):
+    """Stable file stem for a downloaded video, e.g. 'rumble-v4abc12'."""
+    return f"{_safe_stem(str(extractor).lower())}-{_safe_stem(video_id)}"
+
+
+def _publish_media(src_path, output_dir, base_name):
+    """Expose a cached media file in output_dir as <base_name>.<ext>.
+
+    Hard-links when possible so the cache and the output folder share one copy;
+    falls back to copying across filesystems. Deleting the published file never
+    touches the cached one.
+    """
+    ext = os.path.splitext(src_path)[1]
+    target = os.path.join(output_dir, base_name + ext)
+    if os.path.exists(target) and os.path.samefile(src_path, target):
+        return target
+    with job_workspace(output_dir, base_name) as work:
+        tmp_target = os.path.join(work, base_name + ext)
         try:
-            info_dict = ydl.extract_info(url, download=True)
-            # yt-dlp might save with a different extension than `expected_ext` initially based on `%(ext)s`
-            # before post-processing. The post-processor (for audio) should rename/create the final preferredcodec file.
-            
-            # Check if the specifically expected file (e.g., .mp3 from postprocessor) exists
-            if os.path.exists(final_output_path):
-                downloaded_file_actual_path = final_output_path
-            else:
-                # If postprocessing was involved (like for mp3/m4a), yt-dlp replaces the original %(ext)s
-                # If not, the original %(ext)s is used.
-                # Let's find what yt-dlp actually created with 'downloaded_media' base.
-                temp_filename = ydl.prepare_filename(info_dict).replace(info_dict['ext'], expected_ext) if info_dict else None
-                if temp_filename and os.path.exists(temp_filename) :
-                     downloaded_file_actual_path = temp_filename
-                else: # Scan directory for the file if specific name not found
-                    for f_name in os.listdir(output_dir):
-                        if f_name.startswith('downloaded_media.'):
-                            downloaded_file_actual_path = os.path.join(output_dir, f_name)
-                            # If multiple matches, prefer one with the target extension
-                            if f_name.endswith(f".{expected_ext}"):
-                                break 
-                    print(f"Scan found: {downloaded_file_actual_path}")
+            os.link(src_path, tmp_target)
+        except OSError:
+            shutil.copy2(src_path, tmp_target)
+        return publish_file(tmp_target, target)
+
+
+def _section_bounds(section, duration=None):
+    """Padded (start, end) to fetch for a requested (start, end) range; end may be None."""
+    start, end = section
+    s0 = max(0.0, float(start or 0) - SECTION_PADDING_SECONDS)
+    e0 = float(end) + SECTION_PADDING_SECONDS if end is not None else None
+    if duration and e0 is not None and e0 >= duration:
+        e0 = None
+    return s0, e0
 
 
+def _section_key(format_key, s0, e0):
+    return f"{format_key}@{s0:g}-{'end' if e0 is None else f'{e0:g}'}"
+
+
+def download_video(url, output_dir, download_format_details, base_name=None, use_cache=True,
+                   transcription_only=False, section=None, info_out=None, metrics=None,
+                   progress_callback=None, cancel=None):
+    """Download url and return the path of the media in output_dir.
+
+    Media is kept in MEDIA_CACHE under the extractor's video ID and the download
+    format, so retries and re-runs with another model reuse the earlier download.
+    A URL seen before is answered from disk without any network I/O. With
+    use_cache=False the video is always fetched again (refreshing the cache entry).
+
+    The published file is named after the video (see media_stem()) unless base_name
+    is given, so concurrent jobs for different videos never share a file name.
+
+    transcription_only is for jobs that don't keep the media: whatever format was
+    chosen, the native audio stream is fetched without re-encoding and the path of
+    the cached file is returned; nothing is written to output_dir. That file is
+    pinned in MEDIA_CACHE so other downloads cannot evict it before it has been
+    transcribed; call release_media(info_out) once the job is over.
+
+    section=(start_time, end_time) fetches only that range of the video (either bound
+    may be None), padded by SECTION_PADDING_SECONDS on both sides. The returned file
+    then starts part-way into the video; pass info_out (a dict) to receive that
+    position as info_out['media_offset'] along with the video's id and title, and
+    hand it to transcribe(time_offset=...) to keep timestamps on the original timeline.
+
+    metrics (a JobMetrics) receives the 'resolve' and 'download' stage timings.
+
+    progress_callback(pct, downloaded_bytes, total_bytes, speed=, eta=, fragment_index=,
+    fragment_count=) is fed from yt-dlp's progress hooks, like transcribe()'s callback.
+    pct and total_bytes are None while the size is unknown; speed is bytes/s, eta seconds.
+
+    cancel (a cancellation.CancelToken) is checked at every yt-dlp progress report
+    and raises Cancelled; the partial download is removed with its incoming folder.
+    """
+    check_cancelled(cancel)
+    import yt_dlp
+    os.makedirs(output_dir, exist_ok=True)
+    if metrics is None:
+        metrics = JobMetrics(source=url)
+    if info_out is None:
+        info_out = {}
+    info_out['media_offset'] = 0.0
+
+    if transcription_only:
+        download_format_details = DOWNLOAD_FORMATS["native_audio"]
+    format_opts, expected_ext = _ydl_format_options(download_format_details)
+    format_key = download_format_details.get("format_id")
+    if format_key not in DOWNLOAD_FORMATS:
+        format_key = "mp3_best"
+    if section is not None and section[0] is None and section[1] is None:
+        section = None
+
+    def _pin(path):
+        # Jobs that transcribe straight from the cache hold their entry until release_media()
+        if not transcription_only:
+            return True
+        if not MEDIA_CACHE.pin(path):
+            return False
+        info_out['pinned_media'] = path
+        return True
+
+    def _deliver(path, extractor, video_id, offset=0.0):
+        info_out.update({'extractor': extractor, 'video_id': video_id, 'media_offset': offset})
+        if transcription_only:
+            return path
+        stem = base_name or media_stem(extractor, video_id)
+        if offset or os.path.basename(path).startswith(format_key + "@"):
+            stem = f"{stem}_{os.path.splitext(os.path.basename(path))[0].split('@', 1)[1]}s"
+        return _publish_media(path, output_dir, stem)
+
+    def _cached(lookup):
+        # A full download covers any range; otherwise look for this exact section
+        hit = lookup(format_key)
+        if hit or section is None:
+            return hit, 0.0
+        s0, e0 = _section_bounds(section)
+        return lookup(_section_key(format_key, s0, e0)), s0
+
+    with MEDIA_CACHE.key_lock(url, format_key if section is None else _section_key(format_key, *_section_bounds(section))):
+        if use_cache:
+            # One hit or miss per request, however many keys are probed for it
+            hit, offset = _cached(lambda key: MEDIA_CACHE.lookup_url(url, key, preferred_ext=expected_ext,
+                                                                     count=False))
+            if hit and _pin(hit[0]):
+                cached, extractor, video_id = hit
+                print(f"Media cache hit for {url}: {cached}")
+                MEDIA_CACHE.count_request(True)
+                metrics.record("download", seconds=0.0, bytes=0, cached=True)
+                _report_cached(progress_callback, cached)
+                return _deliver(cached, extractor, video_id, offset)
+
+        base_opts = {
+            'verbose': False,
+            'ignoreerrors': False,
+            'quiet': True,
+        }
+        try:
+            # Resolve metadata first: the video ID decides where the download lives
+            with metrics.stage("resolve"), yt_dlp.YoutubeDL(base_opts) as ydl:
+                info_dict = ydl.extract_info(url, download=False)
+            check_cancelled(cancel)
+            if not info_dict:
+                raise RuntimeError("no video information returned")
+            extractor = info_dict.get('extractor_key') or info_dict.get('extractor') or 'generic'
+            video_id = info_dict.get('id')
+            if not video_id:
+                raise RuntimeError("extractor did not report a video ID")
+            info_out['title'] = info_dict.get('title')
+            info_out['duration'] = info_dict.get('duration')
+
+            if use_cache:
+                cached, offset = _cached(lambda key: MEDIA_CACHE.lookup(extractor, video_id, key,
+                                                                        preferred_ext=expected_ext, count=False))
+                if cached and _pin(cached):
+                    print(f"Media cache hit for {extractor} video {video_id}: {cached}")
+                    MEDIA_CACHE.count_request(True)
+                    MEDIA_CACHE.record_url(url, extractor, video_id)
+                    metrics.record("download", seconds=0.0, bytes=0, cached=True)
+                    _report_cached(progress_callback, cached)
+                    return _deliver(cached, extractor, video_id, offset)
+                MEDIA_CACHE.count_request(False)
+
+            ydl_opts = dict(base_opts, **format_opts)
+            if progress_callback or cancel is not None:
+                ydl_opts['progress_hooks'] = [_download_progress_hook(progress_callback, info_dict, cancel)]
+            entry_key, offset = format_key, 0.0
+            if section is not None:
+                s0, e0 = _section_bounds(section, info_dict.get('duration'))
+                if s0 > 0 or e0 is not None:
+                    if e0 is None and not info_dict.get('duration'):
+                        print("Video duration unknown; downloading the full video instead of a section.")
+                    else:
+                        # Only the requested range (plus padding) is fetched
+                        range_end = e0 if e0 is not None else float(info_dict['duration'])
+                        ydl_opts['download_ranges'] = yt_dlp.utils.download_range_func(None, [(s0, range_end)])
+                        # Video stream copies would snap to the previous keyframe and shift every
+                        # timestamp; cut exactly. Audio packets are short enough to copy as-is.
+                        ydl_opts['force_keyframes_at_cuts'] = format_key in ("mp4_best_video", "mkv_best_video")
+                        entry_key, offset = _section_key(format_key, *_section_bounds(section)), s0
+
+            with MEDIA_CACHE.incoming_dir() as incoming:
+                ydl_opts['outtmpl'] = os.path.join(incoming, 'media').replace('%', '%%') + '.%(ext)s'
+                print(f"yt-dlp options: {ydl_opts}")
+                with metrics.stage("download", cached=False) as stage:
+                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                        # Reuse the resolved info instead of extracting the page a second time
+                        info_dict = ydl.process_ie_result(info_dict, download=True) or info_dict
+                    downloaded = _find_download(incoming, expected_ext)
+                    if not downloaded:
+                        raise FileNotFoundError(f"Downloaded media file not found (expected media.{expected_ext or '*'}).")
+                    stage['bytes'] = os.path.getsize(downloaded)
+                MEDIA_CACHE.discard(extractor, video_id, entry_key)
+                downloaded_file_actual_path = MEDIA_CACHE.adopt(downloaded, extractor, video_id, entry_key)
         except Exception as e:
+            if cancel is not None and cancel.cancelled:
+                # yt-dlp may wrap the hook's exception in one of its own
+                raise Cancelled() from e
             raise RuntimeError(f"yt-dlp download or processing failed: {e}")
 
-    if not downloaded_file_actual_path or not os.path.exists(downloaded_file_actual_path):
-        raise FileNotFoundError(f"Downloaded media file not found. Expected near {final_output_path}, found {downloaded_file_actual_path if downloaded_file_actual_path else 'nothing'}.")
-    
-    # Ensure the file to be returned has the correct expected extension if renaming is implicitly handled by yt-dlp
-    # For audio, the postprocessor usually handles this. For video, outtmpl with %(ext)s is usually fine.
-    # The key is that `downloaded_file_actual_path` points to the real file.
-    print(f"Download successful. Media at: {downloaded_file_actual_path}")
-    return downloaded_file_actual_path
+        MEDIA_CACHE.record(url, extractor, video_id, entry_key, downloaded_file_actual_path, info_dict,
+                           pin=transcription_only)
+        if transcription_only:
+            info_out['pinned_media'] = downloaded_file_actual_path
 
+    published = _deliver(downloaded_file_actual_path, extractor, video_id, offset)
+    print(f"Download successful. Media at: {published}")
+    return published
 
-@contextmanager
-def _whisper_tqdm_bridge(progress_cb):
-    """Temporarily replace tqdm used by Whisper to forward progress to callback.
 
-    progress_cb signature: (percent:int, current:int, total:int)
+def release_media(info):
+    """Let MEDIA_CACHE evict the file download_video() pinned for this job again.
+
+    info is the dict download_video() filled in; calling this more than once, or
+    for a job that pinned nothing, is harmless.
     """
-    if _tqdm is None:
-        # No tqdm available; just yield without patching
-        yield
-        return
-    orig_tqdm = _tqdm.tqdm
-    orig_trange = _tqdm.trange
+    path = info.pop('pinned_media', None)
+    if path:
+        MEDIA_CACHE.unpin(path)
 
-    class _TqdmProxy(orig_tqdm):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            self._emit()
 
-        def update(self, n=1):
-            res = super().update(n)
-            self._emit()
-            return res
+def _report_cached(progress_callback, path):
+    if progress_callback:
+        size = os.path.getsize(path)
+        progress_callback(100.0, size, size)
+
+
+def _download_progress_hook(progress_callback, info_dict, cancel=None):
+    """yt-dlp progress hook that reports overall progress across every downloaded stream.
+
+    Video formats fetch video and audio one after the other; bytes of finished
+    streams are carried over so the percentage doesn't restart for the second one.
+    Raising Cancelled from the hook is how a download is stopped part-way.
+    """
+    requested = info_dict.get('requested_formats') or [info_dict]
+    sizes = [f.get('filesize') or f.get('filesize_approx') for f in requested]
+    expected_total = sum(sizes) if all(sizes) else None
+    finished = {}
+
+    def _hook(d):
+        check_cancelled(cancel)
+        status = d.get('status')
+        if status not in ('downloading', 'finished') or progress_callback is None:
+            return
+        filename = d.get('filename')
+        current = d.get('downloaded_bytes') or 0
+        if status == 'finished':
+            finished[filename] = d.get('total_bytes') or current
+            current = 0
+        done = sum(finished.values())
+        current_total = 0 if status == 'finished' else d.get('total_bytes') or d.get('total_bytes_estimate')
+        total = None
+        if current_total is not None:
+            total = done + current_total
+            if expected_total:
+                total = max(total, expected_total)
+        downloaded = done + current
+        pct = min(100.0, downloaded * 100.0 / total) if total else None
+        if pct is None and d.get('fragment_count'):
+            # HLS/DASH without size information: count fragments instead
+            pct = min(100.0, (d.get('fragment_index') or 0) * 100.0 / d['fragment_count'])
+        if status == 'finished' and len(finished) >= len(requested):
+            pct = 100.0
+        try:
+            progress_callback(pct, downloaded, total, speed=d.get('speed'), eta=d.get('eta'),
+                              fragment_index=d.get('fragment_index'), fragment_count=d.get('fragment_count'))
+        except Exception:
+            # A broken progress display must not abort the download
+            pass
+
+    return _hook
+
+
+def _find_download(directory, expected_ext):
+    """Locate the file yt-dlp produced in a download folder, preferring expected_ext."""
+    found = None
+    for f_name in sorted(os.listdir(directory)):
+        if not f_name.startswith('media.') or f_name.endswith(('.part', '.ytdl', '.json')):
+            continue
+        found = os.path.join(directory, f_name)
+        if expected_ext and f_name.endswith(f".{expected_ext}"):
+            break
+    return found
+
+
+def _default_device():
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except Exception:
+        return "cpu"
 
-        def set_postfix(self, *args, **kwargs):
-            res = super().set_postfix(*args, **kwargs)
-            self._emit()
-            return res
 
-        def _emit(self):
+class ModelRegistry:
+    """Process-wide cache of loaded Whisper models.
+
+    Models are keyed by (name, device, precision, engine, threads) and kept resident
+    between jobs. precision is the engine's compute type (see engines.py); threads
+    only counts for engines that fix it at load time.
+    Once the estimated size of all resident models exceeds the budget, the least
+    recently used ones are evicted. The most recently requested model is never
+    evicted, even if it alone is larger than the budget.
+    """
+
+    def __init__(self, budget_mb=None):
+        if budget_mb is None:
             try:
-                total = int(self.total) if self.total else 0
-                n = int(self.n)
-                pct = int((n / total) * 100) if total else 0
-                progress_cb(pct, n, total)
-            except Exception:
-                # Never let UI progress reporting break transcription
-                pass
-
-    def _trange_proxy(*args, **kwargs):
-        return _TqdmProxy(range(*args), **kwargs)
-
-    _tqdm.tqdm = _TqdmProxy
-    _tqdm.trange = _trange_proxy
+                budget_mb = float(os.environ.get("RUMBLE_MODEL_CACHE_MB", DEFAULT_MODEL_CACHE_MB))
+            except ValueError:
+                budget_mb = DEFAULT_MODEL_CACHE_MB
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._models = OrderedDict()  # key -> (model, nbytes)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._inference_locks = {}
+
+    def _key(self, name, device=None, precision=None, engine=None, threads=None):
+        engine = get_engine(engine)
+        device = device or _default_device()
+        if precision is None:
+            precision = engine.default_compute_type(device)
+        elif precision not in engine.compute_types:
+            raise ValueError(f"engine '{engine.name}' has no compute type '{precision}' "
+                             f"(choose from {', '.join(engine.compute_types)})")
+        device = engine.device_for(precision, device)
+        threads = int(threads or 0) if engine.threads_at_load else None
+        return (name, device, precision, engine.name, threads)
+
+    def get(self, name, device=None, precision=None, engine=None, threads=None):
+        """Return a resident model, loading it on first use."""
+        key = self._key(name, device, precision, engine, threads)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                return entry[0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other models stay available meanwhile;
+        # the per-key lock stops two jobs from loading the same weights twice.
+        with key_lock:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    self._models.move_to_end(key)
+                    return entry[0]
+            name_, device_, precision_, engine_, threads_ = key
+            print(f"Loading Whisper model: '{name_}' with {engine_} on {device_} ({precision_}) "
+                  f"(this may download the model if not present)...")
+            engine_ = get_engine(engine_)
+            model = engine_.load(name_, device_, precision_, threads_)
+            nbytes = engine_.nbytes(model)
+            with self._lock:
+                self._models[key] = (model, nbytes)
+                self._models.move_to_end(key)
+                self._evict_locked()
+            return model
+
+    def inference_lock(self, name, device=None, precision=None, engine=None, threads=None):
+        """Lock serializing decode calls on the model get() returns for these arguments.
+
+        Whisper installs kv-cache hooks on the shared modules for every decode, so
+        two threads must never run model.transcribe() on the same instance at once.
+        The lock belongs to the cache key rather than the instance, so it outlives
+        an eviction: a job still decoding on an evicted model keeps it held.
+        """
+        key = self._key(name, device, precision, engine, threads)
+        with self._lock:
+            return self._inference_locks.setdefault(key, threading.Lock())
+
+    def is_loaded(self, name, device=None, precision=None, engine=None, threads=None):
+        key = self._key(name, device, precision, engine, threads)
+        with self._lock:
+            return key in self._models
+
+    def set_budget(self, budget_mb):
+        with self._lock:
+            self.budget_bytes = int(float(budget_mb) * 1024 * 1024)
+            self._evict_locked()
+        self._release_memory()
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(nbytes for _, nbytes in self._models.values())
+
+    def info(self):
+        """List resident models as dicts, least recently used first."""
+        with self._lock:
+            return [
+                {"name": k[0], "device": k[1], "precision": k[2], "engine": k[3], "threads": k[4],
+                 "bytes": nbytes}
+                for k, (_, nbytes) in self._models.items()
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+        self._release_memory()
+
+    def _evict_locked(self):
+        total = sum(nbytes for _, nbytes in self._models.values())
+        evicted = False
+        while total > self.budget_bytes and len(self._models) > 1:
+            key, (model, nbytes) = self._models.popitem(last=False)
+            total -= nbytes
+            evicted = True
+            print(f"Evicted Whisper model '{key[0]}' ({key[1]}, {key[2]}) from cache to stay within memory budget.")
+        if evicted:
+            self._release_memory()
+
+    @staticmethod
+    def _release_memory():
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
+
+
+MODEL_REGISTRY = ModelRegistry()
+TRANSCRIPT_CACHE = TranscriptCache()
+MEDIA_CACHE = MediaCache()
+TRANSCRIPTION_HISTORY = TranscriptionHistory()
+CHECKPOINTS = CheckpointStore()
+
+
+def get_model(model_name, device=None, precision=None, engine=None, threads=None):
+    """Fetch a model for an inference engine through the process-wide registry."""
     try:
-        yield
-    finally:
-        _tqdm.tqdm = orig_tqdm
-        _tqdm.trange = orig_trange
+        return MODEL_REGISTRY.get(model_name, device=device, precision=precision, engine=engine, threads=threads)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load Whisper model '{model_name}'. Error: {e}")
 
 
 def transcribe(audio_path, model_name='medium', lang='English', formats=None,
                verbose_transcription=False, start_time=None, end_time=None,
-               progress_callback=None):
+               progress_callback=None, output_dir=None, use_cache=True, time_offset=0.0,
+               workers=1, chunk_seconds=None, stream=False, metrics=None, json_mode=DEFAULT_JSON_MODE,
+               engine=None, compute_type=None, threads=None, vad=False, cancel=None):
+    """Transcribe audio_path and write the requested formats; returns the output paths.
+
+    time_offset is where audio_path starts within the original video (non-zero for
+    section downloads). start_time/end_time are given on the original video's
+    timeline, and segment timestamps of range jobs are reported on it as well.
+
+    workers > 1 cuts long audio at silences into ~chunk_seconds pieces and decodes
+    them in that many worker processes (see parallel.transcribe_chunked).
+
+    stream=True appends segments to every format as each window is decoded (files
+    grow as '<name>.<fmt>.part' and are renamed into place when the job ends).
+
+    metrics (a JobMetrics) receives the decode, model load, inference and per-format
+    write timings.
+
+    All formats are written in one pass over the segments (see exporters.py);
+    json_mode is 'pretty' (json.dump's indented layout), 'stream' or 'compact'.
+
+    engine picks the inference engine (see engines.py; default 'whisper'), with
+    its compute_type (e.g. 'int8' for ctranslate2) and CPU threads (None: the
+    library's default).
+
+    vad=True runs a voice activity pre-pass (see vad.py): only the speech regions
+    are transcribed, and the seconds skipped are recorded under metrics' 'vad' stage.
+
+    With use_cache, progress is checkpointed while the job runs (see
+    cache.CheckpointStore) and the same job started again after a crash resumes
+    where it stopped, with the same result an uninterrupted run gives.
+
+    cancel (a cancellation.CancelToken) stops the job cooperatively: ffmpeg is
+    killed, decoding stops after the current window and Cancelled is raised.
+    Streamed partial files are removed and the latest checkpoint is kept, so
+    running the job again later resumes it.
+    """
+    check_cancelled(cancel)
     if not formats:
         formats = ["txt"]
-    
-    # This print goes to console. GUI gets updates from WorkerThread.progress
-    print(f"Loading Whisper model: '{model_name}' (this may download the model if not present)...")
+    if metrics is None:
+        metrics = JobMetrics(source=audio_path)
+
+    time_offset = float(time_offset or 0)
+    local_start, local_end = _local_range(start_time, end_time, time_offset)
+    workers = max(1, int(workers or 1))
+    chunk_seconds = float(chunk_seconds or DEFAULT_CHUNK_SECONDS)
+    engine, compute_type, options, variants, vad_backend = _decode_options(engine, compute_type, workers,
+                                                                           chunk_seconds, vad)
+
+    if output_dir is None:
+        output_dir = os.path.dirname(audio_path)
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+    base_filename = transcript_basename(audio_path, model_name, start_time, end_time,
+                                        variant="_".join(variants) or None)
+    # Whisper times are relative to the decoded audio; this moves them onto the original timeline
+    shift = (local_start or 0.0) + time_offset
+
+    cache_key = None
+    result = None
+    if use_cache:
+        try:
+            cache_key = TRANSCRIPT_CACHE.make_key(
+                file_digest(audio_path), model_name, lang, local_start, local_end,
+                options=options,
+            )
+            result = TRANSCRIPT_CACHE.get(cache_key, media_bytes=os.path.getsize(audio_path))
+        except OSError as e:
+            print(f"Warning: transcript cache unavailable: {e}")
+            cache_key = None
+        if result is not None:
+            print(f"Transcript cache hit for {audio_path}; skipping transcription.")
+            metrics.record("transcript_cache", hit=True)
+            if progress_callback:
+                progress_callback(100, 1, 1)
+
+    checkpoint = CHECKPOINTS.open(cache_key) if cache_key and result is None else None
+    if not stream:
+        if result is None:
+            with _released_on_cancel():
+                result = _run_inference(audio_path, model_name, lang, verbose_transcription,
+                                        local_start, local_end, progress_callback, engine.name, compute_type,
+                                        threads, workers, chunk_seconds, metrics=metrics, vad_backend=vad_backend,
+                                        checkpoint=checkpoint, cancel=cancel)
+            if cache_key:
+                TRANSCRIPT_CACHE.put(cache_key, result)
+            if checkpoint:
+                checkpoint.discard()
+        return _write_outputs(result, formats, output_dir, base_filename, metrics, offset=shift,
+                              json_mode=json_mode)
+
+    exporter = TranscriptExporter(output_dir, base_filename, formats, offset=shift, json_mode=json_mode)
     try:
-        model = whisper.load_model(model_name)
-    except Exception as e:
-        raise RuntimeError(f"Failed to load Whisper model '{model_name}'. Error: {e}")
-    print(f"Model '{model_name}' loaded. Starting transcription for: {audio_path}")
+        if result is None:
+            with _released_on_cancel():
+                result = _run_inference(audio_path, model_name, lang, verbose_transcription,
+                                        local_start, local_end, progress_callback, engine.name, compute_type,
+                                        threads, workers, chunk_seconds,
+                                        segment_callback=exporter.add_segments, metrics=metrics,
+                                        vad_backend=vad_backend, checkpoint=checkpoint, cancel=cancel)
+            if cache_key:
+                TRANSCRIPT_CACHE.put(cache_key, result)
+            if checkpoint:
+                checkpoint.discard()
+        else:
+            exporter.add_transcript(result)
+        if not any(w.count for w in exporter.writers) and len(result):
+            # Whisper without a usable progress hook: write everything now
+            exporter.add_transcript(result)
+        outputs = exporter.finalize(result)
+        for writer in exporter.writers:
+            metrics.record(f"write_{writer.path.rsplit('.', 1)[-1]}", seconds=writer.seconds,
+                           bytes=os.path.getsize(writer.path), streamed=True)
+        return outputs
+    except BaseException as e:
+        exporter.abort(discard=isinstance(e, Cancelled))
+        raise
+
+
+def transcript_basename(audio_path, model_name, start_time=None, end_time=None, variant=None):
+    """Stable stem for a transcript that differs whenever the settings differ.
 
-    audio_to_use = audio_path
-    temp_segment = None
+    e.g. 'rumble-v4abc12_turbo_transcript' or 'talk_small_90-180s_transcript', so jobs
+    that transcribe the same media with another model or range never overwrite each other.
+    variant (e.g. 'ctranslate2-int8') follows the model name when given.
+    """
+    cached = MEDIA_CACHE.identify(audio_path)
+    # Transcription-only jobs read straight from the media cache; name those after the video
+    stem = media_stem(*cached) if cached else os.path.splitext(os.path.basename(audio_path))[0]
+    parts = [stem, _safe_stem(model_name)]
+    if variant:
+        parts.append(_safe_stem(variant))
+    if start_time is not None or end_time is not None:
+        start_part = f"{float(start_time or 0):g}"
+        if end_time is None:
+            parts.append(f"{start_part}s-end")
+        else:
+            parts.append(f"{start_part}-{float(end_time):g}s")
+    return "_".join(parts) + "_transcript"
+
+
+def _local_range(start_time, end_time, time_offset):
+    """start_time/end_time on the original video's timeline as a range within the file."""
     if start_time is not None or end_time is not None:
-        # extract portion of media using ffmpeg
         start = float(start_time or 0)
         end = float(end_time) if end_time is not None else None
         if end is not None and end <= start:
             raise ValueError("end_time must be greater than start_time")
-        suffix = os.path.splitext(audio_path)[1]
-        temp_fd, temp_segment = tempfile.mkstemp(suffix=suffix)
-        os.close(temp_fd)
-        ff_cmd = [
-            "ffmpeg",
-            "-y",
-            "-ss",
-            str(start),
-            "-i",
-            audio_path,
-        ]
-        if end is not None:
-            ff_cmd += ["-t", str(end - start)]
-        ff_cmd += ["-c", "copy", temp_segment]
-        try:
-            subprocess.run(ff_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            audio_to_use = temp_segment
-        except subprocess.CalledProcessError as e:
-            if temp_segment and os.path.exists(temp_segment):
-                os.remove(temp_segment)
-            raise RuntimeError(f"Failed to extract media segment: {e}")
+    local_start = max(0.0, float(start_time) - time_offset) if start_time is not None else None
+    local_end = float(end_time) - time_offset if end_time is not None else None
+    if local_start is None and time_offset and local_end is not None:
+        local_start = 0.0
+    return local_start, local_end
 
-    if progress_callback:
-        with _whisper_tqdm_bridge(progress_callback):
-            result = model.transcribe(audio_to_use, language=lang, verbose=verbose_transcription)
+
+def _decode_options(engine, compute_type, workers, chunk_seconds, vad):
+    """(engine, compute_type, cache key options, file name variants, VAD backend) for transcribe()."""
+    engine = get_engine(engine)
+    if compute_type is None:
+        # Half precision only where the model will be resident on a GPU
+        compute_type = engine.default_compute_type(_default_device())
+    elif compute_type not in engine.compute_types:
+        raise ValueError(f"engine '{engine.name}' has no compute type '{compute_type}' "
+                         f"(choose from {', '.join(engine.compute_types)})")
+    options = {"fp16": compute_type == "fp16", "task": "transcribe"}
+    # Plain fp32/fp16 Whisper keys and file names stay as they were; anything else is kept apart
+    variants = []
+    if engine.name != DEFAULT_ENGINE or compute_type not in ("fp32", "fp16"):
+        options.update(engine=engine.name, compute_type=compute_type)
+        variants.append(f"{engine.name}-{compute_type}")
+    vad_backend = default_backend() if vad else None
+    if vad_backend:
+        options["vad"] = vad_backend
+        variants.append("vad")
+    if workers > 1:
+        # Chunks are decoded without each other's context, so results differ slightly
+        options["chunk_seconds"] = chunk_seconds
+    return engine, compute_type, options, variants, vad_backend
+
+
+def transcript_cached(audio_path, model_name='medium', lang='English', start_time=None, end_time=None,
+                      time_offset=0.0, workers=1, chunk_seconds=None, engine=None, compute_type=None, vad=False):
+    """Whether transcribe() with these arguments would be answered from TRANSCRIPT_CACHE.
+
+    Hashes the file (memoized, so transcribe() does not hash it again) but loads
+    nothing. A file that cannot be read counts as not cached.
+    """
+    workers = max(1, int(workers or 1))
+    chunk_seconds = float(chunk_seconds or DEFAULT_CHUNK_SECONDS)
+    options = _decode_options(engine, compute_type, workers, chunk_seconds, vad)[2]
+    local_start, local_end = _local_range(start_time, end_time, float(time_offset or 0))
+    try:
+        key = TRANSCRIPT_CACHE.make_key(file_digest(audio_path), model_name, lang, local_start, local_end,
+                                        options=options)
+    except OSError:
+        return False
+    return TRANSCRIPT_CACHE.contains(key)
+
+
+def _run_inference(audio_path, model_name, lang, verbose_transcription, start_time, end_time,
+                   progress_callback, engine, compute_type, threads=None, workers=1,
+                   chunk_seconds=DEFAULT_CHUNK_SECONDS, segment_callback=None, metrics=None, vad_backend=None,
+                   checkpoint=None, cancel=None):
+    if metrics is None:
+        metrics = JobMetrics(source=audio_path)
+    # Decode exactly the requested samples into memory; every engine accepts the array.
+    # Whisper would run the same ffmpeg decode itself, doing it here lets it be timed.
+    with metrics.stage("decode") as stage:
+        audio_to_use = load_audio(audio_path, start_time, end_time, cancel=cancel)
+        audio_seconds = len(audio_to_use) / SAMPLE_RATE
+        stage['audio_seconds'] = round(audio_seconds, 3)
+
+    speech_map = None
+    if vad_backend:
+        check_cancelled(cancel)
+        with metrics.stage("vad", backend=vad_backend) as stage:
+            regions, _ = detect_speech(audio_to_use, backend=vad_backend)
+            speech_map = SpeechMap(regions, len(audio_to_use))
+            audio_to_use = speech_map.audio(audio_to_use)
+            stage.update(regions=len(regions), audio_seconds=round(audio_seconds, 3),
+                         speech_seconds=round(speech_map.speech_seconds, 3),
+                         skipped_seconds=round(speech_map.skipped_seconds, 3))
+        print(f"Voice activity: {len(regions)} speech region(s), skipping "
+              f"{speech_map.skipped_seconds:.1f} of {audio_seconds:.1f} s.")
+        if not regions:
+            print("No speech found; nothing to transcribe.")
+            if progress_callback:
+                progress_callback(100, 1, 1)
+            return Transcript.from_result({"text": "", "segments": [], "language": None})
+        if segment_callback:
+            # Streamed segments reach the writers already on the original timeline
+            segment_callback = _mapped_callback(segment_callback, speech_map)
+
+    if workers > 1:
+        started = time.perf_counter()
+        with _checkpointing(checkpoint, "chunks", audio_to_use, metrics) as (resume, checkpoint_callback):
+            result = transcribe_chunked(audio_to_use, model_name, lang, workers, device=_default_device(),
+                                        engine=engine, compute_type=compute_type,
+                                        chunk_seconds=chunk_seconds,
+                                        progress_callback=progress_callback,
+                                        segment_callback=segment_callback,
+                                        resume=resume, checkpoint_callback=checkpoint_callback, cancel=cancel)
+        if result is not None:
+            # Worker processes load their own model copies; that time is part of inference here
+            _record_inference(metrics, time.perf_counter() - started, audio_seconds, result, workers=workers,
+                              engine=engine, compute_type=compute_type)
+            print("Transcription complete.")
+            return Transcript.from_result(_unmap(result, speech_map))
+        # Too short to split; a single decode in this process is faster
+
+    check_cancelled(cancel)
+    model_key = dict(precision=compute_type, engine=engine, threads=threads)
+    # This print goes to console. The GUI gets updates through progress_callback
+    if "model_load" in metrics.stages and MODEL_REGISTRY.is_loaded(model_name, **model_key):
+        # The caller already timed loading this model for the job
+        model = get_model(model_name, **model_key)
     else:
-        result = model.transcribe(audio_to_use, language=lang, verbose=verbose_transcription)
-    segments = result.get('segments', [])
+        with metrics.stage("model_load", model=model_name, engine=engine,
+                           cached=MODEL_REGISTRY.is_loaded(model_name, **model_key)):
+            model = get_model(model_name, **model_key)
+    print(f"Model '{model_name}' ready ({engine}, {compute_type}). Starting transcription for: {audio_path}")
+    # Loading can't be interrupted; don't start decoding if the job was cancelled meanwhile
+    check_cancelled(cancel)
+
+    resumable = get_engine(engine).resumable
+    if not resumable:
+        # Its decoder state cannot be captured; chunked runs (workers > 1) still resume per chunk
+        checkpoint = None
+    with _acquired(MODEL_REGISTRY.inference_lock(model_name, **model_key), cancel), \
+            _checkpointing(checkpoint, "window", audio_to_use, metrics) as (resume, checkpoint_callback):
+        extra = dict(resume=resume, checkpoint_callback=checkpoint_callback) if resumable else {}
+        # Timed inside the lock so waiting for another job's decode isn't counted
+        started = time.perf_counter()
+        result = get_engine(engine).transcribe(model, audio_to_use, lang, compute_type,
+                                               verbose=verbose_transcription, threads=threads,
+                                               progress_callback=progress_callback,
+                                               segment_callback=segment_callback, cancel=cancel, **extra)
+        elapsed = time.perf_counter() - started
+    _record_inference(metrics, elapsed, audio_seconds, result, engine=engine, compute_type=compute_type)
     print("Transcription complete.")
+    # The engine's per-segment dicts are packed into columns; everything downstream reads those
+    return Transcript.from_result(_unmap(result, speech_map))
+
+
+@contextmanager
+def _checkpointing(checkpoint, mode, samples, metrics):
+    """(resume state or None, checkpoint callback or None) for one engine run.
+
+    A saved state is only used if it was taken in the same mode on audio of the same
+    length; everything else about the job is already part of the checkpoint's key.
+    The latest state is written out if the run fails, and what happened is recorded
+    under metrics' 'checkpoint' stage.
+    """
+    if checkpoint is None:
+        yield None, None
+        return
+    saved = checkpoint.state or {}
+    resume = None
+    if saved.get("mode") == mode and saved.get("audio_samples") == len(samples):
+        resume = saved.get("state")
+    if resume and mode == "window":
+        # seek counts Whisper's 10 ms mel frames
+        print(f"Resuming from a checkpoint at {resume['seek'] / 100:.1f} s "
+              f"({len(resume['segments'])} segments already done).")
+
+    def _callback(state):
+        checkpoint.update({"mode": mode, "audio_samples": len(samples), "state": state})
+    try:
+        yield resume, _callback
+    except BaseException:
+        checkpoint.flush()
+        raise
+    finally:
+        metrics.record("checkpoint", resumed=bool(resume), writes=checkpoint.writes)
+
+
+@contextmanager
+def _acquired(lock, cancel=None):
+    """Hold lock, giving up with Cancelled if the job is cancelled while it waits."""
+    if cancel is None:
+        with lock:
+            yield
+        return
+    while not lock.acquire(timeout=0.25):
+        cancel.check()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+@contextmanager
+def _released_on_cancel():
+    """Free a cancelled job's audio and tensors now rather than whenever its exception is dropped."""
+    try:
+        yield
+    except Cancelled as e:
+        # The traceback keeps the finished frames alive, and with them the audio and mel arrays
+        traceback.clear_frames(e.__traceback__)
+        ModelRegistry._release_memory()
+        print("Transcription cancelled.")
+        raise
+
+
+def _unmap(result, speech_map):
+    """The result with its times moved from the joined speech back onto the decoded audio."""
+    if speech_map is None:
+        return result
+    return dict(result, segments=speech_map.map_segments(result.get("segments") or []))
+
+
+def _mapped_callback(segment_callback, speech_map):
+    def _callback(segments):
+        segment_callback(speech_map.map_segments(segments))
+    return _callback
+
 
-    output_dir = os.path.dirname(audio_path)
-    base_filename = os.path.splitext(os.path.basename(audio_path))[0] + "_transcript"
-    outputs = []
-
-    if "txt" in formats:
-        txt_path = os.path.join(output_dir, base_filename + ".txt")
-        with open(txt_path, "w", encoding="utf-8") as f:
-            f.write(result["text"].strip() + "\n")
-        outputs.append(txt_path)
-    # ... (rest of the format writing functions remain the same) ...
-    if "srt" in formats:
-        srt_path = os.path.join(output_dir, base_filename + ".srt")
-        write_srt(segments, srt_path)
-        outputs.append(srt_path)
-    if "vtt" in formats:
-        vtt_path = os.path.join(output_dir, base_filename + ".vtt")
-        write_vtt(segments, vtt_path)
-        outputs.append(vtt_path)
-    if "tsv" in formats:
-        tsv_path = os.path.join(output_dir, base_filename + ".tsv")
-        write_tsv(segments, tsv_path)
-        outputs.append(tsv_path)
-    if "json" in formats:
-        json_path = os.path.join(output_dir, base_filename + ".json")
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
-        outputs.append(json_path)
-    if temp_segment and os.path.exists(temp_segment):
-        os.remove(temp_segment)
-    return outputs
-
-def format_timestamp(seconds_float, always_include_hours=False, decimal_marker=','):
-    if seconds_float is None: return f"00:00:00{decimal_marker}000"
+def _record_inference(metrics, seconds, audio_seconds, result, workers=1, engine=DEFAULT_ENGINE,
+                      compute_type=None):
+    segments = len(result.get('segments', []))
+    metrics.record(
+        "inference", seconds=seconds, audio_seconds=round(audio_seconds, 3), workers=workers,
+        engine=engine, compute_type=compute_type,
+        real_time_factor=round(seconds / audio_seconds, 4) if audio_seconds else None,
+        segments=segments, segments_per_second=round(segments / seconds, 2) if seconds else None,
+    )
+
+
+def _write_outputs(result, formats, output_dir, base_filename, metrics=None, offset=0.0,
+                   json_mode=DEFAULT_JSON_MODE):
+    if metrics is None:
+        metrics = JobMetrics()
+
+    # Everything is written in a private scratch folder first and only renamed into
+    # output_dir once complete, so concurrent jobs and readers never see partial files
+    with job_workspace(output_dir, base_filename) as work:
+        with metrics.stage("export", formats=len(formats)):
+            writers = export_result(result, work, base_filename, formats, offset=offset, json_mode=json_mode)
+        for writer in writers:
+            metrics.record(f"write_{writer.path.rsplit('.', 1)[-1]}", seconds=writer.seconds,
+                           bytes=os.path.getsize(writer.path))
+        return [publish_file(w.path, os.path.join(output_dir, os.path.basename(w.path))) for w in writers]
+
+
+def warm_imports(modules=HEAVY_MODULES):
+    """Import the heavy dependencies ahead of their first use; returns seconds per module.
+
+    Meant for a background thread once the UI is up. Imports that fail are left for
+    the code that needs them to report.
+    """
+    timings = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            __import__(name)
+        except Exception as e:
+            print(f"Warning: background import of {name} failed: {e}")
+            continue
+        timings[name] = round(time.perf_counter() - started, 3)
+    return timings
+
+
+def remember_transcribed(info, model_name, outputs):
+    """Note a finished job in TRANSCRIPTION_HISTORY so channel syncs skip the video.
+
+    info is the dict download_video() filled in; jobs on local files have no
+    video ID and are not recorded.
+    """
+    if not info.get("video_id") or not info.get("extractor"):
+        return
     try:
-        seconds_float = float(seconds_float)
-    except (ValueError, TypeError):
-        return f"00:00:00{decimal_marker}000"
-
-    milliseconds_total = round(seconds_float * 1000.0)
-    hours = milliseconds_total // 3_600_000
-    minutes = (milliseconds_total % 3_600_000) // 60_000
-    seconds = (milliseconds_total % 60_000) // 1000
-    milliseconds = milliseconds_total % 1000
-
-    hours_str = f"{int(hours):02d}:" if always_include_hours or hours > 0 else ""
-    return f"{hours_str}{int(minutes):02d}:{int(seconds):02d}{decimal_marker}{int(milliseconds):03d}"
-
-def write_srt(segments, out_path):
-    with open(out_path, "w", encoding="utf-8") as f:
-        for i, seg in enumerate(segments, 1):
-            start_time = seg.get('start', 0.0)
-            end_time = seg.get('end', 0.0)
-            text = seg.get('text', "").strip()
-            f.write(f"{i}\n")
-            f.write(f"{format_timestamp(start_time, True, ',')} --> {format_timestamp(end_time, True, ',')}\n")
-            f.write(text + "\n\n")
-
-def write_vtt(segments, out_path):
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write("WEBVTT\n\n")
-        for seg in segments:
-            start_time = seg.get('start', 0.0)
-            end_time = seg.get('end', 0.0)
-            text = seg.get('text', "").strip()
-            f.write(f"{format_timestamp(start_time, False, '.')} --> {format_timestamp(end_time, False, '.')}\n")
-            f.write(text + "\n\n")
-
-def write_tsv(segments, out_path):
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write("start\tend\ttext\n")
-        for seg in segments:
-            start_time = seg.get('start', 0.0)
-            end_time = seg.get('end', 0.0)
-            text = seg.get('text', "").strip().replace('\t', ' ')
-            f.write(f"{start_time:.3f}\t{end_time:.3f}\t{text}\n")
+        TRANSCRIPTION_HISTORY.record_transcribed(info["extractor"], info["video_id"], model_name, outputs)
+    except OSError as e:
+        print(f"Warning: could not update transcription history: {e}")
+
 
 def run_main_gui():
     from gui import run_gui_app
     run_gui_app()
 
+
+def _read_source_list(path):
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        return [line.strip() for line in stream if line.strip() and not line.lstrip().startswith("#")]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Transcribe Rumble videos and local media files with Whisper. "
+                    "Run without arguments to open the GUI.",
+    )
+    parser.add_argument("inputs", nargs="*",
+                        help="Rumble URLs or local media files ('-' reads the list from stdin)")
+    parser.add_argument("-i", "--input-file", action="append", default=[],
+                        help="File with one URL or path per line ('-' for stdin); may be repeated")
+    parser.add_argument("-o", "--output-dir", default=".", help="Folder for media and transcripts (default: .)")
+    parser.add_argument("-m", "--model", default="turbo", help="Whisper model name (default: turbo)")
+    parser.add_argument("-l", "--language", default="English", help="Spoken language (default: English)")
+    parser.add_argument("-f", "--formats", default="txt",
+                        help="Comma-separated transcript formats: txt,srt,vtt,tsv,json or 'all' (default: txt)")
+    parser.add_argument("--download-format", default="mp3_best", choices=sorted(DOWNLOAD_FORMATS),
+                        help="Media format to download (default: mp3_best)")
+    parser.add_argument("--start", help="Start time (HH:MM:SS or seconds)")
+    parser.add_argument("--end", help="End time (HH:MM:SS or seconds)")
+    parser.add_argument("--download-jobs", type=int, default=2,
+                        help="Concurrent downloads (default: 2)")
+    parser.add_argument("--transcribe-jobs", type=int, default=1,
+                        help="Concurrent transcriptions (default: 1)")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE, choices=list(ENGINES),
+                        help="Inference engine: openai-whisper on PyTorch, or CTranslate2 through "
+                             f"faster-whisper, much faster on CPU (default: {DEFAULT_ENGINE})")
+    parser.add_argument("--compute-type",
+                        help="Engine compute type: fp32, fp16 or int8 (dynamically quantized, CPU only) "
+                             "for whisper; int8, int8_float32, float32, int8_float16 or float16 for "
+                             "ctranslate2 (default: fp32 or int8 on CPU, fp16 on a GPU)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="CPU threads for inference (default: the library's own choice)")
+    parser.add_argument("--vad", action="store_true",
+                        help="Find speech with a voice activity detector first and transcribe only that, "
+                             "skipping silence, dead air and (with webrtcvad installed) most music")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes per transcription; long media is split at silences "
+                             "and the pieces decoded in parallel (default: 1)")
+    parser.add_argument("--chunk-seconds", type=float, default=DEFAULT_CHUNK_SECONDS,
+                        help=f"Target chunk length for --workers > 1 (default: {DEFAULT_CHUNK_SECONDS:g})")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write transcript files incrementally as segments are decoded "
+                             "(tail the growing '<name>.<fmt>.part' files)")
+    parser.add_argument("--json-mode", choices=JSON_MODES, default=DEFAULT_JSON_MODE,
+                        help="JSON layout: indented (pretty), full segments one per line (stream) or "
+                             f"essential fields only (compact) (default: {DEFAULT_JSON_MODE})")
+    parser.add_argument("--expand", action="store_true",
+                        help="Try every URL as a channel or playlist (channel/playlist URLs of known "
+                             "sites are expanded into their videos anyway)")
+    parser.add_argument("--only-new", action="store_true",
+                        help="For channels and playlists, only take videos newer than the last run "
+                             "(plus any that did not finish then)")
+    parser.add_argument("--include-done", action="store_true",
+                        help="Also queue channel/playlist videos already transcribed with this model")
+    parser.add_argument("--max-videos", type=int, default=None,
+                        help="Take at most this many videos from each channel or playlist")
+    parser.add_argument("--resolve-jobs", type=int, default=DEFAULT_RESOLVE_WORKERS,
+                        help=f"Concurrent metadata lookups when expanding channels (default: {DEFAULT_RESOLVE_WORKERS})")
+    parser.add_argument("--transcription-only", "--delete-media", dest="transcription_only", action="store_true",
+                        help="Don't keep downloaded media: fetch the native audio stream without "
+                             "re-encoding and write only transcripts to the output folder")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always download and run Whisper again, bypassing the media and transcript caches")
+    parser.add_argument("--summary", choices=["json", "jsonl"], default="json",
+                        help="Summary printed to stdout: one JSON document or one line per job (default: json)")
+    parser.add_argument("--metrics-file", default=os.environ.get("RUMBLE_METRICS_FILE"),
+                        help="Append one JSON line of stage timings per job to this file "
+                             "(default: $RUMBLE_METRICS_FILE)")
+    parser.add_argument("--prometheus-file", default=os.environ.get("RUMBLE_PROMETHEUS_FILE"),
+                        help="Write the stage timings in Prometheus text format to this file "
+                             "(default: $RUMBLE_PROMETHEUS_FILE)")
+    return parser
+
+
+def run_cli(argv=None):
+    """Headless batch mode. Returns the process exit code."""
+    from pipeline import FINAL_STATUSES, Job, Pipeline
+
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+
+    sources = []
+    for item in args.inputs:
+        if item == "-":
+            sources.extend(_read_source_list("-"))
+        else:
+            sources.append(item)
+    for list_path in args.input_file:
+        try:
+            sources.extend(_read_source_list(list_path))
+        except OSError as e:
+            parser.error(f"cannot read input list {list_path}: {e}")
+    if not sources:
+        parser.error("no URLs or files given")
+
+    formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+    if "all" in formats:
+        formats = list(TRANSCRIPT_FORMATS)
+    unknown = [f for f in formats if f not in TRANSCRIPT_FORMATS]
+    if unknown:
+        parser.error(f"unknown transcript format(s): {', '.join(unknown)}")
+    start_time = parse_timestamp(args.start)
+    end_time = parse_timestamp(args.end)
+    if args.start and start_time is None or args.end and end_time is None:
+        parser.error("start/end must be HH:MM:SS or seconds")
+    if start_time is not None and end_time is not None and end_time <= start_time:
+        parser.error("end time must be greater than start time")
+
+    try:
+        check_options(args.engine, args.compute_type, args.threads)
+    except ValueError as e:
+        parser.error(str(e))
+
+    output_dir = os.path.abspath(args.output_dir)
+    download_format_details = DOWNLOAD_FORMATS[args.download_format]
+
+    # Channels and playlists become one job per video; already transcribed ones are skipped
+    collections = list(dict.fromkeys(
+        src for src in sources if not os.path.isfile(src)
+        and src.startswith(("http://", "https://")) and (args.expand or is_collection_url(src))))
+    listings, skipped = [], []
+    expanded = {}
+    if collections:
+        with redirect_stdout(sys.stderr):
+            listings = expand_sources(collections, history=TRANSCRIPTION_HISTORY, only_new=args.only_new,
+                                      limit=args.max_videos, media_cache=MEDIA_CACHE, workers=args.resolve_jobs)
+            selected, skipped = select_new(listings, TRANSCRIPTION_HISTORY, args.model,
+                                           include_done=args.include_done)
+        for entry in selected:
+            expanded.setdefault(entry.collection, []).append(entry.url)
+        for listing in listings:
+            print(f"{listing.source}: {len(listing.entries)} video(s) listed, "
+                  f"{len(expanded.get(listing.source, []))} queued"
+                  + (" (stopped at the previous sync)" if listing.stopped_early else "")
+                  + (f", error: {listing.error}" if listing.error else ""), file=sys.stderr)
+
+    job_sources = []
+    for source in sources:
+        if source in collections:
+            # A repeated channel URL was listed once; its videos are queued once
+            job_sources.extend((url, source) for url in expanded.pop(source, []))
+        else:
+            job_sources.append((source, None))
+
+    jobs = []
+    for index, (source, collection) in enumerate(job_sources, 1):
+        job = Job(index, source, is_local=os.path.isfile(source))
+        job.metrics = JobMetrics(job_id=str(index), source=source)
+        if collection:
+            job.options["collection"] = collection
+        jobs.append(job)
+
+    # Loads the model in the background, but only once some job turns out to need it
+    warm_up = threading.Thread(target=_warm_model, args=(args.model, args.engine, args.compute_type, args.threads),
+                               daemon=True)
+    warm_up_lock = threading.Lock()
+
+    def _warm_up_unless_cached(media_path=None, time_offset=0.0):
+        """Start the model load unless media_path's transcript is cached; returns whether it was needed."""
+        if media_path and not args.no_cache and transcript_cached(
+                media_path, args.model, args.language, start_time=start_time, end_time=end_time,
+                time_offset=time_offset, workers=args.workers, chunk_seconds=args.chunk_seconds,
+                engine=args.engine, compute_type=args.compute_type, vad=args.vad):
+            return False
+        with warm_up_lock:
+            if warm_up.ident is None:
+                warm_up.start()
+        return True
+
+    def _download(job):
+        if not job.source.startswith(("http://", "https://")):
+            raise FileNotFoundError(f"Not a URL or existing file: {job.source}")
+        section = (start_time, end_time) if start_time is not None or end_time is not None else None
+        media_path = download_video(job.source, output_dir, download_format_details, use_cache=not args.no_cache,
+                                    transcription_only=args.transcription_only, section=section,
+                                    info_out=job.info, metrics=job.metrics, cancel=job.cancel_token)
+        # While later downloads are still in flight
+        _warm_up_unless_cached(media_path, job.info.get("media_offset", 0.0))
+        return media_path
+
+    def _transcribe(job):
+        outputs = transcribe(
+            job.media_path,
+            model_name=args.model,
+            lang=args.language,
+            formats=formats,
+            start_time=start_time,
+            end_time=end_time,
+            output_dir=output_dir,
+            use_cache=not args.no_cache,
+            time_offset=job.info.get("media_offset", 0.0),
+            workers=args.workers,
+            chunk_seconds=args.chunk_seconds,
+            stream=args.stream,
+            metrics=job.metrics,
+            json_mode=args.json_mode,
+            engine=args.engine,
+            compute_type=args.compute_type,
+            threads=args.threads,
+            vad=args.vad,
+            cancel=job.cancel_token,
+        )
+        remember_transcribed(job.info, args.model, outputs)
+        return outputs
+
+    def _on_update(job):
+        if job.status in FINAL_STATUSES:
+            release_media(job.info)
+        print(f"[{job.index}/{len(jobs)}] {job.status}: {job.source}", file=sys.stderr)
+
+    pipeline = Pipeline(_download, _transcribe, download_workers=args.download_jobs,
+                        transcribe_workers=args.transcribe_jobs, on_update=_on_update)
+    # Progress chatter from yt-dlp/Whisper goes to stderr; stdout carries only the summary
+    with redirect_stdout(sys.stderr):
+        if args.no_cache:
+            _warm_up_unless_cached()
+        else:
+            # Local files need no download; the first one that misses the transcript
+            # cache starts the model load before the pipeline does
+            for job in jobs:
+                if job.is_local and _warm_up_unless_cached(job.media_path):
+                    break
+        pipeline.run(jobs)
+
+    # Remember where each channel sync began; unfinished videos are retried by --only-new
+    for listing in listings:
+        if listing.error:
+            continue
+        pending = [job.source for job in jobs
+                   if job.options.get("collection") == listing.source and job.status != "done"]
+        try:
+            TRANSCRIPTION_HISTORY.record_sync(listing.source, listing.head, pending)
+        except OSError as e:
+            print(f"Warning: could not update transcription history: {e}", file=sys.stderr)
+
+    records = [job.to_dict() for job in jobs]
+    try:
+        if args.metrics_file:
+            with open(args.metrics_file, "a", encoding="utf-8") as f:
+                for job in jobs:
+                    f.write(job.metrics.to_json() + "\n")
+        if args.prometheus_file:
+            write_prometheus([job.metrics for job in jobs], args.prometheus_file)
+    except OSError as e:
+        print(f"Warning: could not write metrics: {e}", file=sys.stderr)
+    if args.summary == "jsonl":
+        for record in records:
+            print(json.dumps(record, ensure_ascii=False))
+    else:
+        failed = sum(1 for r in records if r["status"] != "done")
+        summary = {"jobs": records, "succeeded": len(records) - failed, "failed": failed,
+                   "skipped": [dict(entry.to_dict(), reason=reason) for entry, reason in skipped],
+                   "collections": [listing.to_dict() for listing in listings],
+                   "media_cache": MEDIA_CACHE.stats(),
+                   "transcript_cache": TRANSCRIPT_CACHE.stats()}
+        if args.vad:
+            summary["voice_activity"] = vad_totals(jobs)
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 0 if all(r["status"] == "done" for r in records) else 1
+
+
+def vad_totals(jobs):
+    """Audio examined and skipped by the voice activity pre-pass, over all jobs."""
+    stages = [job.metrics.to_dict()["stages"].get("vad") for job in jobs if job.metrics is not None]
+    stages = [stage for stage in stages if stage]
+    audio = sum(stage.get("audio_seconds", 0.0) for stage in stages)
+    skipped = sum(stage.get("skipped_seconds", 0.0) for stage in stages)
+    return {"jobs": len(stages), "audio_seconds": round(audio, 3), "skipped_seconds": round(skipped, 3),
+            "skipped_fraction": round(skipped / audio, 4) if audio else 0.0}
+
+
+def _warm_model(model_name, engine=None, compute_type=None, threads=None):
+    try:
+        get_model(model_name, precision=compute_type, engine=engine, threads=threads)
+    except Exception as e:
+        # transcribe() retries the load and reports the error against the job
+        print(f"Warning: background model load failed: {e}", file=sys.stderr)
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_cli())
     run_main_gui()
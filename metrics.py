@@ -0,0 +1,215 @@
+# metrics.py
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+
+METRIC_PREFIX = "rumble_transcriber"
+
+# Stage fields exported to Prometheus as per-stage counters, with their help text.
+# Rates (bytes/s, real-time factor) follow from these totals; they stay in the JSON records.
+_PROM_COUNTERS = {
+    "bytes": ("stage_bytes_total", "Bytes moved by a job stage (downloaded or written)."),
+    "audio_seconds": ("stage_audio_seconds_total", "Seconds of audio handled by a job stage."),
+    "segments": ("inference_segments_total", "Transcript segments produced."),
+    "skipped_seconds": ("vad_skipped_seconds_total", "Seconds of non-speech audio left out of inference."),
+}
+# Stage fields that add up, like 'seconds', when a stage is recorded more than once
+# (retries, chunks, resumed runs); anything else keeps the latest value
+_ADDITIVE_FIELDS = ("bytes", "audio_seconds", "segments", "regions", "speech_seconds", "skipped_seconds",
+                    "writes")
+# Upper bounds of the duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class JobMetrics:
+    """Timings and throughput for one job, collected stage by stage.
+
+    Stages are recorded in the order they finish; running the same stage twice adds
+    the durations up, along with counts such as bytes and audio_seconds. Every stage stores at least 'seconds'; callers attach further
+    fields such as bytes, audio_seconds or a cache hit flag.
+    """
+
+    def __init__(self, job_id=None, source=None):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.source = source
+        self.started_at = time.time()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Time a block as stage name. Yields a dict the block may add fields to."""
+        extra = dict(fields)
+        started = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.record(name, seconds=time.perf_counter() - started, **extra)
+
+    def record(self, name, seconds=None, **fields):
+        with self._lock:
+            entry = self.stages.setdefault(name, {})
+            if seconds is not None:
+                entry["seconds"] = round(entry.get("seconds", 0.0) + seconds, 6)
+            for field, value in fields.items():
+                if field in _ADDITIVE_FIELDS and value is not None and entry.get(field) is not None:
+                    value = round(entry[field] + value, 6)
+                entry[field] = value
+            # Rates follow from the totals, so a repeated stage reports its overall rate
+            seconds = entry.get("seconds")
+            if entry.get("bytes") and seconds:
+                entry["bytes_per_second"] = round(entry["bytes"] / seconds, 1)
+            if entry.get("real_time_factor") is not None and entry.get("audio_seconds"):
+                entry["real_time_factor"] = round(seconds / entry["audio_seconds"], 4)
+            if entry.get("segments_per_second") is not None and seconds:
+                entry["segments_per_second"] = round(entry["segments"] / seconds, 2)
+
+    def to_dict(self):
+        with self._lock:
+            stages = {name: dict(entry) for name, entry in self.stages.items()}
+        return {
+            "job_id": self.job_id,
+            "source": self.source,
+            "started_at": round(self.started_at, 3),
+            "total_seconds": round(time.time() - self.started_at, 3),
+            "stages": stages,
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    def to_prometheus(self):
+        return to_prometheus([self])
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name, labels=""):
+        prefix = labels + "," if labels else ""
+        for bound, count in zip(DURATION_BUCKETS, self.counts):
+            yield f'{name}_bucket{{{prefix}le="{bound}"}} {count}'
+        yield f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}'
+        selector = f"{{{labels}}}" if labels else ""
+        yield f"{name}_sum{selector} {round(self.sum, 6)}"
+        yield f"{name}_count{selector} {self.count}"
+
+
+class StageTotals:
+    """Cumulative Prometheus metrics over every job added, labelled by stage only.
+
+    Each stage gets a duration histogram and counters for the _PROM_COUNTERS fields;
+    whole jobs get a duration histogram of their own. The text written for a
+    scrape always covers every job so far, and the series set stays the same size
+    however many jobs run.
+    """
+
+    def __init__(self, jobs=()):
+        self._lock = threading.Lock()
+        self._jobs = _Histogram()
+        self._durations = {}
+        self._counters = {}
+        for job in jobs:
+            self.add(job)
+
+    def add(self, job_metrics):
+        record = job_metrics.to_dict()
+        with self._lock:
+            self._jobs.observe(record["total_seconds"])
+            for stage, entry in record["stages"].items():
+                if "seconds" in entry:
+                    self._durations.setdefault(stage, _Histogram()).observe(entry["seconds"])
+                for field, value in entry.items():
+                    if field not in _PROM_COUNTERS or isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    counters = self._counters.setdefault(field, {})
+                    counters[stage] = counters.get(stage, 0) + value
+
+    def to_prometheus(self):
+        """Prometheus text exposition format of the totals."""
+        lines = []
+        with self._lock:
+            if self._durations:
+                name = f"{METRIC_PREFIX}_stage_duration_seconds"
+                lines.append(f"# HELP {name} Wall time spent in a job stage.")
+                lines.append(f"# TYPE {name} histogram")
+                for stage, histogram in self._durations.items():
+                    lines.extend(histogram.lines(name, f'stage="{_escape_label(stage)}"'))
+            for field, (metric, help_text) in _PROM_COUNTERS.items():
+                if field not in self._counters:
+                    continue
+                name = f"{METRIC_PREFIX}_{metric}"
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for stage, value in self._counters[field].items():
+                    lines.append(f'{name}{{stage="{_escape_label(stage)}"}} {round(value, 6)}')
+            name = f"{METRIC_PREFIX}_job_duration_seconds"
+            lines.append(f"# HELP {name} Wall time of a whole job.")
+            lines.append(f"# TYPE {name} histogram")
+            lines.extend(self._jobs.lines(name))
+        return "\n".join(lines) + "\n"
+
+
+def to_prometheus(jobs):
+    """Prometheus text exposition format for the totals of a list of JobMetrics."""
+    return StageTotals(jobs).to_prometheus()
+
+
+# Everything emit() has seen in this process; the Prometheus file is rewritten from it
+TOTALS = StageTotals()
+_emit_lock = threading.Lock()
+
+
+def emit(job_metrics, jsonl_path=None, prometheus_path=None):
+    """Append the job's JSON record to jsonl_path and add the job to TOTALS.
+
+    prometheus_path is rewritten from TOTALS, so it covers every job emitted so
+    far rather than just this one.
+
+    Paths default to RUMBLE_METRICS_FILE / RUMBLE_PROMETHEUS_FILE; with neither set
+    the record is only printed.
+    """
+    jsonl_path = jsonl_path or os.environ.get("RUMBLE_METRICS_FILE")
+    prometheus_path = prometheus_path or os.environ.get("RUMBLE_PROMETHEUS_FILE")
+    record = job_metrics.to_json()
+    print(f"Job metrics: {record}")
+    TOTALS.add(job_metrics)
+    with _emit_lock:
+        try:
+            if jsonl_path:
+                with open(jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(record + "\n")
+            if prometheus_path:
+                write_prometheus(TOTALS, prometheus_path)
+        except OSError as e:
+            # Metrics are best effort; a bad path must not fail the job
+            print(f"Warning: could not write metrics: {e}")
+
+
+def write_prometheus(jobs, path):
+    """Write the text format atomically (suits node_exporter's textfile collector).
+
+    jobs is a StageTotals or a list of JobMetrics.
+    """
+    text = jobs.to_prometheus() if isinstance(jobs, StageTotals) else to_prometheus(jobs)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,252 @@
+# parallel.py
+import os
+import atexit
+import signal
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from audio import SAMPLE_RATE, find_silence_splits
+from cancellation import check_cancelled
+
+# Default length of the pieces long media is cut into for parallel transcription
+DEFAULT_CHUNK_SECONDS = 600.0
+# Whisper's mel hop; 'seek' values in results are counted in these frames
+_HOP_LENGTH = 160
+# How often a job waiting on its chunks looks for a cancellation
+_CANCEL_POLL_SECONDS = 0.25
+
+# Resident model inside each worker process, and the engine settings it was loaded with
+_worker_model = None
+_worker_engine = None
+
+
+def _init_worker(model_name, device, threads, engine, compute_type, pid_queue=None):
+    """Pool initializer: report this worker's PID, pin torch threads and load the model once."""
+    global _worker_model, _worker_engine
+    if pid_queue is not None:
+        pid_queue.put(os.getpid())
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+    import main
+    from engines import get_engine
+    _worker_engine = (get_engine(engine), compute_type, threads)
+    _worker_model = main.get_model(model_name, device=device, precision=compute_type, engine=engine,
+                                   threads=threads)
+
+
+def _transcribe_chunk(index, samples, lang):
+    engine, compute_type, threads = _worker_engine
+    result = engine.transcribe(_worker_model, samples, lang, compute_type, verbose=None, threads=threads)
+    return index, result
+
+
+class ChunkPool:
+    """Worker processes that each keep one Whisper model resident between jobs.
+
+    The pool is reused as long as the model, device, engine and worker count stay the same,
+    so only the first parallel job pays for loading the model in every worker. A job
+    asking for a different configuration waits until jobs using the current pool
+    have finished before it is replaced.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._executor = None
+        self._config = None
+        self._users = 0
+        # Worker PIDs reported by _init_worker, so abort() can kill them
+        self._pid_queue = None
+        self._worker_pids = set()
+
+    @contextmanager
+    def use(self, model_name, device, workers, engine="whisper", compute_type=None):
+        config = (model_name, device, workers, engine, compute_type)
+        with self._cond:
+            while self._users and self._config != config:
+                self._cond.wait()
+            if self._executor is None or self._config != config:
+                self._shutdown_locked()
+                threads = max(1, (os.cpu_count() or workers) // workers)
+                # spawn: forking a process that already runs torch threads can deadlock
+                context = multiprocessing.get_context("spawn")
+                self._pid_queue = context.SimpleQueue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(model_name, device, threads, engine, compute_type, self._pid_queue),
+                )
+                self._config = config
+            self._users += 1
+            executor = self._executor
+        try:
+            yield executor
+        finally:
+            with self._cond:
+                self._users -= 1
+                self._cond.notify_all()
+
+    def shutdown(self):
+        with self._cond:
+            self._shutdown_locked()
+
+    def abort(self, executor):
+        """Kill executor's worker processes mid-chunk, unless another job is using them too.
+
+        The caller cancels its pending futures first. Returns whether the workers
+        were killed; the next job then starts a fresh pool.
+        """
+        with self._cond:
+            if self._executor is not executor or self._users > 1:
+                return False
+            pids = self._reported_pids_locked()
+            self._forget_locked()
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                # Already gone
+                pass
+        # A worker still starting up has not reported its PID yet. The caller has
+        # cancelled its chunks (shutdown's cancel_futures needs Python 3.9), so it
+        # exits as soon as it is ready
+        executor.shutdown(wait=False)
+        return True
+
+    def _reported_pids_locked(self):
+        while self._pid_queue is not None and not self._pid_queue.empty():
+            self._worker_pids.add(self._pid_queue.get())
+        return set(self._worker_pids)
+
+    def _forget_locked(self):
+        self._executor = None
+        self._config = None
+        self._pid_queue = None
+        self._worker_pids = set()
+
+    def _shutdown_locked(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._forget_locked()
+
+
+CHUNK_POOL = ChunkPool()
+atexit.register(CHUNK_POOL.shutdown)
+
+
+def transcribe_chunked(samples, model_name, lang, workers, device="cpu", engine="whisper",
+                       compute_type=None, chunk_seconds=DEFAULT_CHUNK_SECONDS, progress_callback=None,
+                       segment_callback=None, resume=None, checkpoint_callback=None, cancel=None):
+    """Transcribe a long float32 array across a pool of worker processes.
+
+    The audio is cut at silences (see audio.find_silence_splits) so no word straddles
+    a seam; every chunk is decoded independently and its segments are shifted by the
+    chunk's start and appended in order, giving one result dict shaped like
+    a single engine transcribe()'s. Returns None when the audio is too short to be worth
+    splitting, so the caller can fall back to a single decode.
+
+    segment_callback(new_segments) receives stitched segments in timeline order as
+    soon as every chunk before them has finished.
+
+    checkpoint_callback(state) is called after every finished chunk with the chunk
+    bounds and the results so far; passing that state back as resume only decodes
+    the chunks that are still missing.
+
+    cancel (a cancellation.CancelToken) is polled while chunks run; when this job is
+    the pool's only user, its worker processes are killed rather than left to
+    finish their chunks.
+    """
+    splits = find_silence_splits(samples, SAMPLE_RATE, chunk_seconds)
+    if not splits:
+        return None
+    bounds = list(zip([0] + splits, splits + [len(samples)]))
+
+    results = [None] * len(bounds)
+    if resume and [tuple(b) for b in resume.get("bounds", ())] == bounds:
+        for index, chunk_result in resume.get("chunks", {}).items():
+            results[int(index)] = chunk_result
+    pending = [i for i, chunk_result in enumerate(results) if chunk_result is None]
+    done = len(bounds) - len(pending)
+    if done:
+        print(f"Parallel transcription: {done} of {len(bounds)} chunks restored from a checkpoint.")
+    print(f"Parallel transcription: {len(pending)} chunks across {workers} worker processes.")
+
+    emitted = 0
+    emitted_segments = 0
+
+    def _emit_ready():
+        # Hand over the finished prefix; later chunks wait for earlier ones
+        nonlocal emitted, emitted_segments
+        while emitted < len(results) and results[emitted] is not None:
+            new = _stitch([results[emitted]], [bounds[emitted]], first_id=emitted_segments)["segments"]
+            segment_callback(new)
+            emitted_segments += len(new)
+            emitted += 1
+
+    if segment_callback:
+        _emit_ready()
+    if not pending:
+        return _stitch(results, bounds)
+    with CHUNK_POOL.use(model_name, device, workers, engine, compute_type) as executor:
+        futures = [executor.submit(_transcribe_chunk, i, samples[bounds[i][0]:bounds[i][1]], lang)
+                   for i in pending]
+        try:
+            running = set(futures)
+            while running:
+                finished, running = wait(running, timeout=_CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    index, chunk_result = fut.result()
+                    results[index] = chunk_result
+                    done += 1
+                    if checkpoint_callback:
+                        checkpoint_callback({"bounds": bounds,
+                                             "chunks": {str(i): r for i, r in enumerate(results) if r is not None}})
+                    if segment_callback:
+                        _emit_ready()
+                    if progress_callback:
+                        try:
+                            progress_callback(int(done * 100 / len(bounds)), done, len(bounds))
+                        except Exception:
+                            pass
+                check_cancelled(cancel)
+        except BaseException:
+            for fut in futures:
+                fut.cancel()
+            if cancel is not None and cancel.cancelled and CHUNK_POOL.abort(executor):
+                print("Parallel transcription cancelled; worker processes stopped.")
+            raise
+
+    return _stitch(results, bounds)
+
+
+def _stitch(results, bounds, first_id=0):
+    segments = []
+    for chunk_result, (start_sample, end_sample) in zip(results, bounds):
+        offset = start_sample / SAMPLE_RATE
+        chunk_end = (end_sample - start_sample) / SAMPLE_RATE
+        for seg in chunk_result.get("segments", []):
+            # Whisper can place a final timestamp in the padding after the audio ends;
+            # clamp it so consecutive chunks never overlap on the global timeline
+            seg = dict(seg)
+            seg_start = min(seg.get("start", 0.0), chunk_end)
+            seg_end = min(seg.get("end", 0.0), chunk_end)
+            seg["id"] = first_id + len(segments)
+            seg["seek"] = seg.get("seek", 0) + start_sample // _HOP_LENGTH
+            seg["start"] = seg_start + offset
+            seg["end"] = seg_end + offset
+            if seg.get("words"):
+                seg["words"] = [dict(w, start=min(w.get("start", 0.0), chunk_end) + offset,
+                                     end=min(w.get("end", 0.0), chunk_end) + offset)
+                                for w in seg["words"]]
+            segments.append(seg)
+    return {
+        # Like an engine's own text: the segment texts back to back, each with its leading space
+        "text": "".join(seg.get("text", "") for seg in segments),
+        "segments": segments,
+        "language": results[0].get("language") if results else None,
+    }
@@ -0,0 +1,302 @@
+# pipeline.py
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from cancellation import CancelToken, Cancelled
+
+
+class Job:
+    """One URL or local file moving through the download -> transcribe stages."""
+
+    def __init__(self, index, source, is_local=False):
+        self.index = index
+        self.source = source
+        self.is_local = is_local
+        self.status = "queued"  # queued, downloading, downloaded, transcribing, done, failed, cancelled
+        self.media_path = source if is_local else None
+        self.info = {}  # download details filled in by the download stage (video id, media offset, ...)
+        self.outputs = []
+        self.error = None
+        self.download_seconds = None
+        self.transcribe_seconds = None
+        self.metrics = None  # optional metrics.JobMetrics with per-stage timings
+        self.options = {}  # per-job settings (model, formats, range) when jobs differ
+        self.progress = {}  # latest progress report of the running stage
+        self.cancel_token = CancelToken()  # handed to the stage functions; see Pipeline.cancel()
+        self.attempt = 0  # bumped by reset(), so a stage that took the job before a retry leaves it alone
+        self._finished = threading.Event()
+
+    def reset(self):
+        """Clear the results of a failed or cancelled run so the job can be queued again."""
+        self.status = "queued"
+        if not self.is_local:
+            self.media_path = None
+        self.info = {}
+        self.outputs = []
+        self.error = None
+        self.download_seconds = None
+        self.transcribe_seconds = None
+        self.progress = {}
+        self.cancel_token = CancelToken()
+        self.attempt += 1
+        self._finished.clear()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job is done, failed or cancelled. Returns False on timeout."""
+        return self._finished.wait(timeout)
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "source": self.source,
+            "kind": "file" if self.is_local else "url",
+            "status": self.status,
+            "media_path": self.media_path,
+            "info": dict(self.info),
+            "outputs": list(self.outputs),
+            "error": self.error,
+            "download_seconds": self.download_seconds,
+            "transcribe_seconds": self.transcribe_seconds,
+            "metrics": self.metrics.to_dict()["stages"] if self.metrics else None,
+            "options": dict(self.options),
+            "progress": dict(self.progress),
+        }
+
+
+FINAL_STATUSES = ("done", "failed", "cancelled")
+
+
+class Pipeline:
+    """Runs jobs through a download stage and a transcribe stage with separate limits.
+
+    Each stage has its own thread pool, so downloads for later jobs keep running
+    while earlier jobs are being transcribed. `max_buffered` caps how many jobs may
+    be downloaded (or downloading) without having finished transcription yet, which
+    keeps a long batch from filling the disk ahead of the transcriber.
+
+    run(jobs) processes a fixed batch. A long-running caller instead calls start(),
+    then submit() for each job as it arrives, and close() at the end. Jobs waiting
+    for a stage are taken in submission order unless reorder() changes it.
+
+    download_fn(job) must return the local media path; transcribe_fn(job) must return
+    the list of output files. on_update(job) is called after every status change.
+    Both should pass job.cancel_token on to download_video()/transcribe(), so that
+    cancel() can stop a job that is already running; a stage that raises Cancelled
+    leaves its job 'cancelled' rather than 'failed'.
+    """
+
+    def __init__(self, download_fn, transcribe_fn, download_workers=2, transcribe_workers=1,
+                 max_buffered=None, on_update=None):
+        self.download_fn = download_fn
+        self.transcribe_fn = transcribe_fn
+        self.download_workers = max(1, int(download_workers))
+        self.transcribe_workers = max(1, int(transcribe_workers))
+        if max_buffered is None:
+            max_buffered = self.download_workers + self.transcribe_workers
+        self.max_buffered = max(1, int(max_buffered))
+        self.on_update = on_update
+        self._pools = None
+        self._pools_lock = threading.Lock()
+        self._status_lock = threading.Lock()
+        # Jobs waiting for a download slot, and downloaded jobs waiting for the transcriber
+        self._waiting = []
+        self._ready = []
+
+    def run(self, jobs):
+        """Process all jobs and block until every one is done or failed."""
+        jobs = list(jobs)
+        self.start()
+        try:
+            for job in jobs:
+                self.submit(job)
+            for job in jobs:
+                job.wait()
+        except BaseException:
+            # Ctrl-C: stop the running jobs instead of waiting for them to finish
+            for job in jobs:
+                self.cancel(job)
+            raise
+        finally:
+            self.close()
+        return jobs
+
+    def start(self):
+        """Open the stage pools; submit() calls this on first use."""
+        with self._pools_lock:
+            if self._pools is None:
+                self._pools = (
+                    ThreadPoolExecutor(self.download_workers, thread_name_prefix="download"),
+                    ThreadPoolExecutor(self.transcribe_workers, thread_name_prefix="transcribe"),
+                    threading.BoundedSemaphore(self.max_buffered),
+                )
+            return self._pools
+
+    def submit(self, job):
+        """Queue a job and return at once; job.wait() blocks until it has finished."""
+        pools = self.start()
+        with self._status_lock:
+            self._waiting.append(job)
+        # One admission task per job; each takes whichever job is first in line when it runs
+        pools[0].submit(self._admit_next, pools)
+        return job
+
+    def cancel(self, job):
+        """Cancel a job. Returns False if it is already over.
+
+        A job waiting for a stage is dropped at once. A running one has its
+        cancel_token set and turns 'cancelled' once its stage function notices,
+        which download_video() and transcribe() do within a second or so (a Whisper
+        window at most while decoding).
+        """
+        with self._status_lock:
+            if job.status in FINAL_STATUSES:
+                return False
+            waiting = job.status in ("queued", "downloaded")
+            if waiting:
+                job.status = "cancelled"
+                for queue in (self._waiting, self._ready):
+                    if job in queue:
+                        queue.remove(job)
+        # Outside the lock: the token's callbacks kill subprocesses
+        job.cancel_token.cancel()
+        if waiting:
+            self._notify(job)
+        return True
+
+    def retry(self, job):
+        """Queue a failed or cancelled job again. Returns False for any other status."""
+        with self._status_lock:
+            if job.status not in ("failed", "cancelled"):
+                return False
+            job.reset()
+        self._notify(job)
+        self.submit(job)
+        return True
+
+    def reorder(self, order):
+        """Make jobs still waiting for a stage follow the order of the given list.
+
+        Jobs that are not in the list keep their relative order after those that are.
+        """
+        rank = {id(job): i for i, job in enumerate(order)}
+        with self._status_lock:
+            for queue in (self._waiting, self._ready):
+                queue.sort(key=lambda job: rank.get(id(job), len(rank)))
+
+    def close(self, wait=True):
+        """Shut the stage pools down; with wait=True, queued jobs are run first."""
+        with self._pools_lock:
+            pools, self._pools = self._pools, None
+        if pools:
+            # Downloads hand jobs on to the transcribe pool, so that one closes last
+            pools[0].shutdown(wait=wait)
+            pools[1].shutdown(wait=wait)
+
+    def _take(self, queue):
+        """Pop the next job in line with the attempt it belongs to (None, None if there is none)."""
+        with self._status_lock:
+            if not queue:
+                return None, None
+            job = queue.pop(0)
+            return job, job.attempt
+
+    def _admit_next(self, pools):
+        dl_pool, tr_pool, buffered = pools
+        buffered.acquire()
+        job, attempt = self._take(self._waiting)
+        if job is None:
+            # Its job was cancelled and taken out of line
+            buffered.release()
+            return
+        # Local files skip the download itself but still count against the buffer
+        if job.is_local:
+            with self._status_lock:
+                ok = job.status == "queued" and job.attempt == attempt
+        else:
+            ok = self._download(job, attempt)
+        if not ok:
+            buffered.release()
+            return
+        with self._status_lock:
+            self._ready.append(job)
+        tr_pool.submit(self._transcribe_next, buffered)
+
+    def _transcribe_next(self, buffered):
+        job, attempt = self._take(self._ready)
+        if job is None:
+            buffered.release()
+            return
+        self._transcribe(job, attempt, buffered)
+
+    def _download(self, job, attempt):
+        if not self._begin(job, "downloading", attempt):
+            return False
+        started = time.monotonic()
+        try:
+            job.media_path = self.download_fn(job)
+        except Exception as e:
+            job.download_seconds = round(time.monotonic() - started, 3)
+            self._fail(job, e)
+            return False
+        job.download_seconds = round(time.monotonic() - started, 3)
+        if job.cancel_token.cancelled:
+            # Cancelled too late to interrupt the download; don't go on to transcribe it
+            self._set_status(job, "cancelled")
+            return False
+        self._set_status(job, "downloaded")
+        return True
+
+    def _transcribe(self, job, attempt, buffered):
+        try:
+            if not self._begin(job, "transcribing", attempt):
+                return
+            started = time.monotonic()
+            try:
+                job.outputs = list(self.transcribe_fn(job) or [])
+            except Exception as e:
+                job.transcribe_seconds = round(time.monotonic() - started, 3)
+                self._fail(job, e)
+                return
+            job.transcribe_seconds = round(time.monotonic() - started, 3)
+            self._set_status(job, "done")
+        finally:
+            buffered.release()
+
+    def _begin(self, job, status, attempt):
+        """Move a job into a running stage unless it was cancelled, or retried, while it waited."""
+        with self._status_lock:
+            if job.status == "cancelled" or job.attempt != attempt:
+                return False
+            job.status = status
+        self._notify(job)
+        return True
+
+    def _fail(self, job, exc):
+        if isinstance(exc, Cancelled) or job.cancel_token.cancelled:
+            print(f"Job {job.index} cancelled ({job.source}).")
+            self._set_status(job, "cancelled")
+            return
+        job.error = str(exc)
+        print(f"Job {job.index} failed ({job.source}): {exc}\n{traceback.format_exc()}")
+        self._set_status(job, "failed")
+
+    def _set_status(self, job, status):
+        with self._status_lock:
+            job.status = status
+        self._notify(job)
+
+    def _notify(self, job):
+        if job.status in FINAL_STATUSES:
+            job._finished.set()
+        if self.on_update:
+            try:
+                self.on_update(job)
+            except Exception:
+                # Status reporting must never break the pipeline
+                pass
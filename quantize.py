@@ -0,0 +1,215 @@
+# quantize.py
+import os
+import glob
+import types
+import pickle
+import hashlib
+import tempfile
+import threading
+import dataclasses
+from contextlib import contextmanager
+
+from cache import default_cache_dir
+
+# Bump when the quantization recipe or file layout changes so stale files are rebuilt
+QUANTIZED_FORMAT_VERSION = 2
+
+_build_lock = threading.Lock()
+
+
+def quantized_dir():
+    return os.path.join(default_cache_dir(), "quantized")
+
+
+def _source_id(model_name):
+    """What the fp32 weights are: the checkpoint's SHA-256 for official names, else path and mtime."""
+    import whisper
+    url = getattr(whisper, "_MODELS", {}).get(model_name)
+    if url:
+        # Official checkpoint URLs carry the file's SHA-256 as their second-to-last part
+        return url.split("/")[-2]
+    st = os.stat(model_name)
+    return f"{os.path.realpath(model_name)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def quantized_path(model_name):
+    """Cache file for model_name quantized with the installed torch and whisper."""
+    import torch
+    import whisper
+    key = "|".join([_source_id(model_name), torch.__version__, getattr(whisper, "__version__", ""),
+                    str(QUANTIZED_FORMAT_VERSION)])
+    stem = os.path.basename(model_name.rstrip("/\\")) if os.path.exists(model_name) else model_name
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(quantized_dir(), f"{stem}-int8-{digest}.pt")
+
+
+def quantize_model(model):
+    """Dynamic int8 quantization of every linear layer of a CPU Whisper model, in place.
+
+    Weights become int8 with a per-layer scale; activations are quantized on the fly,
+    so no calibration data is needed. The convolutions, layer norms and token
+    embedding (which also produces the logits) stay in fp32.
+    """
+    import torch
+    _plain_linears(model)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _plain_linears(module):
+    """Replace subclasses of nn.Linear with nn.Linear modules sharing their parameters.
+
+    Whisper subclasses nn.Linear only to cast weights to the input dtype, a no-op in
+    fp32, and quantize_dynamic matches exact types.
+    """
+    import torch
+    for name, child in module.named_children():
+        if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+            # Built on the meta device: nothing is allocated before the parameters move in
+            plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None,
+                                    device="meta")
+            plain.weight = child.weight
+            plain.bias = child.bias
+            setattr(module, name, plain)
+        else:
+            _plain_linears(child)
+
+
+def load_quantized(model_name, rebuild=False):
+    """An int8 Whisper model on CPU, built once and then loaded from the disk cache.
+
+    The first call loads the fp32 checkpoint and quantizes it, which takes about as
+    long as a normal load plus a few seconds. Only the model dimensions and the
+    quantized state_dict are cached; later calls build an empty model, quantize it
+    and load those weights, so no code is ever unpickled from the cache folder.
+    Returns (model, built) where built says whether it was rebuilt.
+    """
+    import whisper
+    path = quantized_path(model_name)
+    with _build_lock:
+        if not rebuild and os.path.exists(path):
+            try:
+                model = _load(model_name, path)
+                model.eval()
+                return model, False
+            except Exception as e:
+                print(f"Warning: rebuilding unreadable quantized model {path}: {e}")
+        print(f"Quantizing Whisper model '{model_name}' to int8 (done once, cached in {quantized_dir()})...")
+        model = quantize_model(whisper.load_model(model_name, device="cpu"))
+        model.eval()
+        try:
+            _save(model, path)
+            _remove_stale(model_name, path)
+        except OSError as e:
+            print(f"Warning: could not cache quantized model: {e}")
+        return model, True
+
+
+def quantized_nbytes(model):
+    """Bytes held by a model's tensors, including the packed int8 weights."""
+    import torch
+    total = 0
+    for value in model.state_dict().values():
+        for t in value if isinstance(value, tuple) else (value,):
+            if isinstance(t, torch.Tensor):
+                total += t.numel() * t.element_size()
+    return total
+
+
+def _load(model_name, path):
+    """Rebuild a quantized model from a file written by _save()."""
+    import whisper
+    from whisper.model import ModelDimensions, Whisper
+    checkpoint = _torch_load(path)
+    with _zero_init():
+        # Random initial weights would be overwritten right away
+        model = Whisper(ModelDimensions(**checkpoint["dims"]))
+    quantize_model(model)
+    model.load_state_dict(checkpoint["model_state_dict"])
+    alignment_heads = getattr(whisper, "_ALIGNMENT_HEADS", {}).get(model_name)
+    if alignment_heads is not None:
+        # Not part of the state_dict; whisper.load_model() sets them the same way
+        model.set_alignment_heads(alignment_heads)
+    return model
+
+
+def _torch_load(path):
+    import torch
+    try:
+        # Tensors and plain containers only: anyone able to write to the cache
+        # folder must not be able to run code through it
+        return torch.load(path, map_location="cpu", weights_only=True)
+    except TypeError:
+        raise RuntimeError("torch < 1.13 cannot load weights without unpickling code; upgrade torch")
+
+
+def _zero_fill(tensor, *args, **kwargs):
+    import torch
+    with torch.no_grad():
+        return tensor.zero_()
+
+
+@contextmanager
+def _zero_init():
+    """Replace torch.nn.init's random fills with a cheap zero fill while a model is built.
+
+    Zeros rather than untouched memory: quantize_model() derives scales from the
+    weights before load_state_dict() replaces them.
+    """
+    import torch
+    names = ("uniform_", "normal_", "kaiming_uniform_", "kaiming_normal_", "xavier_uniform_", "xavier_normal_")
+    saved = {name: getattr(torch.nn.init, name) for name in names}
+    for name in names:
+        setattr(torch.nn.init, name, _zero_fill)
+    try:
+        yield
+    finally:
+        for name, func in saved.items():
+            setattr(torch.nn.init, name, func)
+
+
+class _TorchPickler(pickle._Pickler):
+    """Pickles torch's qscheme constants (torch.per_tensor_affine, ...) by name.
+
+    They have no __module__, so pickle would look for them in every imported module;
+    lazy stubs such as yt-dlp's placeholders for missing optional dependencies raise
+    ImportError there instead of AttributeError, failing the save.
+    """
+
+    def save_global(self, obj, name=None):
+        if name and getattr(obj, "__module__", None) is None and str(obj) == f"torch.{name}":
+            self.write(pickle.GLOBAL + f"torch\n{name}\n".encode("ascii"))
+            self.memoize(obj)
+            return
+        super().save_global(obj, name)
+
+
+# torch.save() takes its Pickler from a pickle-like module
+_torch_pickle = types.ModuleType("_torch_pickle")
+_torch_pickle.Pickler = _TorchPickler
+
+
+def _save(model, path):
+    import torch
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        torch.save({"dims": dataclasses.asdict(model.dims), "model_state_dict": model.state_dict()}, tmp_path,
+                   pickle_module=_torch_pickle)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _remove_stale(model_name, keep):
+    """Drop files left from older checkpoints or torch versions of the same model."""
+    stem = os.path.basename(keep).rsplit("-int8-", 1)[0]
+    for path in glob.glob(os.path.join(os.path.dirname(keep), f"{glob.escape(stem)}-int8-*.pt")):
+        if path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
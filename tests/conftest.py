@@ -0,0 +1,9 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+# The modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the caches created on import (main's singletons) out of the user's cache folder
+os.environ.setdefault("RUMBLE_TRANSCRIBER_CACHE_DIR", tempfile.mkdtemp(prefix="rumble-tests-"))
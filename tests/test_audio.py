@@ -0,0 +1,90 @@
+# tests/test_audio.py
+import shutil
+import wave
+
+import numpy as np
+import pytest
+
+import audio
+from audio import SAMPLE_RATE, load_audio
+
+
+class _FakeFfmpeg:
+    """Stands in for subprocess.Popen: records the command and returns `seconds` of PCM."""
+
+    def __init__(self, seconds, returncode=0):
+        self.seconds = seconds
+        self.returncode = returncode
+        self.cmd = None
+
+    def __call__(self, cmd, stdout=None, stderr=None):
+        self.cmd = cmd
+        return self
+
+    def communicate(self):
+        pcm = (np.arange(int(self.seconds * SAMPLE_RATE)) % 1000).astype(np.int16)
+        return pcm.tobytes(), b"bad input"
+
+    def kill(self):
+        pass
+
+
+def _fake(monkeypatch, seconds, returncode=0):
+    ffmpeg = _FakeFfmpeg(seconds, returncode)
+    monkeypatch.setattr(audio.subprocess, "Popen", ffmpeg)
+    return ffmpeg
+
+
+def test_range_is_decoded_not_stream_copied(monkeypatch):
+    ffmpeg = _fake(monkeypatch, 10.5)
+    load_audio("talk.m4a", start=2.25, end=12.25)
+    cmd = ffmpeg.cmd
+    # Seeking on the input while decoding is exact; a stream copy would snap to packets
+    assert cmd[cmd.index("-ss") + 1] == "2.250000"
+    assert cmd.index("-ss") < cmd.index("-i")
+    assert cmd[cmd.index("-t") + 1] == "10.000000"
+    assert "copy" not in cmd
+    assert cmd[cmd.index("-ar") + 1] == str(SAMPLE_RATE)
+
+
+def test_range_is_trimmed_to_the_exact_sample_count(monkeypatch):
+    # ffmpeg tends to hand back a little more than asked for
+    _fake(monkeypatch, 10.5)
+    samples = load_audio("talk.m4a", start=2.25, end=12.25)
+    assert samples.dtype == np.float32
+    assert len(samples) == 10 * SAMPLE_RATE
+
+
+def test_whole_file_is_not_trimmed(monkeypatch):
+    ffmpeg = _fake(monkeypatch, 3.0)
+    assert len(load_audio("talk.m4a")) == 3 * SAMPLE_RATE
+    assert "-ss" not in ffmpeg.cmd and "-t" not in ffmpeg.cmd
+
+
+def test_empty_range_is_rejected(monkeypatch):
+    _fake(monkeypatch, 1.0)
+    with pytest.raises(ValueError):
+        load_audio("talk.m4a", start=5.0, end=5.0)
+
+
+def test_ffmpeg_failure_is_reported(monkeypatch):
+    _fake(monkeypatch, 0.0, returncode=1)
+    with pytest.raises(RuntimeError, match="bad input"):
+        load_audio("missing.m4a")
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_slice_matches_the_full_decode(tmp_path):
+    path = str(tmp_path / "noise.wav")
+    rng = np.random.default_rng(0)
+    pcm = (rng.uniform(-0.5, 0.5, 5 * SAMPLE_RATE) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(pcm.tobytes())
+    full = load_audio(path)
+    part = load_audio(path, start=1.2345, end=3.5)
+    first = int(round(1.2345 * SAMPLE_RATE))
+    assert len(part) == int(round((3.5 - 1.2345) * SAMPLE_RATE))
+    np.testing.assert_array_equal(part, full[first:first + len(part)])
@@ -0,0 +1,90 @@
+# tests/test_benchmark.py
+import json
+
+import pytest
+
+import benchmark
+
+
+def _result(best):
+    return {"seconds": best, "min": best, "runs": 3}
+
+
+def test_compare_flags_only_real_slowdowns():
+    baseline = {"results": {"slower": _result(0.100), "noise": _result(0.001), "steady": _result(0.100),
+                            "gone": _result(0.100), "skipped": {"skipped": "ffmpeg not found"}}}
+    results = {"slower": _result(0.130), "noise": _result(0.004), "steady": _result(0.120),
+               "skipped": _result(1.0)}
+    # 'noise' is 4x slower but only by 3 ms; 'steady' is within the threshold; 'gone' didn't run
+    assert benchmark.compare(results, baseline) == [("slower", 0.100, 0.130)]
+    assert benchmark.compare(results, baseline, threshold=0.1) == [("slower", 0.100, 0.130),
+                                                                    ("steady", 0.100, 0.120)]
+
+
+def test_heavy_import_violations():
+    results = {"import_main": {"min": 0.1, "heavy_imports": []},
+               "import_gui": {"min": 0.2, "heavy_imports": ["torch", "whisper"]},
+               "decode": {"skipped": "ffmpeg not found"}}
+    assert benchmark.heavy_import_violations(results) == [("import_gui", ["torch", "whisper"])]
+
+
+def test_synthetic_segments_cover_the_duration():
+    segments = benchmark.synthetic_segments(10)
+    assert [(s["start"], s["end"]) for s in segments] == [(0.0, 4.0), (4.0, 8.0), (8.0, 10.0)]
+    assert [s["id"] for s in segments] == [0, 1, 2]
+    assert all(s["text"].startswith(" ") for s in segments)
+
+
+def test_measure_runs_repeat_times():
+    calls = []
+    result = benchmark.measure(lambda: calls.append(1), 4)
+    assert len(calls) == 4
+    assert result["runs"] == 4 and 0 <= result["min"] <= result["seconds"]
+
+
+@pytest.fixture
+def fake_run(monkeypatch):
+    runs = []
+
+    def _run(results):
+        def _run_benchmarks(groups, durations, repeat, media_dir, transcribe_max_seconds):
+            runs.append((groups, durations))
+            return results
+        monkeypatch.setattr(benchmark, "run_benchmarks", _run_benchmarks)
+        return runs
+    return _run
+
+
+def test_main_exits_1_on_a_regression(fake_run, tmp_path, capsys):
+    baseline = tmp_path / "bench.json"
+    baseline.write_text(json.dumps({"results": {"format_timestamp[100k]": _result(0.1)}}))
+    runs = fake_run({"format_timestamp[100k]": _result(0.2)})
+    assert benchmark.main(["--only", "timestamp", "--quick", "--baseline", str(baseline)]) == 1
+    assert runs == [(["timestamp"], [60, 600])]
+    assert "REGRESSION format_timestamp[100k]" in capsys.readouterr().out
+
+
+def test_main_saves_a_baseline_it_then_passes(fake_run, tmp_path):
+    fake_run({"format_timestamp[100k]": _result(0.1)})
+    baseline = str(tmp_path / "bench.json")
+    assert benchmark.main(["--only", "timestamp", "--save-baseline", baseline]) == 0
+    with open(baseline) as f:
+        assert json.load(f)["results"] == {"format_timestamp[100k]": _result(0.1)}
+    assert benchmark.main(["--only", "timestamp", "--baseline", baseline]) == 0
+
+
+def test_main_exits_1_on_heavy_startup_imports(fake_run):
+    fake_run({"import_main": {"min": 0.1, "heavy_imports": ["torch"]}})
+    assert benchmark.main(["--only", "startup"]) == 1
+
+
+def test_main_rejects_unknown_groups(fake_run):
+    runs = fake_run({})
+    assert benchmark.main(["--only", "nope"]) == 2
+    assert benchmark.main(["--durations", "1.5"]) == 2
+    assert runs == []
+
+
+def test_timestamp_group_runs():
+    results = benchmark.run_benchmarks(["timestamp"], [60], 1, None)
+    assert results["format_timestamp[100k]"]["runs"] == 1
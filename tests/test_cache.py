@@ -0,0 +1,152 @@
+# tests/test_cache.py
+import os
+
+import pytest
+
+import main
+from cache import MediaCache, TranscriptCache
+
+
+def _add(cache, video_id, size=600 * 1024, pin=False):
+    directory = cache.entry_dir("Rumble", video_id)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "native_audio.m4a")
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    cache.record(f"https://rumble.com/{video_id}.html", "Rumble", video_id, "native_audio", path, pin=pin)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    # Room for one entry: every record() evicts the older one
+    return MediaCache(root=str(tmp_path / "media"), max_mb=1)
+
+
+def test_record_evicts_least_recently_used(cache):
+    first = _add(cache, "v1")
+    second = _add(cache, "v2")
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
+
+
+def test_pinned_entry_survives_eviction_until_unpinned(cache):
+    first = _add(cache, "v1", pin=True)
+    _add(cache, "v2")
+    assert os.path.exists(first)
+
+    cache.unpin(first)
+    _add(cache, "v3")
+    assert not os.path.exists(first)
+
+
+def test_pins_are_counted(cache):
+    first = _add(cache, "v1", pin=True)
+    assert cache.pin(first)
+    cache.unpin(first)
+    _add(cache, "v2")
+    assert os.path.exists(first)
+
+
+def test_pin_reports_missing_file(cache, tmp_path):
+    assert not cache.pin(str(tmp_path / "gone.m4a"))
+
+
+def test_transcription_only_cache_hit_is_pinned_until_released(cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "MEDIA_CACHE", cache)
+    path = _add(cache, "v1")
+    info = {}
+    got = main.download_video("https://rumble.com/v1.html", str(tmp_path / "out"),
+                              main.DOWNLOAD_FORMATS["native_audio"], transcription_only=True, info_out=info)
+    assert got == path
+    assert info["pinned_media"] == path
+
+    # Another job's download must not delete the file this job is about to transcribe
+    _add(cache, "v2")
+    assert os.path.exists(path)
+
+    main.release_media(info)
+    main.release_media(info)
+    assert "pinned_media" not in info
+    _add(cache, "v3")
+    assert not os.path.exists(path)
+
+
+def test_lookup_url_counts_misses(cache):
+    _add(cache, "v1")
+    assert cache.lookup_url("https://rumble.com/v1.html", "native_audio")
+    assert cache.lookup_url("https://rumble.com/v1.html", "mp3_best") is None
+    assert cache.lookup_url("https://rumble.com/v9.html", "native_audio") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+def _result(text=" hi"):
+    return {"text": text, "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": text}], "language": "en"}
+
+
+@pytest.fixture
+def transcripts(tmp_path, monkeypatch):
+    cache = TranscriptCache(root=str(tmp_path / "transcripts"))
+    monkeypatch.setattr(main, "TRANSCRIPT_CACHE", cache)
+    return cache
+
+
+def test_transcript_key_covers_everything_that_changes_the_text(transcripts):
+    base = dict(media_digest="abc", model_name="tiny", lang="English", start_time=5.0, end_time=20.0,
+                options={"fp16": False})
+    key = transcripts.make_key(**base)
+    assert transcripts.make_key(**base) == key
+    # Sub-millisecond differences in the range are the same request
+    assert transcripts.make_key(**dict(base, start_time=5.0004)) == key
+    for change in [dict(media_digest="abd"), dict(model_name="base"), dict(lang="German"), dict(start_time=None),
+                   dict(start_time=5.01), dict(end_time=None), dict(options={"fp16": True})]:
+        assert transcripts.make_key(**dict(base, **change)) != key
+
+
+def test_transcript_round_trip_and_statistics(transcripts):
+    key = transcripts.make_key("abc", "tiny", "English")
+    assert transcripts.get(key) is None
+    transcripts.put(key, _result())
+    cached = transcripts.get(key, media_bytes=1000)
+    assert [(seg["start"], seg["end"], seg["text"]) for seg in cached.segments()] == [(0.0, 1.0, " hi")]
+    stats = transcripts.stats()
+    assert (stats["hits"], stats["misses"], stats["bytes_saved"], stats["entries"]) == (1, 1, 1000, 1)
+
+
+def test_transcript_cache_evicts_oldest_over_its_cap(tmp_path):
+    cache = TranscriptCache(root=str(tmp_path / "transcripts"), max_mb=0)
+    cache.put("a", _result())
+    assert cache.stats()["entries"] == 0
+
+
+def test_section_download_ranges_map_onto_the_file(transcripts):
+    # A section file starting 28 s into the video covers 30-60 s at 2-32 s
+    assert main._local_range(30.0, 60.0, 28.0) == (2.0, 32.0)
+    assert main._local_range(None, 60.0, 28.0) == (0.0, 32.0)
+    assert main._local_range(30.0, None, 0.0) == (30.0, None)
+    with pytest.raises(ValueError):
+        main._local_range(60.0, 30.0, 0.0)
+
+
+def test_transcribe_is_answered_from_the_cache(transcripts, tmp_path, monkeypatch):
+    inferences = []
+
+    def _inference(audio_path, model_name, lang, verbose, start_time, end_time, *args, **kwargs):
+        inferences.append((start_time, end_time))
+        return main.Transcript.from_result(_result())
+
+    monkeypatch.setattr(main, "_run_inference", _inference)
+    media = tmp_path / "talk.m4a"
+    media.write_bytes(b"talk" * 100)
+    out = str(tmp_path / "out")
+    options = dict(model_name="tiny", output_dir=out, compute_type="fp32")
+    main.transcribe(str(media), start_time=5.0, end_time=20.0, **options)
+    main.transcribe(str(media), start_time=5.0, end_time=20.0, **options)
+    # The same range within a section file starting at 4 s
+    section = tmp_path / "section.m4a"
+    section.write_bytes(b"talk" * 100)
+    main.transcribe(str(section), start_time=9.0, end_time=24.0, time_offset=4.0, **options)
+    main.transcribe(str(media), start_time=5.0, end_time=30.0, **options)
+    main.transcribe(str(media), start_time=5.0, end_time=20.0, use_cache=False, **options)
+    assert inferences == [(5.0, 20.0), (5.0, 30.0), (5.0, 20.0)]
@@ -0,0 +1,115 @@
+# tests/test_cancellation.py
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import audio
+import main
+from cancellation import CancelToken, Cancelled, check_cancelled
+
+# audio.subprocess is the subprocess module itself; keep the real Popen for the stand-ins
+_Popen = subprocess.Popen
+
+
+def test_callbacks_run_once_on_cancel():
+    token = CancelToken()
+    calls = []
+    token.on_cancel(lambda: calls.append("a"))
+    remove = token.on_cancel(lambda: calls.append("b"))
+    token.on_cancel(lambda: 1 / 0)
+    token.on_cancel(lambda: calls.append("c"))
+    remove()
+    token.cancel()
+    token.cancel()
+    # A failing callback doesn't stop the rest, and nothing runs twice
+    assert calls == ["a", "c"]
+    assert token.cancelled
+    with pytest.raises(Cancelled):
+        token.check()
+
+
+def test_callback_registered_after_cancel_runs_at_once():
+    token = CancelToken()
+    token.cancel()
+    calls = []
+    token.on_cancel(lambda: calls.append(1))()
+    assert calls == [1]
+
+
+def test_check_cancelled_accepts_no_token():
+    check_cancelled(None)
+    check_cancelled(CancelToken())
+
+
+class _Interrupted(_Popen):
+    def communicate(self, *args, **kwargs):
+        raise KeyboardInterrupt
+
+
+class _SleepingFfmpeg:
+    """Runs a real child process in place of ffmpeg, sleeping for a minute unless told otherwise."""
+
+    def __init__(self, script="import time; time.sleep(60)", popen=_Popen):
+        self.script = script
+        self.popen = popen
+        self.procs = []
+
+    def __call__(self, cmd, stdout=None, stderr=None):
+        proc = self.popen([sys.executable, "-c", self.script], stdout=stdout, stderr=stderr)
+        self.procs.append(proc)
+        return proc
+
+
+def test_cancel_kills_ffmpeg(monkeypatch):
+    ffmpeg = _SleepingFfmpeg()
+    monkeypatch.setattr(audio.subprocess, "Popen", ffmpeg)
+    token = CancelToken()
+    threading.Timer(0.2, token.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(Cancelled):
+        audio.load_audio("talk.m4a", cancel=token)
+    assert time.monotonic() - started < 10
+    proc, = ffmpeg.procs
+    assert proc.poll() is not None
+
+
+def test_interrupted_decode_kills_ffmpeg(monkeypatch):
+    ffmpeg = _SleepingFfmpeg(popen=_Interrupted)
+    monkeypatch.setattr(audio.subprocess, "Popen", ffmpeg)
+    with pytest.raises(KeyboardInterrupt):
+        audio.load_audio("talk.m4a")
+    proc, = ffmpeg.procs
+    assert proc.returncode is not None
+
+
+def test_no_ffmpeg_for_a_cancelled_job(monkeypatch):
+    ffmpeg = _SleepingFfmpeg()
+    monkeypatch.setattr(audio.subprocess, "Popen", ffmpeg)
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(Cancelled):
+        audio.load_audio("talk.m4a", cancel=token)
+    assert ffmpeg.procs == []
+
+
+def test_finished_decode_unregisters_its_kill(monkeypatch):
+    monkeypatch.setattr(audio.subprocess, "Popen", _SleepingFfmpeg("pass"))
+    token = CancelToken()
+    audio.load_audio("talk.m4a", cancel=token)
+    assert token._callbacks == []
+
+
+def test_waiting_for_a_busy_model_gives_up_on_cancel():
+    lock = threading.Lock()
+    lock.acquire()
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    try:
+        with pytest.raises(Cancelled):
+            with main._acquired(lock, token):
+                pass
+    finally:
+        lock.release()
@@ -0,0 +1,77 @@
+# tests/test_cli.py
+import threading
+
+import pytest
+
+import main
+from cache import TranscriptCache
+
+# run_cli() tests stub main.transcribe; the cache is filled through the real one
+_transcribe = main.transcribe
+
+
+@pytest.fixture
+def media(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "TRANSCRIPT_CACHE", TranscriptCache(root=str(tmp_path / "transcripts")))
+    paths = []
+    for name in ("a.m4a", "b.m4a"):
+        path = tmp_path / name
+        path.write_bytes(name.encode() * 100)
+        paths.append(str(path))
+    return paths
+
+
+class _WarmUps:
+    """Stands in for main._warm_model and records its calls."""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+
+    def __call__(self, *args):
+        self.calls.append(args)
+        self.started.set()
+
+
+@pytest.fixture
+def warm_ups(monkeypatch):
+    stub = _WarmUps()
+    monkeypatch.setattr(main, "_warm_model", stub)
+    monkeypatch.setattr(main, "transcribe", lambda path, **kwargs: [])
+    return stub
+
+
+def _fake_inference(audio_path, *args, **kwargs):
+    return {"text": " hi", "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": " hi"}], "language": "en"}
+
+
+def test_transcript_cached_matches_transcribe(media, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "_run_inference", _fake_inference)
+    options = dict(model_name="tiny", lang="English", start_time=5.0, end_time=20.0, engine="whisper",
+                   compute_type="int8")
+    assert not main.transcript_cached(media[0], **options)
+    main.transcribe(media[0], output_dir=str(tmp_path / "out"), **options)
+    assert main.transcript_cached(media[0], **options)
+    assert not main.transcript_cached(media[0], **dict(options, end_time=30.0))
+    assert not main.transcript_cached(media[1], **options)
+    assert not main.transcript_cached(str(tmp_path / "missing.m4a"), **options)
+
+
+def test_model_is_not_loaded_when_every_job_is_cached(media, warm_ups, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "_run_inference", _fake_inference)
+    for path in media:
+        _transcribe(path, model_name="tiny", output_dir=str(tmp_path / "out"))
+    assert main.run_cli(["-m", "tiny", "-o", str(tmp_path / "out")] + media) == 0
+    assert warm_ups.calls == []
+
+
+def test_model_is_loaded_once_a_job_misses(media, warm_ups, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "_run_inference", _fake_inference)
+    _transcribe(media[0], model_name="tiny", output_dir=str(tmp_path / "out"))
+    assert main.run_cli(["-m", "tiny", "-o", str(tmp_path / "out")] + media) == 0
+    assert warm_ups.started.wait(5) and len(warm_ups.calls) == 1
+
+
+def test_no_cache_loads_the_model_up_front(media, warm_ups, tmp_path):
+    assert main.run_cli(["-m", "tiny", "--no-cache", "-o", str(tmp_path / "out")] + media) == 0
+    assert warm_ups.started.wait(5) and len(warm_ups.calls) == 1
@@ -0,0 +1,77 @@
+# tests/test_daemon.py
+import os
+import json
+import threading
+import http.client
+
+import pytest
+
+import main
+import daemon
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    def fake_transcribe(path, **kwargs):
+        out = os.path.join(kwargs["output_dir"], "a_transcript.txt")
+        with open(out, "w", encoding="utf-8") as f:
+            f.write("hello")
+        return [out]
+
+    monkeypatch.setattr(main, "transcribe", fake_transcribe)
+    monkeypatch.setattr(main, "remember_transcribed", lambda *a: None)
+    service = daemon.TranscriptionService(str(tmp_path / "out"), download_jobs=1)
+    srv = daemon.make_server(service, port=0)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    service.close()
+
+
+def _request(srv, method, path, body=None, headers=None):
+    port = srv.server_address[1]
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    sent = {"Host": f"127.0.0.1:{port}", daemon.TOKEN_HEADER: srv.token, "Content-Type": "application/json"}
+    sent.update(headers or {})
+    conn.request(method, path, body=body, headers={k: v for k, v in sent.items() if v is not None})
+    resp = conn.getresponse()
+    status = resp.status
+    resp.read()
+    conn.close()
+    return status
+
+
+def test_client_reads_token_and_runs_job(server, tmp_path):
+    client = daemon.DaemonClient(f"http://127.0.0.1:{server.server_address[1]}")
+    media = tmp_path / "a.wav"
+    media.write_bytes(b"x")
+    job = client.submit(str(media), output_dir="sub")
+    done = client.wait(job["index"], poll_interval=0.02)
+    assert done["status"] == "done"
+    assert done["options"]["output_dir"] == os.path.realpath(str(tmp_path / "out" / "sub"))
+    assert client.output(job["index"], "txt") == "hello"
+
+
+@pytest.mark.parametrize("headers, status", [
+    ({daemon.TOKEN_HEADER: None}, 401),
+    ({daemon.TOKEN_HEADER: "wrong"}, 401),
+    ({"Host": "evil.example:8765"}, 403),
+    ({"Content-Type": "text/plain"}, 415),
+    ({"Content-Type": None}, 415),
+])
+def test_cross_site_requests_are_refused(server, tmp_path, headers, status):
+    body = json.dumps({"source": "https://rumble.com/v1.html"})
+    assert _request(server, "POST", "/jobs", body, headers) == status
+    assert server.service.list() == []
+
+
+def test_get_requires_token_too(server):
+    assert _request(server, "GET", "/jobs", headers={daemon.TOKEN_HEADER: None}) == 401
+    assert _request(server, "GET", "/jobs") == 200
+
+
+@pytest.mark.parametrize("output_dir", ["/tmp", "../elsewhere", "sub/../../x"])
+def test_output_dir_outside_root_is_rejected(server, output_dir):
+    body = json.dumps({"source": "https://rumble.com/v1.html", "output_dir": output_dir})
+    assert _request(server, "POST", "/jobs", body) == 400
@@ -0,0 +1,200 @@
+# tests/test_download.py
+import os
+
+import pytest
+import yt_dlp
+
+import main
+from cache import MediaCache
+from cancellation import CancelToken, Cancelled
+
+URL = "https://rumble.com/v4abc12-talk.html"
+
+
+class _FakeYoutubeDL:
+    """Stands in for yt_dlp.YoutubeDL: resolves to a fixed video and writes a small file."""
+
+    info = {"id": "v4abc12", "extractor_key": "Rumble", "title": "Talk", "duration": 600.0}
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=False):
+        self.calls.append(("resolve", url))
+        return dict(self.info)
+
+    def process_ie_result(self, info, download=True):
+        self.calls.append(("download", self.params))
+        path = self.params["outtmpl"] % {"ext": "mp3"}
+        with open(path, "wb") as f:
+            f.write(b"\0" * 1000)
+        return info
+
+
+@pytest.fixture
+def ydl(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "MEDIA_CACHE", MediaCache(root=str(tmp_path / "media")))
+    monkeypatch.setattr(_FakeYoutubeDL, "calls", [], raising=False)
+    monkeypatch.setattr(yt_dlp, "YoutubeDL", _FakeYoutubeDL)
+    return _FakeYoutubeDL
+
+
+def _download(tmp_path, section=None, format_id="mp3_best", info=None):
+    return main.download_video(URL, str(tmp_path / "out"), main.DOWNLOAD_FORMATS[format_id],
+                               section=section, info_out=info)
+
+
+def _downloads(ydl):
+    return [params for kind, params in ydl.calls if kind == "download"]
+
+
+def _ranges(params):
+    return [(r["start_time"], r["end_time"]) for r in params["download_ranges"](_FakeYoutubeDL.info, None)]
+
+
+def test_section_fetches_only_the_padded_range(ydl, tmp_path):
+    info = {}
+    path = _download(tmp_path, section=(30.0, 60.0), info=info)
+    params, = _downloads(ydl)
+    pad = main.SECTION_PADDING_SECONDS
+    assert _ranges(params) == [(30.0 - pad, 60.0 + pad)]
+    assert not params["force_keyframes_at_cuts"]
+    assert info["media_offset"] == 30.0 - pad
+    assert os.path.basename(path) == "rumble-v4abc12_28-62s.mp3"
+
+
+def test_open_ended_section_runs_to_the_end(ydl, tmp_path):
+    info = {}
+    _download(tmp_path, section=(590.0, None), info=info)
+    assert _ranges(_downloads(ydl)[0]) == [(588.0, 600.0)]
+    assert info["media_offset"] == 588.0
+
+
+def test_section_starting_at_zero_and_ending_past_the_video_is_a_full_download(ydl, tmp_path):
+    info = {}
+    _download(tmp_path, section=(None, 599.0), info=info)
+    assert "download_ranges" not in _downloads(ydl)[0]
+    assert info["media_offset"] == 0.0
+
+
+def test_video_sections_are_cut_at_exact_frames(ydl, tmp_path):
+    _download(tmp_path, section=(30.0, 60.0), format_id="mp4_best_video")
+    assert _downloads(ydl)[0]["force_keyframes_at_cuts"]
+
+
+def test_same_section_is_served_from_the_cache(ydl, tmp_path):
+    first = _download(tmp_path, section=(30.0, 60.0))
+    info = {}
+    again = _download(tmp_path, section=(30.0, 60.0), info=info)
+    assert again == first
+    assert len(_downloads(ydl)) == 1
+    assert info["media_offset"] == 28.0
+
+
+def test_full_download_covers_any_section(ydl, tmp_path):
+    _download(tmp_path)
+    info = {}
+    _download(tmp_path, section=(30.0, 60.0), info=info)
+    assert len(_downloads(ydl)) == 1
+    assert info["media_offset"] == 0.0
+
+
+def test_other_section_is_downloaded_again(ydl, tmp_path):
+    _download(tmp_path, section=(30.0, 60.0))
+    info = {}
+    _download(tmp_path, section=(100.0, 130.0), info=info)
+    assert [_ranges(params) for params in _downloads(ydl)] == [[(28.0, 62.0)], [(98.0, 132.0)]]
+    assert info["media_offset"] == 98.0
+
+
+def test_cache_statistics_count_one_outcome_per_request(ydl, tmp_path):
+    _download(tmp_path)
+    _download(tmp_path)
+    # Another URL for the same video: the URL index misses, the video ID hits
+    main.download_video("https://rumble.com/embed/v4abc12/", str(tmp_path / "out"),
+                        main.DOWNLOAD_FORMATS["mp3_best"])
+    stats = main.MEDIA_CACHE.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def _resolves(ydl):
+    return [url for kind, url in ydl.calls if kind == "resolve"]
+
+
+def test_downloads_are_cached_by_video_id(ydl, tmp_path):
+    first = _download(tmp_path)
+    assert os.path.basename(first) == "rumble-v4abc12.mp3"
+    cached = main.MEDIA_CACHE.find("Rumble", "v4abc12", "mp3_best")
+    assert os.path.samefile(first, cached)
+
+    # The same URL again is answered from the URL index, without touching the network
+    assert _download(tmp_path) == first
+    assert _resolves(ydl) == [URL]
+
+    # Another URL for the same video resolves, then finds the download by its ID
+    other = "https://rumble.com/embed/v4abc12/"
+    assert main.download_video(other, str(tmp_path / "out"), main.DOWNLOAD_FORMATS["mp3_best"]) == first
+    assert _resolves(ydl) == [URL, other]
+    assert len(_downloads(ydl)) == 1
+    assert main.MEDIA_CACHE.resolve_url(other) == ("Rumble", "v4abc12")
+
+
+def test_formats_are_cached_apart(ydl, tmp_path):
+    _download(tmp_path)
+    _download(tmp_path, format_id="mp4_best_video")
+    assert len(_downloads(ydl)) == 2
+
+
+def test_use_cache_false_downloads_again(ydl, tmp_path):
+    _download(tmp_path)
+    main.download_video(URL, str(tmp_path / "out"), main.DOWNLOAD_FORMATS["mp3_best"], use_cache=False)
+    assert len(_downloads(ydl)) == 2
+    assert main.MEDIA_CACHE.find("Rumble", "v4abc12", "mp3_best")
+
+
+def _hook_reports(info, events, cancel=None):
+    reports = []
+    hook = main._download_progress_hook(lambda pct, done, total, **kwargs: reports.append((pct, done, total)),
+                                        info, cancel)
+    for event in events:
+        hook(event)
+    return reports
+
+
+def test_progress_is_weighted_by_stream_size():
+    # Video then audio: 800 + 200 bytes, downloaded one after the other
+    info = {"requested_formats": [{"filesize": 800}, {"filesize": 200}]}
+    reports = _hook_reports(info, [
+        {"status": "downloading", "filename": "v", "downloaded_bytes": 400, "total_bytes": 800},
+        {"status": "finished", "filename": "v", "total_bytes": 800},
+        {"status": "downloading", "filename": "a", "downloaded_bytes": 100, "total_bytes": 200},
+        {"status": "finished", "filename": "a", "total_bytes": 200},
+    ])
+    assert reports == [(40.0, 400, 1000), (80.0, 800, 1000), (90.0, 900, 1000), (100.0, 1000, 1000)]
+
+
+def test_progress_without_sizes_counts_fragments():
+    reports = _hook_reports({}, [
+        {"status": "downloading", "filename": "v", "downloaded_bytes": 5000, "fragment_index": 3,
+         "fragment_count": 12},
+        {"status": "downloading", "filename": "v", "downloaded_bytes": 9000},
+        {"status": "finished", "filename": "v"},
+    ])
+    assert reports[0][0] == 25.0
+    assert reports[1] == (None, 9000, None)
+    assert reports[2][0] == 100.0
+
+
+def test_progress_hook_raises_once_cancelled():
+    cancel = CancelToken()
+    hook = main._download_progress_hook(None, {}, cancel)
+    hook({"status": "downloading"})
+    cancel.cancel()
+    with pytest.raises(Cancelled):
+        hook({"status": "downloading"})
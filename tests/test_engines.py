@@ -0,0 +1,257 @@
+# tests/test_engines.py
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import tqdm
+
+import engines
+import main
+from audio import SAMPLE_RATE
+from cache import TranscriptCache
+from cancellation import CancelToken, Cancelled
+from engines import CTranslate2Engine, InferenceEngine, WhisperEngine
+
+WINDOWS = 3
+
+
+class _SteppedWhisper:
+    """A whisper stand-in that decodes one window each time step() lets it."""
+
+    def __init__(self, name):
+        self.name = name
+        self._go = threading.Semaphore(0)
+        self._done = threading.Semaphore(0)
+
+    def transcribe(self, audio, *, language=None, verbose=None, fp16=True):
+        seek = 0
+        all_tokens = []
+        all_segments = []
+        prompt_reset_since = 0
+        with tqdm.tqdm(total=WINDOWS * 100, disable=verbose is not False) as pbar:
+            self._done.release()
+            for i in range(WINDOWS):
+                self._go.acquire()
+                all_segments.append({"id": i, "seek": seek, "start": float(i), "end": i + 1.0,
+                                     "text": f" {self.name}{i}", "tokens": [i]})
+                all_tokens.append(i)
+                seek += 100
+                pbar.update(100)
+                self._done.release()
+        return {"text": "", "segments": all_segments, "language": language}
+
+    def wait(self):
+        assert self._done.acquire(timeout=5)
+
+    def step(self):
+        self._go.release()
+        self.wait()
+
+
+class _Job:
+    def __init__(self, name):
+        self.model = _SteppedWhisper(name)
+        self.cancel = CancelToken()
+        self.segments = []
+        self.checkpoints = []
+        self.progress = []
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        try:
+            WhisperEngine().transcribe(self.model, np.zeros(SAMPLE_RATE, dtype=np.float32), "en", "fp32",
+                                       progress_callback=lambda *p: self.progress.append(p),
+                                       segment_callback=self.segments.extend,
+                                       checkpoint_callback=self.checkpoints.append, cancel=self.cancel)
+        except BaseException as e:
+            self.error = e
+
+    def start(self):
+        self.thread.start()
+        # Its bar exists once the stand-in reports back
+        self.model.wait()
+
+    def join(self):
+        self.thread.join(5)
+        assert not self.thread.is_alive() and self.error is None
+
+
+def test_overlapping_jobs_stay_separate():
+    original = tqdm.tqdm
+    first, second = _Job("a"), _Job("b")
+    first.start()
+    second.start()
+    for _ in range(WINDOWS - 1):
+        first.model.step()
+        second.model.step()
+    # The job that started first finishes first
+    first.model.step()
+    first.join()
+    second.model.step()
+    second.join()
+
+    assert tqdm.tqdm is original
+    for job in (first, second):
+        name = job.model.name
+        # Segments stream into the job that decoded them
+        assert [seg["text"] for seg in job.segments] == [f" {name}{i}" for i in range(WINDOWS)]
+        # Checkpoints are saved from the job's own loop
+        assert [len(state["segments"]) for state in job.checkpoints] == list(range(1, WINDOWS + 1))
+        assert all(seg["text"].startswith(f" {name}") for seg in job.checkpoints[-1]["segments"])
+        assert job.progress[-1] == (100, WINDOWS * 100, WINDOWS * 100)
+
+    # A cancelled job's token must not reach bars created after it finished
+    first.cancel.cancel()
+    with tqdm.tqdm(total=2, disable=True) as pbar:
+        pbar.update(1)
+
+
+# Keys every engine's segments carry (words only when the engine produced them)
+SEGMENT_KEYS = {"id", "seek", "start", "end", "text", "tokens", "temperature", "avg_logprob",
+                "compression_ratio", "no_speech_prob"}
+
+
+def test_base_engine_defaults():
+    class _Engine(InferenceEngine):
+        name = "plain"
+        compute_types = ("a", "b")
+
+    engine = _Engine()
+    assert engine.default_compute_type("cpu") == "a"
+    assert engine.device_for("b", "cuda") == "cuda"
+    assert engine.nbytes(object()) == 0
+    assert not engine.resumable and not engine.threads_at_load
+    with pytest.raises(NotImplementedError):
+        engine.load("tiny", "cpu", "a")
+    with pytest.raises(NotImplementedError):
+        engine.transcribe(None, np.zeros(1, dtype=np.float32), "en", "a")
+
+
+def test_whisper_engine_devices():
+    engine = WhisperEngine()
+    assert engine.default_compute_type("cuda:0") == "fp16"
+    assert engine.default_compute_type("cpu") == "fp32"
+    # Dynamically quantized models only run on CPU
+    assert engine.device_for("int8", "cuda") == "cpu"
+    assert engine.device_for("fp16", "cuda") == "cuda"
+
+
+def test_engines_are_looked_up_by_name(monkeypatch):
+    monkeypatch.setattr(engines, "ENGINES", dict(engines.ENGINES))
+    assert engines.get_engine().name == engines.DEFAULT_ENGINE
+    assert engines.get_engine("ctranslate2").name == "ctranslate2"
+    engine = WhisperEngine()
+    assert engines.get_engine(engine) is engine
+    with pytest.raises(ValueError, match="unknown inference engine 'nope'"):
+        engines.get_engine("nope")
+
+    class _Engine(InferenceEngine):
+        name = "custom"
+        compute_types = ("x",)
+
+    custom = engines.register_engine(_Engine())
+    assert engines.get_engine("custom") is custom
+
+
+def test_check_options():
+    assert engines.check_options() == ("whisper", None, None)
+    assert engines.check_options("ctranslate2", "int8", "4") == ("ctranslate2", "int8", 4)
+    with pytest.raises(ValueError, match="no compute type 'int4'"):
+        engines.check_options("ctranslate2", "int4")
+    with pytest.raises(ValueError, match="whole number"):
+        engines.check_options(threads="many")
+    with pytest.raises(ValueError, match="at least 1"):
+        engines.check_options(threads=0)
+
+
+def test_language_codes():
+    assert engines._language_code("English") == "en"
+    assert engines._language_code(" DE ") == "de"
+    assert engines._language_code(None) is None
+    with pytest.raises(ValueError, match="unknown language"):
+        engines._language_code("Klingonese")
+
+
+class _FasterWhisperModel:
+    """Stands in for faster_whisper.WhisperModel: yields segments lazily, like the real one."""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.decoded = 0
+        self.kwargs = None
+
+    def transcribe(self, audio, **kwargs):
+        self.kwargs = kwargs
+        return self._segments(), SimpleNamespace(duration=2.0 * len(self.texts), language="en")
+
+    def _segments(self):
+        for i, text in enumerate(self.texts):
+            self.decoded += 1
+            words = [SimpleNamespace(word=text, start=2.0 * i, end=2.0 * i + 1, probability=0.9)]
+            yield SimpleNamespace(seek=200 * i, start=2.0 * i, end=2.0 * i + 2, text=text, tokens=(i,),
+                                  temperature=None, avg_logprob=-0.2, compression_ratio=1.3,
+                                  no_speech_prob=0.01, words=words)
+
+
+def test_ctranslate2_results_are_shaped_like_whisper():
+    model = _FasterWhisperModel([" one", " two"])
+    progress, streamed = [], []
+    result = CTranslate2Engine().transcribe(model, np.zeros(4 * SAMPLE_RATE, dtype=np.float32), "English", "int8",
+                                            progress_callback=lambda *p: progress.append(p),
+                                            segment_callback=streamed.extend)
+    assert model.kwargs["language"] == "en"
+    assert model.kwargs["temperature"] == list(engines.TEMPERATURES)
+    assert result["text"] == " one two" and result["language"] == "en"
+    first, second = result["segments"]
+    assert set(first) == SEGMENT_KEYS | {"words"}
+    assert (first["id"], first["seek"], first["temperature"]) == (0, 0, 0.0)
+    assert second["words"] == [{"word": " two", "start": 2.0, "end": 3.0, "probability": 0.9}]
+    assert streamed == result["segments"]
+    assert progress[0] == (0, 0, 400) and progress[-1] == (100, 400, 400)
+
+
+def test_ctranslate2_stops_decoding_once_cancelled():
+    model = _FasterWhisperModel([" one", " two", " three"])
+    cancel = CancelToken()
+    with pytest.raises(Cancelled):
+        CTranslate2Engine().transcribe(model, np.zeros(SAMPLE_RATE, dtype=np.float32), "en", "int8",
+                                       segment_callback=lambda segments: cancel.cancel(), cancel=cancel)
+    # The segment in hand when the token was cancelled is the last one decoded
+    assert model.decoded == 2
+
+
+class _EchoEngine(InferenceEngine):
+    """A registered engine that returns one segment naming the model it was given."""
+
+    name = "echo"
+    compute_types = ("plain",)
+
+    def load(self, model_name, device, compute_type, threads=None):
+        return model_name
+
+    def transcribe(self, model, audio, language, compute_type, verbose=False, threads=None,
+                   progress_callback=None, segment_callback=None, resume=None, checkpoint_callback=None,
+                   cancel=None):
+        segment = {"id": 0, "seek": 0, "start": 0.0, "end": len(audio) / SAMPLE_RATE, "text": f" {model}",
+                   "tokens": [1], "temperature": 0.0, "avg_logprob": -0.1, "compression_ratio": 1.0,
+                   "no_speech_prob": 0.0}
+        if segment_callback:
+            segment_callback([segment])
+        return {"text": segment["text"], "segments": [segment], "language": language}
+
+
+def test_registered_engine_runs_through_transcribe(tmp_path, monkeypatch):
+    monkeypatch.setitem(engines.ENGINES, "echo", _EchoEngine())
+    monkeypatch.setattr(main, "MODEL_REGISTRY", main.ModelRegistry())
+    monkeypatch.setattr(main, "TRANSCRIPT_CACHE", TranscriptCache(root=str(tmp_path / "transcripts")))
+    monkeypatch.setattr(main, "load_audio", lambda path, start=None, end=None, cancel=None:
+                        np.zeros(3 * SAMPLE_RATE, dtype=np.float32))
+    media = tmp_path / "talk.m4a"
+    media.write_bytes(b"\0" * 100)
+    outputs = main.transcribe(str(media), model_name="tiny", formats=["srt"], output_dir=str(tmp_path / "out"),
+                              engine="echo")
+    srt, = outputs
+    with open(srt, encoding="utf-8") as f:
+        assert f.read() == "1\n00:00:00,000 --> 00:00:03,000\ntiny\n\n"
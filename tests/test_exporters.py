@@ -0,0 +1,77 @@
+# tests/test_exporters.py
+import json
+
+import pytest
+
+import main
+from exporters import DEFAULT_JSON_MODE, JSON_MODES, TranscriptExporter, export_result
+
+
+def _result(count=3):
+    segments = [{"id": i, "seek": i * 300, "start": i * 3.0, "end": i * 3.0 + 2.5, "text": f" Zeile {i} – ü",
+                 "tokens": [50364 + i, 400 + i], "temperature": 0.0, "avg_logprob": -0.3,
+                 "compression_ratio": 1.2, "no_speech_prob": 0.05} for i in range(count)]
+    return {"text": "".join(seg["text"] for seg in segments), "segments": segments, "language": "de"}
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_pretty_is_the_default():
+    assert DEFAULT_JSON_MODE == "pretty"
+
+
+@pytest.mark.parametrize("count", [0, 1, 3])
+def test_pretty_matches_json_dump(tmp_path, count):
+    result = _result(count)
+    export_result(result, str(tmp_path), "t", ["json"])
+    assert _read(tmp_path / "t.json") == json.dumps(result, indent=2, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("mode", JSON_MODES)
+def test_streamed_json_is_complete(tmp_path, mode):
+    result = _result()
+    exporter = TranscriptExporter(str(tmp_path), "t", ["json"], json_mode=mode)
+    for seg in result["segments"]:
+        exporter.add_segments([seg])
+    exporter.finalize(result)
+    written = json.loads(_read(tmp_path / "t.json"))
+    assert written["text"] == result["text"] and written["language"] == "de"
+    if mode == "compact":
+        assert written["segments"] == [{k: seg[k] for k in ("id", "start", "end", "text")}
+                                       for seg in result["segments"]]
+    else:
+        assert written["segments"] == result["segments"]
+
+
+def test_offset_shifts_json_segments(tmp_path):
+    export_result(_result(), str(tmp_path), "t", ["json"], offset=60.0)
+    segments = json.loads(_read(tmp_path / "t.json"))["segments"]
+    assert [(seg["start"], seg["end"]) for seg in segments] == [(60.0, 62.5), (63.0, 65.5), (66.0, 68.5)]
+
+
+def test_single_format_writers_are_still_in_main(tmp_path):
+    segments = [{"start": 0.0, "end": 2.5, "text": " Hallo\tWelt "}, {"start": 3661.0, "end": 3662.25, "text": " Zwei"}]
+    main.write_srt(segments, str(tmp_path / "t.srt"))
+    main.write_vtt(segments, str(tmp_path / "t.vtt"))
+    main.write_tsv(segments, str(tmp_path / "t.tsv"))
+    assert _read(tmp_path / "t.srt") == ("1\n00:00:00,000 --> 00:00:02,500\nHallo\tWelt\n\n"
+                                         "2\n01:01:01,000 --> 01:01:02,250\nZwei\n\n")
+    assert _read(tmp_path / "t.vtt") == ("WEBVTT\n\n00:00.000 --> 00:02.500\nHallo\tWelt\n\n"
+                                         "01:01:01.000 --> 01:01:02.250\nZwei\n\n")
+    assert _read(tmp_path / "t.tsv") == "start\tend\ttext\n0.000\t2.500\tHallo Welt\n3661.000\t3662.250\tZwei\n"
+
+
+def test_streamed_txt_matches_batch_txt(tmp_path):
+    result = _result()
+    result["segments"][1]["text"] = " Zeile 1  \n"
+    result["segments"].append(dict(result["segments"][0], id=3, text="   "))
+    result["text"] = "".join(seg["text"] for seg in result["segments"])
+    export_result(result, str(tmp_path), "batch", ["txt"])
+    exporter = TranscriptExporter(str(tmp_path), "streamed", ["txt"])
+    for seg in result["segments"]:
+        exporter.add_segments([seg])
+    exporter.finalize(result)
+    assert _read(tmp_path / "streamed.txt") == _read(tmp_path / "batch.txt") == result["text"].strip() + "\n"
@@ -0,0 +1,122 @@
+# tests/test_gui.py
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+import engines  # noqa: E402
+import gui  # noqa: E402
+import main  # noqa: E402
+from pipeline import Job  # noqa: E402
+
+
+@pytest.fixture
+def stubs(monkeypatch):
+    calls = {"get_model": [], "transcribe": []}
+    monkeypatch.setattr(main, "get_model", lambda *args, **kwargs: calls["get_model"].append(args))
+    monkeypatch.setattr(main, "transcribe", lambda path, **kwargs: calls["transcribe"].append(kwargs) or [])
+    return calls
+
+
+def _job(tmp_path):
+    media = tmp_path / "talk.m4a"
+    media.write_bytes(b"\0" * 100)
+    job = Job(1, str(media), is_local=True)
+    job.options = {"model": "tiny", "start_time": 5.0, "end_time": None, "formats": ["txt"],
+                   "output_dir": str(tmp_path / "out"), "compute_type": "int8", "vad": True}
+    return job
+
+
+def test_cached_transcript_loads_no_model(stubs, tmp_path, monkeypatch):
+    looked_up = []
+    monkeypatch.setattr(main, "transcript_cached", lambda path, **kwargs: looked_up.append(kwargs) or True)
+    queue = gui.JobQueue()
+    job = _job(tmp_path)
+    queue._prepare(job)
+    queue._transcribe(job)
+    assert stubs["get_model"] == []
+    # The cache is asked about exactly what transcribe() then runs
+    assert looked_up[0].items() <= stubs["transcribe"][0].items()
+    assert looked_up[0]["vad"] and looked_up[0]["start_time"] == 5.0
+
+
+def test_uncached_transcript_loads_the_model(stubs, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "transcript_cached", lambda path, **kwargs: False)
+    queue = gui.JobQueue()
+    job = _job(tmp_path)
+    queue._prepare(job)
+    queue._transcribe(job)
+    assert stubs["get_model"] == [("tiny",)]
+    assert len(stubs["transcribe"]) == 1
+
+
+def test_job_progress_weights_its_stages():
+    progress = gui.JobProgress(["download", "model", "transcribe"])
+    progress.update("download", 0.5)
+    assert progress.fraction() == pytest.approx(0.2)
+    # Reaching a stage completes the ones before it
+    progress.update("transcribe", 0.5)
+    assert progress.fraction() == pytest.approx(0.75)
+    local = gui.JobProgress(["transcribe"])
+    local.update("transcribe", 0.5)
+    assert local.fraction() == pytest.approx(0.5)
+
+
+class _SlowEngine(engines.InferenceEngine):
+    """Loads a stand-in model once release is set."""
+
+    name = "slow"
+    compute_types = ("fp32",)
+
+    def __init__(self):
+        self.loads = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def load(self, model_name, device, compute_type, threads=None):
+        self.loads.append(model_name)
+        self.started.set()
+        assert self.release.wait(5)
+        return object()
+
+    def nbytes(self, model):
+        return 1
+
+
+def _idle(preloader):
+    deadline = time.monotonic() + 5
+    while preloader._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return not preloader._pending
+
+
+def test_preload_loads_the_model_once(monkeypatch):
+    engine = _SlowEngine()
+    monkeypatch.setitem(engines.ENGINES, engine.name, engine)
+    monkeypatch.setattr(main, "MODEL_REGISTRY", main.ModelRegistry())
+    monkeypatch.setattr(main, "warm_imports", lambda: {})
+    options = {"engine": "slow", "compute_type": "fp32"}
+    preloader = gui.ModelPreloader()
+    loading, ready = [], []
+    preloader.loading.connect(loading.append)
+    preloader.ready.connect(lambda name, seconds: ready.append(name))
+
+    preloader.preload("tiny", engine_options=options)
+    assert engine.started.wait(5)
+    # Asked again mid-load (a settings change, a second window event): nothing new starts
+    preloader.preload("tiny", engine_options=options)
+    assert loading == ["tiny"]
+    # A job that starts meanwhile waits for the preload instead of loading its own copy
+    job = threading.Thread(target=main.get_model, args=("tiny",), kwargs=gui._model_kwargs(options))
+    job.start()
+    engine.release.set()
+    job.join(5)
+    assert _idle(preloader)
+    assert engine.loads == ["tiny"]
+
+    # Once resident, a preload just reports it ready
+    preloader.preload("tiny", engine_options=options)
+    assert ready[-1] == "tiny"
+    assert loading == ["tiny"] and engine.loads == ["tiny"]
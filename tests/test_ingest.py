@@ -0,0 +1,139 @@
+# tests/test_ingest.py
+import pytest
+import yt_dlp
+
+import ingest
+from cache import TranscriptionHistory
+from ingest import Listing, VideoEntry
+
+CHANNEL = "https://rumble.com/c/Talks"
+
+
+def _video(n):
+    return {"_type": "url", "url": f"https://rumble.com/v{n}-talk.html", "ie_key": "Rumble", "id": f"v{n}",
+            "title": f"Talk {n}"}
+
+
+class _Pages:
+    """A paged entry list, as some extractors return; records which pages were fetched."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.fetched = []
+
+    def getslice(self, start, end):
+        self.fetched.append(start)
+        return self.entries[start:end]
+
+
+class _FakeYoutubeDL:
+    """Stands in for yt_dlp.YoutubeDL with flat listings from `pages` (URL -> info)."""
+
+    pages = {}
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=False, process=True, ie_key=None):
+        return self.pages[url]
+
+
+@pytest.fixture
+def listings(monkeypatch):
+    monkeypatch.setattr(yt_dlp, "YoutubeDL", _FakeYoutubeDL)
+    monkeypatch.setattr(_FakeYoutubeDL, "pages", {})
+    monkeypatch.setattr(ingest, "_PAGE_SIZE", 2)
+    return _FakeYoutubeDL.pages
+
+
+@pytest.fixture
+def history(tmp_path):
+    return TranscriptionHistory(str(tmp_path / "history.json"))
+
+
+def _ids(entries):
+    return [entry.video_id for entry in entries]
+
+
+def test_video_in_two_playlists_is_listed_once(listings):
+    listings[CHANNEL] = {"_type": "playlist", "entries": [
+        {"_type": "url", "url": "https://rumble.com/playlists/a", "ie_key": "RumblePlaylist"},
+        {"_type": "url", "url": "https://rumble.com/playlists/b", "ie_key": "RumblePlaylist"},
+    ]}
+    listings["https://rumble.com/playlists/a"] = {"_type": "playlist", "entries": [_video(1), _video(2)]}
+    listings["https://rumble.com/playlists/b"] = {"_type": "playlist", "entries": [_video(2), _video(3)]}
+    listing = ingest.list_collection(CHANNEL)
+    assert _ids(listing.entries) == ["v1", "v2", "v3"]
+    assert listing.head == ["Rumble:v1", "Rumble:v2", "Rumble:v3"]
+    assert all(entry.collection == CHANNEL for entry in listing.entries)
+
+
+def test_only_new_stops_at_the_previous_sync(listings, history):
+    pages = _Pages([_video(n) for n in (9, 8, 7, 6, 5, 4, 3, 2, 1)])
+    listings[CHANNEL] = {"_type": "playlist", "entries": pages}
+    history.record_sync(CHANNEL, ["Rumble:v7", "Rumble:v6"], pending=["https://rumble.com/v3-talk.html"])
+
+    listing = ingest.list_collection(CHANNEL, history, only_new=True)
+    assert _ids(listing.entries[:2]) == ["v9", "v8"]
+    assert listing.stopped_early
+    # The page holding v7 and v6 was the last one fetched
+    assert pages.fetched == [0, 2]
+    # The new videos go in front of the old starting point, so the next sync stops as early
+    assert listing.head == ["Rumble:v9", "Rumble:v8", "Rumble:v7", "Rumble:v6"]
+    # An unfinished video from last time is retried
+    retried, = listing.entries[2:]
+    assert retried.url == "https://rumble.com/v3-talk.html" and listing.retried == 1
+
+
+def test_full_listing_ignores_the_previous_sync(listings, history):
+    listings[CHANNEL] = {"_type": "playlist", "entries": _Pages([_video(n) for n in (3, 2, 1)])}
+    history.record_sync(CHANNEL, ["Rumble:v2"])
+    listing = ingest.list_collection(CHANNEL, history)
+    assert _ids(listing.entries) == ["v3", "v2", "v1"]
+    assert not listing.stopped_early
+
+
+def test_limit_caps_the_listing(listings):
+    pages = _Pages([_video(n) for n in range(10, 0, -1)])
+    listings[CHANNEL] = {"_type": "playlist", "entries": pages}
+    assert _ids(ingest.list_collection(CHANNEL, limit=3).entries) == ["v10", "v9", "v8"]
+    assert pages.fetched == [0, 2]
+
+
+def test_listing_errors_are_reported_not_raised(listings):
+    listing = ingest.list_collection("https://rumble.com/c/Missing")
+    assert listing.entries == [] and listing.error
+
+
+def _listing(*entries):
+    listing = Listing(CHANNEL)
+    listing.entries = list(entries)
+    return listing
+
+
+def test_select_new_queues_each_video_once(history):
+    first = VideoEntry("https://rumble.com/v1-talk.html", extractor="Rumble", video_id="v1")
+    again = VideoEntry("https://rumble.com/embed/v1/", extractor="Rumble", video_id="v1")
+    unresolved = VideoEntry("https://rumble.com/v2-talk.html#comments")
+    unresolved_again = VideoEntry("https://rumble.com/v2-talk.html")
+    selected, skipped = ingest.select_new([_listing(first, unresolved), _listing(again, unresolved_again)],
+                                          history, "small")
+    assert selected == [first, unresolved]
+    assert skipped == [(again, "duplicate"), (unresolved_again, "duplicate")]
+
+
+def test_select_new_skips_videos_done_with_the_same_model(history):
+    done = VideoEntry("https://rumble.com/v1-talk.html", extractor="Rumble", video_id="v1")
+    todo = VideoEntry("https://rumble.com/v2-talk.html", extractor="Rumble", video_id="v2")
+    history.record_transcribed("Rumble", "v1", "small")
+    selected, skipped = ingest.select_new([_listing(done, todo)], history, "small")
+    assert selected == [todo] and skipped == [(done, "already transcribed")]
+    # Another model, or include_done, takes it again
+    assert ingest.select_new([_listing(done, todo)], history, "turbo")[0] == [done, todo]
+    assert ingest.select_new([_listing(done, todo)], history, "small", include_done=True)[0] == [done, todo]
@@ -0,0 +1,60 @@
+# tests/test_metrics.py
+import metrics
+from metrics import JobMetrics, StageTotals
+
+
+def _job(download_seconds, download_bytes, segments=None):
+    job = JobMetrics(source="https://example.com/v")
+    job.record("download", seconds=download_seconds, bytes=download_bytes, cached=False)
+    if segments is not None:
+        job.record("inference", seconds=12.0, audio_seconds=60.0, segments=segments, real_time_factor=0.2)
+    return job
+
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_totals_accumulate_per_stage_without_job_labels():
+    totals = StageTotals([_job(2.0, 1000, segments=10), _job(40.0, 3000, segments=5), _job(0.5, 0)])
+    samples = _samples(totals.to_prometheus())
+    assert not any("job=" in name for name in samples)
+    assert samples['rumble_transcriber_stage_bytes_total{stage="download"}'] == "4000"
+    assert samples['rumble_transcriber_inference_segments_total{stage="inference"}'] == "15"
+    assert samples['rumble_transcriber_stage_duration_seconds_count{stage="download"}'] == "3"
+    assert samples['rumble_transcriber_stage_duration_seconds_sum{stage="download"}'] == "42.5"
+    assert samples['rumble_transcriber_stage_duration_seconds_bucket{stage="download",le="2.5"}'] == "2"
+    assert samples['rumble_transcriber_stage_duration_seconds_bucket{stage="download",le="+Inf"}'] == "3"
+    assert samples["rumble_transcriber_job_duration_seconds_count"] == "3"
+
+
+def test_series_do_not_grow_with_jobs():
+    one = StageTotals([_job(1.0, 10, segments=1)]).to_prometheus()
+    many = StageTotals([_job(1.0, 10, segments=1) for _ in range(20)]).to_prometheus()
+    assert _samples(one).keys() == _samples(many).keys()
+
+
+def test_emit_rewrites_the_textfile_with_every_job_so_far(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "TOTALS", StageTotals())
+    path = tmp_path / "rumble.prom"
+    for _ in range(3):
+        metrics.emit(_job(1.0, 100), prometheus_path=str(path))
+    samples = _samples(path.read_text(encoding="utf-8"))
+    assert samples['rumble_transcriber_stage_bytes_total{stage="download"}'] == "300"
+    assert samples["rumble_transcriber_job_duration_seconds_count"] == "3"
+
+
+def test_repeated_stage_adds_up_counts_and_rates():
+    job = JobMetrics()
+    job.record("download", seconds=2.0, bytes=1000, cached=False)
+    job.record("download", seconds=3.0, bytes=4000, cached=False)
+    job.record("inference", seconds=6.0, audio_seconds=60.0, segments=10, real_time_factor=0.1,
+               segments_per_second=1.67, workers=2)
+    job.record("inference", seconds=4.0, audio_seconds=40.0, segments=5, real_time_factor=0.1,
+               segments_per_second=1.25, workers=2)
+    stages = job.to_dict()["stages"]
+    assert stages["download"] == {"seconds": 5.0, "bytes": 5000, "bytes_per_second": 1000.0, "cached": False}
+    inference = stages["inference"]
+    assert (inference["audio_seconds"], inference["segments"], inference["workers"]) == (100.0, 15, 2)
+    assert inference["real_time_factor"] == 0.1
+    assert inference["segments_per_second"] == 1.5
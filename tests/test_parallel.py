@@ -0,0 +1,78 @@
+# tests/test_parallel.py
+import os
+import time
+import multiprocessing
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from audio import SAMPLE_RATE
+from parallel import ChunkPool, _stitch
+
+
+def _report_pid(pid_queue):
+    pid_queue.put(os.getpid())
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    # A killed child stays a zombie until the executor reaps it
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(") ", 1)[1][0] != "Z"
+    except OSError:
+        return True
+
+
+def test_abort_kills_workers_by_reported_pid():
+    pool = ChunkPool()
+    context = multiprocessing.get_context("spawn")
+    pool._pid_queue = context.SimpleQueue()
+    pool._executor = executor = ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                                    initializer=_report_pid, initargs=(pool._pid_queue,))
+    pool._users = 1
+    future = executor.submit(time.sleep, 60)
+    pid = pool._pid_queue.get()
+    pool._pid_queue.put(pid)
+    # Python 3.7 and 3.8 have no cancel_futures
+    shutdown = executor.shutdown
+    executor.shutdown = lambda wait=True: shutdown(wait=wait)
+
+    assert pool.abort(executor)
+    assert pool._executor is None
+    with pytest.raises((BrokenProcessPool, CancelledError)):
+        future.result(timeout=10)
+    deadline = time.monotonic() + 10
+    while _alive(pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not _alive(pid)
+
+
+def test_abort_leaves_a_shared_pool_alone():
+    pool = ChunkPool()
+    pool._executor = executor = object()
+    pool._users = 2
+    assert not pool.abort(executor)
+    assert pool._executor is executor
+
+
+def test_stitch_rebuilds_text_from_segments():
+    half = 30 * SAMPLE_RATE
+    chunk = {"text": "ignored", "language": "en", "segments": [
+        {"id": 0, "seek": 0, "start": 0.0, "end": 2.0, "text": " Hello"},
+        {"id": 1, "seek": 0, "start": 2.0, "end": 31.0, "text": " world."},
+    ]}
+    second = {"text": "", "language": "en", "segments": [
+        {"id": 0, "seek": 100, "start": 1.0, "end": 3.0, "text": " Again"},
+    ]}
+    result = _stitch([chunk, second], [(0, half), (half, 2 * half)])
+    assert result["text"] == " Hello world. Again"
+    assert result["text"] == "".join(seg["text"] for seg in result["segments"])
+    assert [seg["id"] for seg in result["segments"]] == [0, 1, 2]
+    # Clamped to the chunk's end, then shifted onto the global timeline
+    assert [(seg["start"], seg["end"]) for seg in result["segments"]] == [(0.0, 2.0), (2.0, 30.0), (31.0, 33.0)]
+    assert result["segments"][2]["seek"] == 100 + half // 160
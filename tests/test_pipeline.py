@@ -0,0 +1,252 @@
+# tests/test_pipeline.py
+import threading
+
+import pytest
+
+from cancellation import Cancelled
+from pipeline import Job, Pipeline
+
+TIMEOUT = 5
+
+
+class _Stages:
+    """Stub stage functions; a job's stage blocks while its gate is closed."""
+
+    def __init__(self):
+        self.downloaded = []
+        self.transcribed = []
+        self.started = {}
+        self.gates = {}
+
+    def gate(self, stage, job):
+        return self.gates.setdefault((stage, job.index), threading.Event())
+
+    def started_event(self, stage, job):
+        return self.started.setdefault((stage, job.index), threading.Event())
+
+    def _run(self, stage, job):
+        self.started_event(stage, job).set()
+        gate = self.gate(stage, job)
+        while not gate.wait(0.01):
+            job.cancel_token.check()
+
+    def download(self, job):
+        self._run("download", job)
+        self.downloaded.append(job.index)
+        return f"/media/{job.index}"
+
+    def transcribe(self, job):
+        self._run("transcribe", job)
+        self.transcribed.append(job.index)
+        return [f"/out/{job.index}.txt"]
+
+    def open_all(self, *jobs):
+        for job in jobs:
+            self.gate("download", job).set()
+            self.gate("transcribe", job).set()
+
+
+@pytest.fixture
+def stages():
+    return _Stages()
+
+
+@pytest.fixture
+def make_pipeline(stages):
+    pipelines = []
+
+    def _make(**kwargs):
+        pipeline = Pipeline(stages.download, stages.transcribe, **kwargs)
+        pipelines.append(pipeline)
+        return pipeline
+
+    yield _make
+    for pipeline in pipelines:
+        for gate in stages.gates.values():
+            gate.set()
+        pipeline.close()
+
+
+def _jobs(count):
+    return [Job(i, f"https://example.com/{i}") for i in range(1, count + 1)]
+
+
+def _buffer(pipeline):
+    """The pipeline's buffered-jobs semaphore (read its count after close())."""
+    return pipeline.start()[2]
+
+
+def _wait(event):
+    assert event.wait(TIMEOUT)
+
+
+def test_jobs_run_through_both_stages(stages, make_pipeline):
+    pipeline = make_pipeline(download_workers=2)
+    jobs = _jobs(3)
+    stages.open_all(*jobs)
+    pipeline.run(jobs)
+    assert [job.status for job in jobs] == ["done"] * 3
+    assert jobs[0].outputs == ["/out/1.txt"]
+    assert sorted(stages.transcribed) == [1, 2, 3]
+
+
+def test_cancel_while_queued(stages, make_pipeline):
+    pipeline = make_pipeline(download_workers=1)
+    buffered = _buffer(pipeline)
+    first, second = _jobs(2)
+    pipeline.submit(first)
+    pipeline.submit(second)
+    _wait(stages.started_event("download", first))
+
+    assert pipeline.cancel(second)
+    assert second.status == "cancelled" and second.finished
+    stages.open_all(first, second)
+    assert first.wait(TIMEOUT) and first.status == "done"
+    pipeline.close()
+    assert stages.downloaded == [1]
+    assert buffered._value == pipeline.max_buffered
+
+
+def test_cancel_while_downloading(stages, make_pipeline):
+    pipeline = make_pipeline()
+    buffered = _buffer(pipeline)
+    job, = _jobs(1)
+    pipeline.submit(job)
+    _wait(stages.started_event("download", job))
+
+    assert pipeline.cancel(job)
+    assert job.wait(TIMEOUT) and job.status == "cancelled"
+    assert job.error is None
+    pipeline.close()
+    assert stages.transcribed == []
+    assert buffered._value == pipeline.max_buffered
+
+
+def test_cancel_while_downloaded(stages, make_pipeline):
+    pipeline = make_pipeline(download_workers=2, transcribe_workers=1)
+    buffered = _buffer(pipeline)
+    first, second = _jobs(2)
+    stages.gate("download", first).set()
+    stages.gate("download", second).set()
+    pipeline.submit(first)
+    pipeline.submit(second)
+    _wait(stages.started_event("transcribe", first))
+    while second.status != "downloaded":
+        assert not second.finished
+        threading.Event().wait(0.01)
+
+    assert pipeline.cancel(second)
+    assert second.status == "cancelled" and second.finished
+    stages.open_all(first)
+    assert first.wait(TIMEOUT) and first.status == "done"
+    pipeline.close()
+    assert stages.transcribed == [1]
+    assert buffered._value == pipeline.max_buffered
+
+
+def test_cancel_while_transcribing(stages, make_pipeline):
+    pipeline = make_pipeline()
+    buffered = _buffer(pipeline)
+    job, = _jobs(1)
+    stages.gate("download", job).set()
+    pipeline.submit(job)
+    _wait(stages.started_event("transcribe", job))
+
+    assert pipeline.cancel(job)
+    assert job.wait(TIMEOUT) and job.status == "cancelled"
+    assert not pipeline.cancel(job)
+    pipeline.close()
+    assert buffered._value == pipeline.max_buffered
+
+
+def test_stage_raising_cancelled_is_not_a_failure():
+    def _download(job):
+        raise Cancelled()
+
+    pipeline = Pipeline(_download, lambda job: [])
+    job, = _jobs(1)
+    pipeline.run([job])
+    assert job.status == "cancelled" and job.error is None
+
+
+def test_retry_after_cancel(stages, make_pipeline):
+    pipeline = make_pipeline()
+    buffered = _buffer(pipeline)
+    job, = _jobs(1)
+    pipeline.submit(job)
+    _wait(stages.started_event("download", job))
+    pipeline.cancel(job)
+    assert job.wait(TIMEOUT) and job.status == "cancelled"
+    old_token = job.cancel_token
+
+    stages.open_all(job)
+    assert pipeline.retry(job)
+    assert job.cancel_token is not old_token and not job.cancel_token.cancelled
+    assert job.wait(TIMEOUT) and job.status == "done"
+    assert job.outputs == ["/out/1.txt"]
+    assert not pipeline.retry(job)
+    pipeline.close()
+    assert buffered._value == pipeline.max_buffered
+
+
+def test_reorder_while_waiting(stages, make_pipeline):
+    pipeline = make_pipeline(download_workers=1)
+    jobs = _jobs(4)
+    for job in jobs:
+        pipeline.submit(job)
+    _wait(stages.started_event("download", jobs[0]))
+
+    pipeline.reorder([jobs[3], jobs[1]])
+    stages.open_all(*jobs)
+    for job in jobs:
+        assert job.wait(TIMEOUT) and job.status == "done"
+    assert stages.downloaded == [1, 4, 2, 3]
+
+
+def test_cancelled_jobs_do_not_leak_buffer_slots(stages, make_pipeline):
+    # One slot: a leaked permit would stall every later job
+    pipeline = make_pipeline(download_workers=1, transcribe_workers=1, max_buffered=1)
+    buffered = _buffer(pipeline)
+    jobs = _jobs(4)
+    for job in jobs:
+        pipeline.submit(job)
+    _wait(stages.started_event("download", jobs[0]))
+    for job in jobs:
+        pipeline.cancel(job)
+    for job in jobs:
+        assert job.wait(TIMEOUT) and job.status == "cancelled"
+
+    later = Job(5, "https://example.com/5")
+    stages.open_all(later)
+    pipeline.submit(later)
+    assert later.wait(TIMEOUT) and later.status == "done"
+    pipeline.close()
+    assert buffered._value == 1
+
+
+def test_retry_between_take_and_begin_runs_the_job_once(stages, make_pipeline):
+    done = threading.Event()
+    pipeline = make_pipeline(on_update=lambda job: job.status == "done" and done.set())
+    job, = _jobs(1)
+    stages.open_all(job)
+    begin = pipeline._begin
+    media_paths = []
+
+    def _racing_begin(job, status, attempt):
+        # The transcriber has taken the downloaded job; cancel and retry it before it starts
+        if status == "transcribing" and job.attempt == 0:
+            pipeline.cancel(job)
+            pipeline.retry(job)
+        ok = begin(job, status, attempt)
+        if ok and status == "transcribing":
+            media_paths.append(job.media_path)
+        return ok
+
+    pipeline._begin = _racing_begin
+    pipeline.submit(job)
+    _wait(done)
+    pipeline.close()
+    assert job.status == "done" and job.attempt == 1
+    assert stages.downloaded == [1, 1]
+    assert stages.transcribed == [1]
+    assert media_paths == ["/media/1"]
@@ -0,0 +1,88 @@
+# tests/test_quantize.py
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+from whisper.model import ModelDimensions, Whisper  # noqa: E402
+
+import quantize  # noqa: E402
+
+DIMS = dict(n_mels=80, n_audio_ctx=10, n_audio_state=16, n_audio_head=2, n_audio_layer=1,
+            n_vocab=100, n_text_ctx=8, n_text_state=16, n_text_head=2, n_text_layer=1)
+
+
+@pytest.fixture
+def checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(quantize, "quantized_dir", lambda: str(tmp_path / "quantized"))
+    monkeypatch.setattr(quantize, "quantized_path", lambda name: str(tmp_path / "quantized" / "tiny-int8-test.pt"))
+    torch.manual_seed(0)
+    path = str(tmp_path / "tiny.pt")
+    torch.save({"dims": DIMS, "model_state_dict": Whisper(ModelDimensions(**DIMS)).state_dict()}, path)
+    return path
+
+
+class _Planted:
+    def __reduce__(self):
+        return (os.system, ("touch planted",))
+
+
+def test_cached_model_matches_the_built_one(checkpoint):
+    built, was_built = quantize.load_quantized(checkpoint)
+    loaded, was_built_again = quantize.load_quantized(checkpoint)
+    assert was_built and not was_built_again
+    assert all(type(m) is not torch.nn.Linear for m in loaded.modules())
+    mel = torch.randn(1, 80, 20)
+    with torch.no_grad():
+        torch.testing.assert_close(loaded.encoder(mel), built.encoder(mel))
+
+
+def test_cache_stores_weights_only(checkpoint):
+    quantize.load_quantized(checkpoint)
+    saved = torch.load(quantize.quantized_path(checkpoint), weights_only=True)
+    assert set(saved) == {"dims", "model_state_dict"}
+
+
+def test_planted_pickle_is_not_executed(checkpoint, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = quantize.quantized_path(checkpoint)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        pickle.dump(_Planted(), f)
+    model, built = quantize.load_quantized(checkpoint)
+    assert built
+    assert not os.path.exists(tmp_path / "planted")
+
+
+
+# Registered before torch is imported, like yt-dlp's placeholder for a missing optional
+# dependency: attribute lookups try to import it and fail with ImportError
+_STUB_FIRST = """
+import sys, types
+class _LazyStub(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        raise ModuleNotFoundError("No module named 'no_Cryptodome'")
+sys.modules["lazy_stub"] = _LazyStub("lazy_stub")
+import torch, quantize
+from whisper.model import ModelDimensions, Whisper
+model = Whisper(ModelDimensions(**{dims!r}))
+quantize.quantize_model(model)
+quantize._save(model, {path!r})
+print(sorted(quantize._torch_load({path!r})))
+"""
+
+
+def test_save_ignores_lazy_module_stubs(tmp_path):
+    path = str(tmp_path / "quantized" / "tiny-int8-test.pt")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    check = subprocess.run([sys.executable, "-c", _STUB_FIRST.format(dims=DIMS, path=path)],
+                           capture_output=True, text=True, cwd=root, timeout=120)
+    assert check.returncode == 0, check.stderr
+    assert check.stdout.strip() == "['dims', 'model_state_dict']"
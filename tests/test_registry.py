@@ -0,0 +1,86 @@
+# tests/test_registry.py
+import pytest
+
+import engines
+import main
+
+MB = 1024 * 1024
+
+
+class _Model:
+    def __init__(self, name, nbytes):
+        self.name = name
+        self.nbytes = nbytes
+
+
+class _SizedEngine(engines.InferenceEngine):
+    """Loads stand-in models whose size is given in the model name, e.g. 'a-3' is 3 MB."""
+
+    name = "sized"
+    compute_types = ("fp32",)
+
+    def __init__(self):
+        self.loads = []
+
+    def load(self, model_name, device, compute_type, threads=None):
+        self.loads.append(model_name)
+        return _Model(model_name, int(model_name.rsplit("-", 1)[1]) * MB)
+
+    def nbytes(self, model):
+        return model.nbytes
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = _SizedEngine()
+    monkeypatch.setitem(engines.ENGINES, engine.name, engine)
+    return engine
+
+
+@pytest.fixture
+def registry():
+    return main.ModelRegistry(budget_mb=5)
+
+
+def _names(registry):
+    return [entry["name"] for entry in registry.info()]
+
+
+def test_models_stay_resident(registry, engine):
+    first = registry.get("a-1", engine="sized")
+    assert registry.get("a-1", engine="sized") is first
+    assert engine.loads == ["a-1"]
+
+
+def test_least_recently_used_model_is_evicted_over_budget(registry, engine):
+    registry.get("a-2", engine="sized")
+    registry.get("b-2", engine="sized")
+    registry.get("a-2", engine="sized")
+    registry.get("c-2", engine="sized")
+    assert _names(registry) == ["a-2", "c-2"]
+    assert registry.resident_bytes() == 4 * MB
+    assert not registry.is_loaded("b-2", engine="sized")
+
+
+def test_newest_model_stays_even_over_budget(registry, engine):
+    registry.get("a-1", engine="sized")
+    registry.get("big-9", engine="sized")
+    assert _names(registry) == ["big-9"]
+
+
+def test_lower_budget_evicts_at_once(registry, engine):
+    registry.get("a-2", engine="sized")
+    registry.get("b-2", engine="sized")
+    registry.set_budget(3)
+    assert _names(registry) == ["b-2"]
+
+
+def test_inference_lock_survives_eviction(registry, engine):
+    lock = registry.inference_lock("a-3", engine="sized")
+    registry.get("a-3", engine="sized")
+    registry.get("b-3", engine="sized")
+    assert not registry.is_loaded("a-3", engine="sized")
+    # A reload while an old job still decodes on the evicted copy waits for it
+    registry.get("a-3", engine="sized")
+    assert registry.inference_lock("a-3", engine="sized") is lock
+    assert registry.inference_lock("b-3", engine="sized") is not lock
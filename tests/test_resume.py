@@ -0,0 +1,109 @@
+# tests/test_resume.py
+import sys
+import types
+
+import numpy as np
+import pytest
+import tqdm
+
+from audio import SAMPLE_RATE
+from cancellation import CancelToken, Cancelled
+from engines import WhisperEngine
+
+
+class _Tokenizer:
+    def decode(self, tokens):
+        return "".join(f" w{t}" for t in tokens if t % 2 == 0)
+
+
+class _StubWhisper:
+    """Mimics openai-whisper's transcribe(): the same loop locals, tqdm bar and clip_timestamps.
+
+    As in whisper, last_speech_timestamp is assigned after the bar is created and only
+    moves when word timestamps are requested.
+    """
+
+    is_multilingual = True
+    num_languages = 99
+
+    def transcribe(self, audio, *, language=None, verbose=None, fp16=True, clip_timestamps="0",
+                   word_timestamps=False):
+        content_frames = len(audio) // 160
+        seek = round(clip_timestamps[0] * 100) if isinstance(clip_timestamps, list) else 0
+        all_tokens = []
+        all_segments = []
+        prompt_reset_since = 0
+        with tqdm.tqdm(total=content_frames, disable=verbose is not False) as pbar:
+            last_speech_timestamp = 0.0
+            while seek < content_frames:
+                # Each window depends on the carried prompt and on where speech last ended
+                prompt = all_tokens[prompt_reset_since:]
+                tok = (sum(prompt[-5:]) * 31 + seek + int(last_speech_timestamp * 10)) % 1000 * 2
+                end = min(seek + 1500, content_frames)
+                all_segments.append({"id": len(all_segments), "seek": seek, "start": seek / 100,
+                                     "end": end / 100, "text": f" w{tok}", "tokens": [tok, tok + 1]})
+                all_tokens.extend([tok, tok + 1])
+                if tok % 7 == 0:
+                    prompt_reset_since = len(all_tokens)
+                if word_timestamps:
+                    last_speech_timestamp = end / 100 - (tok % 5) / 10
+                previous_seek, seek = seek, end
+                pbar.update(seek - previous_seek)
+        return {"text": _Tokenizer().decode(all_tokens), "segments": all_segments, "language": language}
+
+
+@pytest.fixture
+def stub_whisper(monkeypatch):
+    tokenizer = types.ModuleType("whisper.tokenizer")
+    tokenizer.get_tokenizer = lambda multilingual, num_languages=99: _Tokenizer()
+    package = types.ModuleType("whisper")
+    package.tokenizer = tokenizer
+    monkeypatch.setitem(sys.modules, "whisper", package)
+    monkeypatch.setitem(sys.modules, "whisper.tokenizer", tokenizer)
+    return _StubWhisper()
+
+
+def _transcribe(model, **kwargs):
+    audio = np.zeros(SAMPLE_RATE * 200, dtype=np.float32)
+    return WhisperEngine().transcribe(model, audio, "en", "fp32", **kwargs)
+
+
+def test_resumed_run_matches_uninterrupted_run(stub_whisper):
+    expected = _transcribe(stub_whisper, checkpoint_callback=lambda state: None)
+
+    checkpoints = []
+    cancel = CancelToken()
+
+    def _on_checkpoint(state):
+        checkpoints.append(state)
+        if len(checkpoints) == 3:
+            cancel.cancel()
+
+    with pytest.raises(Cancelled):
+        _transcribe(stub_whisper, checkpoint_callback=_on_checkpoint, cancel=cancel)
+    state = checkpoints[-1]
+    assert 0 < state["seek"] < 200 * 100
+    assert len(state["segments"]) == 3
+
+    resumed_segments = []
+    resumed = _transcribe(stub_whisper, resume=state, segment_callback=resumed_segments.extend)
+    assert resumed["segments"] == expected["segments"]
+    assert resumed["text"] == expected["text"]
+    assert resumed_segments == expected["segments"]
+
+
+def test_missing_loop_local_warns_instead_of_checkpointing(stub_whisper, capsys):
+    class _Renamed(_StubWhisper):
+        def transcribe(self, audio, *, language=None, verbose=None, fp16=True, clip_timestamps="0"):
+            seek, segments = 0, []
+            with tqdm.tqdm(total=300, disable=True) as pbar:
+                for _ in range(3):
+                    segments.append({"seek": seek, "tokens": []})
+                    seek += 100
+                    pbar.update(100)
+            return {"text": "", "segments": segments, "language": language}
+
+    checkpoints = []
+    _transcribe(_Renamed(), checkpoint_callback=checkpoints.append)
+    assert checkpoints == []
+    assert capsys.readouterr().out.count("progress is not checkpointed") == 1
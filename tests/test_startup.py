@@ -0,0 +1,37 @@
+# tests/test_startup.py
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+import main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _heavy_after_import(module):
+    """Heavy modules in sys.modules after importing module in a fresh interpreter."""
+    probe = (f"import sys; import {module}; "
+             f"print(','.join(m for m in {main.HEAVY_MODULES!r} if m in sys.modules))")
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    check = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, cwd=ROOT, env=env,
+                           timeout=60)
+    assert check.returncode == 0, check.stderr
+    return [m for m in check.stdout.strip().split(",") if m]
+
+
+@pytest.mark.parametrize("module", ["main", "daemon", "pipeline", "engines", "ingest"])
+def test_import_loads_no_heavy_modules(module):
+    assert _heavy_after_import(module) == []
+
+
+@pytest.mark.skipif(importlib.util.find_spec("PyQt5") is None, reason="PyQt5 is not installed")
+def test_gui_import_loads_no_heavy_modules():
+    assert _heavy_after_import("gui") == []
+
+
+def test_warm_imports_skips_what_fails():
+    timings = main.warm_imports(("json", "no_such_module_here"))
+    assert list(timings) == ["json"]
@@ -0,0 +1,97 @@
+# tests/test_transcript.py
+import numpy as np
+import pytest
+
+from transcript import Transcript
+
+
+def _result():
+    segments = []
+    for i in range(6):
+        seg = {"id": i, "seek": i * 500, "start": i * 5.0, "end": i * 5.0 + 4.0,
+               "text": f" Säätö {i} — ünïcode", "tokens": list(range(i * 3, i * 3 + 2 + i % 2)),
+               "temperature": 0.0, "avg_logprob": -0.25 - i, "compression_ratio": 1.5,
+               "no_speech_prob": 0.01 * i}
+        if i != 3:
+            seg["words"] = [{"word": f" w{i}{k}é", "start": i * 5.0 + k, "end": i * 5.0 + k + 0.5,
+                             "probability": 0.9} for k in range(i % 3 + 1)]
+        segments.append(seg)
+    # A segment without decoder stats or tokens, and a word without a probability
+    del segments[4]["temperature"], segments[4]["avg_logprob"]
+    segments[4]["tokens"] = []
+    del segments[5]["words"][0]["probability"]
+    return {"text": "Whisper's own text", "segments": segments, "language": "fi"}
+
+
+def _without_ids(segments):
+    return [{k: v for k, v in seg.items() if k != "id"} for seg in segments]
+
+
+def test_round_trip_keeps_every_field():
+    result = _result()
+    restored = Transcript.from_bytes(Transcript.from_result(result).to_bytes())
+    assert restored.to_result() == result
+    assert restored.language == "fi"
+    assert restored.text == "Whisper's own text"
+
+
+def test_round_trip_without_optional_columns():
+    result = {"text": " a b", "segments": [{"start": 0.0, "end": 1.0, "text": " a"},
+                                          {"start": 1.0, "end": 2.5, "text": " b"}], "language": None}
+    restored = Transcript.from_bytes(Transcript.from_result(result).to_bytes())
+    assert not restored.has_tokens() and not restored.has_words()
+    assert list(restored.segments()) == [dict(seg, id=i) for i, seg in enumerate(result["segments"])]
+    assert restored.tokens(0).size == 0
+
+
+def test_round_trip_of_empty_transcript():
+    restored = Transcript.from_bytes(Transcript.from_result({"text": "", "segments": []}).to_bytes())
+    assert len(restored) == 0
+    assert restored.to_result() == {"text": "", "segments": [], "language": None}
+
+
+@pytest.mark.parametrize("lo, hi", [(0, 6), (1, 4), (2, 3), (3, 6), (5, 6), (2, 2)])
+def test_serialized_slice_rebases_offsets(lo, hi):
+    result = _result()
+    part = Transcript.from_result(result)[lo:hi]
+    restored = Transcript.from_bytes(part.to_bytes())
+    expected = result["segments"][lo:hi]
+    assert len(restored) == hi - lo
+    assert _without_ids(restored.segments()) == _without_ids(expected)
+    assert restored.text == "".join(seg["text"] for seg in expected)
+    for i, seg in enumerate(expected):
+        assert restored.tokens(i).tolist() == seg["tokens"]
+        assert restored.words(i) == seg.get("words", [])
+
+
+def test_slice_of_deserialized_transcript():
+    result = _result()
+    restored = Transcript.from_bytes(Transcript.from_result(result).to_bytes())
+    part = restored.slice(8.5, 21.0)
+    assert [seg["id"] for seg in part.segments()] == [1, 2, 3, 4]
+    assert list(part.segments()) == result["segments"][1:5]
+    assert part.segment(0) == result["segments"][1]
+
+
+def test_slice_selects_overlapping_segments():
+    transcript = Transcript.from_result(_result())
+    # Segment i covers [5i, 5i + 4): 4.5 falls in a pause, 10.0 is where segment 2 starts
+    assert transcript.index_range(4.5, 10.0) == (1, 2)
+    assert transcript.index_range(4.0, 10.5) == (1, 3)
+    assert transcript.index_range(None, None) == (0, 6)
+    assert transcript.index_range(40.0, None) == (6, 6)
+    assert len(transcript.slice(18.0, 12.0)) == 0
+    nested = transcript.slice(5.0, None).slice(None, 15.0)
+    assert [seg["id"] for seg in nested.segments()] == [1, 2]
+
+
+def test_from_bytes_arrays_are_views():
+    data = Transcript.from_result(_result()).to_bytes()
+    restored = Transcript.from_bytes(data)
+    assert not restored.start.flags.owndata
+    np.testing.assert_array_equal(restored.end, [i * 5.0 + 4.0 for i in range(6)])
+
+
+def test_from_bytes_rejects_other_data():
+    with pytest.raises(ValueError):
+        Transcript.from_bytes(b"not a transcript")
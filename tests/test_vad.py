@@ -0,0 +1,82 @@
+# tests/test_vad.py
+import numpy as np
+import pytest
+
+from vad import GAP_SECONDS, SpeechMap, detect_speech
+
+SR = 1000
+# Speech at 1-3 s, 10-12 s and 20-25 s of a 30 s recording
+REGIONS = [(1000, 3000), (10000, 12000), (20000, 25000)]
+
+
+@pytest.fixture
+def speech_map():
+    return SpeechMap(REGIONS, 30 * SR, sr=SR)
+
+
+def _joined(region, seconds):
+    """A time `seconds` into the given region, on the joined timeline."""
+    before = sum((end - start) / SR + GAP_SECONDS for start, end in REGIONS[:region])
+    return before + seconds
+
+
+def test_joined_audio_layout(speech_map):
+    samples = np.arange(30 * SR, dtype=np.float32)
+    joined = speech_map.audio(samples)
+    gap = int(GAP_SECONDS * SR)
+    assert len(joined) == speech_map.joined_samples == 9000 + 2 * gap
+    assert joined[0] == 1000 and joined[1999] == 2999
+    assert not joined[2000:2000 + gap].any()
+    assert joined[2000 + gap] == 10000
+    assert joined[-1] == 24999
+    assert speech_map.speech_seconds == 9.0
+    assert speech_map.skipped_seconds == 21.0
+
+
+@pytest.mark.parametrize("region, seconds, original", [
+    (0, 0.0, 1.0), (0, 1.25, 2.25), (1, 0.0, 10.0), (1, 1.5, 11.5), (2, 4.0, 24.0), (2, 5.0, 25.0),
+])
+def test_times_inside_regions_map_back(speech_map, region, seconds, original):
+    t = _joined(region, seconds)
+    assert speech_map.to_original(t) == pytest.approx(original)
+    assert speech_map.to_original(t, is_start=True) == pytest.approx(original)
+
+
+def test_times_inside_gaps_snap_to_the_speech_around_them(speech_map):
+    in_first_gap = _joined(0, 2.0 + GAP_SECONDS / 2)
+    assert speech_map.to_original(in_first_gap) == pytest.approx(3.0)
+    assert speech_map.to_original(in_first_gap, is_start=True) == pytest.approx(10.0)
+    # Past the last region there is nothing to start in
+    assert speech_map.to_original(_joined(2, 7.0), is_start=True) == pytest.approx(25.0)
+
+
+def test_map_segments_across_gaps(speech_map):
+    segments = [
+        {"id": 0, "start": _joined(0, 0.5), "end": _joined(0, 1.5), "text": " one"},
+        # Whisper ran this one across the first gap
+        {"id": 1, "start": _joined(0, 1.8), "end": _joined(1, 0.7), "text": " two",
+         "words": [{"word": " t", "start": _joined(0, 1.8), "end": _joined(0, 2.0)},
+                   {"word": " wo", "start": _joined(0, 2.0 + GAP_SECONDS / 2), "end": _joined(1, 0.7)}]},
+        # Starts in the second gap: moved to where the third region begins
+        {"id": 2, "start": _joined(1, 2.0 + GAP_SECONDS / 2), "end": _joined(2, 3.0), "text": " three"},
+    ]
+    mapped = speech_map.map_segments(segments)
+
+    assert [(s["start"], s["end"]) for s in mapped] == pytest.approx([(1.5, 2.5), (2.8, 10.7), (20.0, 23.0)])
+    assert [(w["start"], w["end"]) for w in mapped[1]["words"]] == pytest.approx([(2.8, 3.0), (10.0, 10.7)])
+    assert [s["text"] for s in mapped] == [" one", " two", " three"]
+    # The input is left alone
+    assert segments[0]["start"] == pytest.approx(0.5)
+
+
+def test_detected_regions_cover_speech_only():
+    sr = 16000
+    samples = np.zeros(20 * sr, dtype=np.float32)
+    rng = np.random.default_rng(0)
+    samples[4 * sr:7 * sr] = rng.uniform(-0.5, 0.5, 3 * sr)
+    samples[12 * sr:15 * sr] = rng.uniform(-0.5, 0.5, 3 * sr)
+    regions, backend = detect_speech(samples, sr, backend="energy")
+    assert backend == "energy"
+    assert len(regions) == 2
+    for (start, end), (lo, hi) in zip(regions, [(4, 7), (12, 15)]):
+        assert lo - 0.5 < start / sr <= lo and hi <= end / sr < hi + 0.5
@@ -0,0 +1,111 @@
+# tests/test_workspace.py
+import os
+import threading
+
+import pytest
+
+import main
+from cache import MediaCache, TranscriptCache
+from transcript import Transcript
+
+
+def test_workspaces_are_private_and_removed(tmp_path):
+    out = str(tmp_path)
+    with main.job_workspace(out, "job") as first, main.job_workspace(out, "job") as second:
+        assert first != second
+        assert os.path.dirname(first) == os.path.join(out, main.WORK_DIR_NAME)
+        with open(os.path.join(first, "a.txt"), "w") as f:
+            f.write("a")
+        assert os.listdir(second) == []
+    assert not os.path.exists(os.path.join(out, main.WORK_DIR_NAME))
+
+
+def test_workspace_is_removed_when_the_job_fails(tmp_path):
+    with pytest.raises(RuntimeError):
+        with main.job_workspace(str(tmp_path), "job") as work:
+            open(os.path.join(work, "half.srt"), "w").close()
+            raise RuntimeError("boom")
+    assert os.listdir(tmp_path) == []
+
+
+def test_workspace_survives_another_job_removing_the_parent(tmp_path, monkeypatch):
+    parent = os.path.join(str(tmp_path), main.WORK_DIR_NAME)
+    os.makedirs(parent)
+    mkdir = os.mkdir
+    raced = []
+
+    def _mkdir(path, *args, **kwargs):
+        if os.path.dirname(path) == parent and not raced:
+            # Another job ends between makedirs() finding the parent and creating the folder
+            raced.append(path)
+            os.rmdir(parent)
+        return mkdir(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "mkdir", _mkdir)
+    with main.job_workspace(str(tmp_path), "job") as work:
+        assert raced and os.path.isdir(work)
+
+
+def test_publish_replaces_the_older_version(tmp_path):
+    final = tmp_path / "talk.txt"
+    final.write_text("old")
+    with main.job_workspace(str(tmp_path), "job") as work:
+        tmp = os.path.join(work, "talk.txt")
+        with open(tmp, "w") as f:
+            f.write("new")
+        assert main.publish_file(tmp, str(final)) == str(final)
+    assert final.read_text() == "new"
+
+
+def test_transcript_names_differ_by_model_range_and_variant(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "MEDIA_CACHE", MediaCache(root=str(tmp_path / "media")))
+    names = {
+        main.transcript_basename("/x/talk.m4a", "small"),
+        main.transcript_basename("/x/talk.m4a", "turbo"),
+        main.transcript_basename("/x/talk.m4a", "small", 90, 180),
+        main.transcript_basename("/x/talk.m4a", "small", 90, None),
+        main.transcript_basename("/x/talk.m4a", "small", variant="ctranslate2-int8"),
+    }
+    assert len(names) == 5
+    assert "talk_small_90-180s_transcript" in names
+    # Media read straight from the cache is named after its video
+    cached = os.path.join(main.MEDIA_CACHE.entry_dir("Rumble", "v4abc12"), "native_audio.m4a")
+    assert main.transcript_basename(cached, "turbo") == "rumble-v4abc12_turbo_transcript"
+
+
+def test_concurrent_jobs_share_an_output_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "TRANSCRIPT_CACHE", TranscriptCache(root=str(tmp_path / "transcripts")))
+    # Both jobs are inside inference at once, then write their files side by side
+    barrier = threading.Barrier(2, timeout=5)
+
+    def _inference(audio_path, model_name, *args, **kwargs):
+        barrier.wait()
+        return Transcript.from_result({"text": f" {model_name}", "language": "en",
+                                       "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": f" {model_name}"}]})
+
+    monkeypatch.setattr(main, "_run_inference", _inference)
+    media = tmp_path / "talk.m4a"
+    media.write_bytes(b"\0" * 100)
+    out = tmp_path / "out"
+    outputs = {}
+    errors = []
+
+    def _job(model):
+        try:
+            outputs[model] = main.transcribe(str(media), model_name=model, formats=["txt", "srt"],
+                                             output_dir=str(out), compute_type="fp32")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=_job, args=(model,)) for model in ("tiny", "base")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert errors == []
+    assert sorted(os.listdir(out)) == ["talk_base_transcript.srt", "talk_base_transcript.txt",
+                                       "talk_tiny_transcript.srt", "talk_tiny_transcript.txt"]
+    for model, paths in outputs.items():
+        txt, = [path for path in paths if path.endswith(".txt")]
+        with open(txt, encoding="utf-8") as f:
+            assert f.read() == f"{model}\n"
@@ -0,0 +1,331 @@
+# transcript.py
+import json
+import struct
+import numpy as np
+
+# Binary layout: MAGIC, uint32 header length, JSON header, then 8-byte aligned sections
+MAGIC = b"RTTR\x01"
+# Per-segment decoder statistics Whisper reports, kept as optional float columns
+SEGMENT_STATS = ("temperature", "avg_logprob", "compression_ratio", "no_speech_prob")
+
+
+def _offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+class _Columns:
+    """The arrays behind a Transcript and every slice of it.
+
+    Core columns (start, end, text) are always present. The rest are either given
+    directly or decoded from a serialized buffer on first access.
+    """
+
+    def __init__(self, start, end, text_buffer, text_offsets, arrays=None, raw=None, sections=None):
+        self.start = start
+        self.end = end
+        self.text_buffer = text_buffer
+        self.text_offsets = text_offsets
+        self._arrays = dict(arrays or {})
+        self._raw = raw
+        self._sections = sections or {}
+
+    def has(self, name):
+        return name in self._arrays or name in self._sections
+
+    def get(self, name):
+        if name not in self._arrays:
+            if name not in self._sections:
+                return None
+            dtype, offset, count = self._sections[name]
+            if dtype == "str":
+                self._arrays[name] = bytes(self._raw[offset:offset + count]).decode("utf-8")
+            else:
+                self._arrays[name] = np.frombuffer(self._raw, dtype=dtype, count=count, offset=offset)
+        return self._arrays[name]
+
+
+class Transcript:
+    """A transcript stored column-wise instead of as a list of per-segment dicts.
+
+    Segment start/end times are float64 arrays and all segment texts share one
+    string with an offsets array. Tokens, words and decoder statistics are kept
+    in flat arrays that are only decoded when asked for. slice() returns a view
+    onto the same arrays, and to_bytes()/from_bytes() give a compact binary form.
+    segment()/to_result() rebuild Whisper's dict layout for code that needs it.
+    """
+
+    def __init__(self, columns, text=None, language=None, lo=0, hi=None):
+        self._cols = columns
+        self.language = language
+        self._lo = lo
+        self._hi = len(columns.start) if hi is None else hi
+        self._text = text
+
+    # -- construction --------------------------------------------------------
+
+    @classmethod
+    def from_result(cls, result):
+        """Pack a Whisper result dict (or an existing Transcript) into columns."""
+        if isinstance(result, Transcript):
+            return result
+        segments = result.get("segments") or []
+        n = len(segments)
+        start = np.fromiter((s.get("start", 0.0) for s in segments), dtype=np.float64, count=n)
+        end = np.fromiter((s.get("end", 0.0) for s in segments), dtype=np.float64, count=n)
+        texts = [s.get("text", "") for s in segments]
+        arrays = {}
+
+        if any("seek" in s for s in segments):
+            arrays["seek"] = np.fromiter((s.get("seek", 0) for s in segments), dtype=np.int64, count=n)
+        for name in SEGMENT_STATS:
+            if any(name in s for s in segments):
+                arrays[name] = np.fromiter((s.get(name, np.nan) for s in segments), dtype=np.float64, count=n)
+        if any(s.get("tokens") for s in segments):
+            token_lists = [s.get("tokens") or [] for s in segments]
+            arrays["token_offsets"] = _offsets([len(t) for t in token_lists])
+            arrays["tokens"] = np.fromiter((t for tokens in token_lists for t in tokens), dtype=np.int32,
+                                           count=int(arrays["token_offsets"][-1]))
+        if any(s.get("words") for s in segments):
+            word_lists = [s.get("words") or [] for s in segments]
+            words = [w for ws in word_lists for w in ws]
+            word_texts = [w.get("word", "") for w in words]
+            arrays["word_offsets"] = _offsets([len(ws) for ws in word_lists])
+            arrays["word_text"] = "".join(word_texts)
+            arrays["word_text_offsets"] = _offsets([len(t) for t in word_texts])
+            for name in ("start", "end", "probability"):
+                arrays[f"word_{name}"] = np.fromiter((w.get(name, np.nan) for w in words), dtype=np.float64,
+                                                     count=len(words))
+
+        columns = _Columns(start, end, "".join(texts), _offsets([len(t) for t in texts]), arrays)
+        return cls(columns, text=result.get("text"), language=result.get("language"))
+
+    # -- size and columns ----------------------------------------------------
+
+    def __len__(self):
+        return self._hi - self._lo
+
+    @property
+    def start(self):
+        return self._cols.start[self._lo:self._hi]
+
+    @property
+    def end(self):
+        return self._cols.end[self._lo:self._hi]
+
+    @property
+    def duration(self):
+        return float(self.end[-1] - self.start[0]) if len(self) else 0.0
+
+    @property
+    def text(self):
+        """The full text: Whisper's own for a whole transcript, joined segments for a slice."""
+        if self._text is not None:
+            return self._text
+        offsets = self._cols.text_offsets
+        return self._cols.text_buffer[offsets[self._lo]:offsets[self._hi]]
+
+    def segment_text(self, i):
+        offsets = self._cols.text_offsets
+        j = self._lo + i
+        return self._cols.text_buffer[offsets[j]:offsets[j + 1]]
+
+    def texts(self):
+        buffer, offsets = self._cols.text_buffer, self._cols.text_offsets
+        for j in range(self._lo, self._hi):
+            yield buffer[offsets[j]:offsets[j + 1]]
+
+    def has_tokens(self):
+        return self._cols.has("tokens")
+
+    def has_words(self):
+        return self._cols.has("word_offsets")
+
+    def tokens(self, i):
+        """Token ids of segment i as an int32 array (empty when tokens weren't kept)."""
+        tokens = self._cols.get("tokens")
+        if tokens is None:
+            return np.zeros(0, dtype=np.int32)
+        offsets = self._cols.get("token_offsets")
+        j = self._lo + i
+        return tokens[offsets[j]:offsets[j + 1]]
+
+    def words(self, i):
+        """Word dicts of segment i (word, start, end, probability), or [] without word timings."""
+        offsets = self._cols.get("word_offsets")
+        if offsets is None:
+            return []
+        j = self._lo + i
+        text, text_offsets = self._cols.get("word_text"), self._cols.get("word_text_offsets")
+        starts, ends, probs = (self._cols.get(f"word_{name}") for name in ("start", "end", "probability"))
+        words = []
+        for k in range(int(offsets[j]), int(offsets[j + 1])):
+            word = {"word": text[text_offsets[k]:text_offsets[k + 1]],
+                    "start": float(starts[k]), "end": float(ends[k])}
+            if not np.isnan(probs[k]):
+                word["probability"] = float(probs[k])
+            words.append(word)
+        return words
+
+    # -- dict views ----------------------------------------------------------
+
+    def segment(self, i, full=True):
+        """Segment i in Whisper's dict layout; full=False leaves out tokens and decoder stats."""
+        j = self._lo + i
+        seg = {"id": j}
+        seek = self._cols.get("seek") if full else None
+        if seek is not None:
+            seg["seek"] = int(seek[j])
+        seg["start"] = float(self._cols.start[j])
+        seg["end"] = float(self._cols.end[j])
+        seg["text"] = self.segment_text(i)
+        if full:
+            if self.has_tokens():
+                seg["tokens"] = self.tokens(i).tolist()
+            for name in SEGMENT_STATS:
+                column = self._cols.get(name)
+                if column is not None and not np.isnan(column[j]):
+                    seg[name] = float(column[j])
+        if self.has_words():
+            words = self.words(i)
+            if words:
+                seg["words"] = words
+        return seg
+
+    def segments(self, full=True):
+        """Every segment as a dict, like segment(); columns are converted in bulk."""
+        lo, hi = self._lo, self._hi
+        cols = self._cols
+        starts, ends = self.start.tolist(), self.end.tolist()
+        texts = list(self.texts())
+        seek = stats = tokens = None
+        if full:
+            if cols.has("seek"):
+                seek = cols.get("seek")[lo:hi].tolist()
+            stats = [(name, cols.get(name)[lo:hi].tolist()) for name in SEGMENT_STATS if cols.has(name)]
+            if self.has_tokens():
+                offsets = cols.get("token_offsets")[lo:hi + 1]
+                flat = cols.get("tokens")[offsets[0]:offsets[-1]].tolist()
+                offsets = (offsets - offsets[0]).tolist()
+                tokens = [flat[offsets[i]:offsets[i + 1]] for i in range(hi - lo)]
+        has_words = self.has_words()
+        for i in range(hi - lo):
+            seg = {"id": lo + i}
+            if seek is not None:
+                seg["seek"] = seek[i]
+            seg["start"] = starts[i]
+            seg["end"] = ends[i]
+            seg["text"] = texts[i]
+            if tokens is not None:
+                seg["tokens"] = tokens[i]
+            if stats:
+                for name, values in stats:
+                    if values[i] == values[i]:  # NaN marks a segment without this field
+                        seg[name] = values[i]
+            if has_words:
+                words = self.words(i)
+                if words:
+                    seg["words"] = words
+            yield seg
+
+    def to_result(self):
+        """Whisper-style {'text', 'segments', 'language'} dict."""
+        return {"text": self.text, "segments": list(self.segments()), "language": self.language}
+
+    # -- slicing -------------------------------------------------------------
+
+    def index_range(self, start_time=None, end_time=None):
+        """(first, stop) indices of the segments overlapping [start_time, end_time)."""
+        lo, hi = 0, len(self)
+        if start_time is not None:
+            lo = int(np.searchsorted(self.end, start_time, side="right"))
+        if end_time is not None:
+            hi = int(np.searchsorted(self.start, end_time, side="left"))
+        return lo, max(lo, hi)
+
+    def slice(self, start_time=None, end_time=None):
+        """Segments overlapping [start_time, end_time) as a view: nothing is copied."""
+        lo, hi = self.index_range(start_time, end_time)
+        return Transcript(self._cols, language=self.language, lo=self._lo + lo, hi=self._lo + hi)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step not in (None, 1):
+            raise TypeError("Transcript supports contiguous index slices only; use segment(i) for one segment")
+        lo, hi, _ = index.indices(len(self))
+        return Transcript(self._cols, language=self.language, lo=self._lo + lo, hi=self._lo + max(lo, hi))
+
+    # -- serialization -------------------------------------------------------
+
+    def to_bytes(self):
+        """Compact binary form: a small JSON header followed by the raw column arrays."""
+        lo, hi = self._lo, self._hi
+        cols = self._cols
+        text_offsets = cols.text_offsets[lo:hi + 1]
+        arrays = {
+            "start": self.start,
+            "end": self.end,
+            "text": cols.text_buffer[text_offsets[0]:text_offsets[-1]],
+            "text_offsets": text_offsets - text_offsets[0],
+        }
+        if cols.has("seek"):
+            arrays["seek"] = cols.get("seek")[lo:hi]
+        for name in SEGMENT_STATS:
+            if cols.has(name):
+                arrays[name] = cols.get(name)[lo:hi]
+        if cols.has("tokens"):
+            offsets = cols.get("token_offsets")[lo:hi + 1]
+            arrays["tokens"] = cols.get("tokens")[offsets[0]:offsets[-1]]
+            arrays["token_offsets"] = offsets - offsets[0]
+        if cols.has("word_offsets"):
+            offsets = cols.get("word_offsets")[lo:hi + 1]
+            w0, w1 = int(offsets[0]), int(offsets[-1])
+            text_offsets = cols.get("word_text_offsets")[w0:w1 + 1]
+            arrays["word_offsets"] = offsets - offsets[0]
+            arrays["word_text"] = cols.get("word_text")[text_offsets[0]:text_offsets[-1]]
+            arrays["word_text_offsets"] = text_offsets - text_offsets[0]
+            for name in ("start", "end", "probability"):
+                arrays[f"word_{name}"] = cols.get(f"word_{name}")[w0:w1]
+
+        sections, blobs, position = {}, [], 0
+        for name, value in arrays.items():
+            if isinstance(value, str):
+                blob, dtype, count = value.encode("utf-8"), "str", None
+            else:
+                value = np.ascontiguousarray(value)
+                blob, dtype, count = value.tobytes(), value.dtype.str, len(value)
+            sections[name] = [dtype, position, count if count is not None else len(blob)]
+            padding = -len(blob) % 8
+            blobs.append(blob + b"\0" * padding)
+            position += len(blob) + padding
+        header = json.dumps({"segments": len(self), "text": self._text, "language": self.language,
+                             "sections": sections}, ensure_ascii=False).encode("utf-8")
+        header += b" " * (-(len(MAGIC) + 4 + len(header)) % 8)
+        return b"".join([MAGIC, struct.pack("<I", len(header)), header] + blobs)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Inverse of to_bytes(). Arrays are views into data; optional sections decode on first use."""
+        data = memoryview(data)
+        if bytes(data[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a serialized Transcript")
+        (header_len,) = struct.unpack_from("<I", data, len(MAGIC))
+        base = len(MAGIC) + 4
+        header = json.loads(bytes(data[base:base + header_len]).decode("utf-8"))
+        body = base + header_len
+        sections = {name: (dtype, body + offset, count) for name, (dtype, offset, count) in header["sections"].items()}
+        columns = _Columns(None, None, None, None, raw=data, sections=sections)
+        columns.start = columns.get("start")
+        columns.end = columns.get("end")
+        columns.text_buffer = columns.get("text")
+        columns.text_offsets = columns.get("text_offsets")
+        return cls(columns, text=header.get("text"), language=header.get("language"))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
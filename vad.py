@@ -0,0 +1,160 @@
+# vad.py
+import bisect
+
+import numpy as np
+
+from audio import SAMPLE_RATE
+
+FRAME_SECONDS = 0.03
+# Pauses shorter than this stay inside a speech region; Whisper handles those fine
+MIN_SILENCE_SECONDS = 1.0
+# Bursts shorter than this (clicks, a cough) are not worth a region of their own
+MIN_SPEECH_SECONDS = 0.25
+# Kept around every region so word onsets and tails are never clipped
+PAD_SECONDS = 0.3
+# Silence put between regions when they are joined, so Whisper still hears a break
+GAP_SECONDS = 0.5
+# Energy detector: frames this far above the noise floor count as speech...
+ENERGY_MARGIN_DB = 12.0
+# ...and audio never gets louder than this is dead air throughout
+SILENCE_DB = -50.0
+
+
+def detect_speech(samples, sr=SAMPLE_RATE, backend=None):
+    """Speech regions of a float32 array as (start, end) sample pairs, in order.
+
+    Uses WebRTC's VAD when the optional webrtcvad package is installed, which also
+    passes over most music, else a frame-energy detector relative to the recording's
+    own noise floor, which skips silence and dead air. Short pauses are bridged and
+    every region is padded (see the module constants). Returns (regions, backend name).
+    """
+    backend = backend or default_backend()
+    frame = int(FRAME_SECONDS * sr)
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return ([(0, len(samples))] if len(samples) else []), backend
+    if backend == "webrtc":
+        voiced = _webrtc_frames(samples, sr, frame, n_frames)
+    elif backend == "energy":
+        voiced = _energy_frames(samples, frame, n_frames)
+    else:
+        raise ValueError(f"unknown VAD backend '{backend}' (choose from webrtc, energy)")
+    return _regions(voiced, frame, len(samples), sr), backend
+
+
+def default_backend():
+    """'webrtc' if the webrtcvad package is installed, else 'energy'."""
+    try:
+        import webrtcvad  # noqa: F401
+        return "webrtc"
+    except ImportError:
+        return "energy"
+
+
+def _energy_frames(samples, frame, n_frames):
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    db = 10.0 * np.log10(np.square(frames, dtype=np.float64).mean(axis=1) + 1e-10)
+    floor, loud = np.percentile(db, 10), np.percentile(db, 90)
+    if loud - floor < ENERGY_MARGIN_DB:
+        # No pauses to speak of: either dead air throughout or sound throughout
+        return np.full(n_frames, loud > SILENCE_DB)
+    return db > max(SILENCE_DB, floor + ENERGY_MARGIN_DB)
+
+
+def _webrtc_frames(samples, sr, frame, n_frames):
+    import webrtcvad
+    detector = webrtcvad.Vad(2)
+    pcm = (np.clip(samples[:n_frames * frame], -1.0, 1.0) * 32767).astype("<i2").tobytes()
+    step = frame * 2
+    return np.fromiter((detector.is_speech(pcm[i * step:(i + 1) * step], sr) for i in range(n_frames)),
+                       dtype=bool, count=n_frames)
+
+
+def _regions(voiced, frame, total, sr):
+    # Runs of voiced frames as [start, end) frame indices
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    runs = [(int(a), int(b)) for a, b in zip(edges[::2], edges[1::2])]
+    bridge = int(MIN_SILENCE_SECONDS / FRAME_SECONDS)
+    merged = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < bridge:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    shortest = int(MIN_SPEECH_SECONDS / FRAME_SECONDS)
+    pad = int(PAD_SECONDS * sr)
+    regions = []
+    for start, end in merged:
+        if end - start < shortest:
+            continue
+        lo = max(0, start * frame - pad)
+        hi = min(total, end * frame + pad)
+        if regions and lo <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], hi)
+        else:
+            regions.append((lo, hi))
+    return regions
+
+
+class SpeechMap:
+    """Joins the speech regions of a recording and maps times back onto the original.
+
+    audio() is what inference sees: the regions back to back with GAP_SECONDS of
+    silence between them. to_original() and map_segments() turn times in that
+    joined audio into times in the full recording. A time inside a gap lands on
+    the end of the region before it, or for a start, on the start of the next one,
+    so no segment spans skipped audio unless Whisper ran it across a gap.
+    """
+
+    def __init__(self, regions, total_samples, sr=SAMPLE_RATE):
+        self.regions = list(regions)
+        self.total_samples = total_samples
+        self.sr = sr
+        gap = int(GAP_SECONDS * sr)
+        self._joined_starts = []  # where each region begins in the joined audio, in seconds
+        position = 0
+        for start, end in self.regions:
+            self._joined_starts.append(position / sr)
+            position += (end - start) + gap
+        self.joined_samples = max(0, position - gap)
+
+    @property
+    def speech_seconds(self):
+        return sum(end - start for start, end in self.regions) / self.sr
+
+    @property
+    def skipped_seconds(self):
+        return self.total_samples / self.sr - self.speech_seconds
+
+    def audio(self, samples):
+        if not self.regions:
+            return samples[:0]
+        gap = np.zeros(int(GAP_SECONDS * self.sr), dtype=samples.dtype)
+        pieces = []
+        for start, end in self.regions:
+            if pieces:
+                pieces.append(gap)
+            pieces.append(samples[start:end])
+        return np.concatenate(pieces)
+
+    def to_original(self, t, is_start=False):
+        i = max(0, bisect.bisect_right(self._joined_starts, t) - 1)
+        start, end = self.regions[i]
+        offset = max(t - self._joined_starts[i], 0.0) * self.sr
+        if offset > end - start:
+            if is_start and i + 1 < len(self.regions):
+                return self.regions[i + 1][0] / self.sr
+            offset = end - start
+        return (start + offset) / self.sr
+
+    def map_segments(self, segments):
+        """Copies of Whisper-style segments (and their words) on the original timeline."""
+        mapped = []
+        for seg in segments:
+            seg = dict(seg, start=self.to_original(seg.get("start", 0.0), is_start=True),
+                       end=self.to_original(seg.get("end", 0.0)))
+            if seg.get("words"):
+                seg["words"] = [dict(w, start=self.to_original(w.get("start", 0.0), is_start=True),
+                                     end=self.to_original(w.get("end", 0.0))) for w in seg["words"]]
+            mapped.append(seg)
+        return mapped